@@ -136,7 +136,8 @@ class Config:
 
     run = ConfigSection(
         in_ide=BoolField(True),
-        terminal_choice=StringField("xfce4-terminal")
+        terminal_choice=StringField("xfce4-terminal"),
+        scrollback_lines=IntField(10000)
     )
 
     plugins = ConfigSection(
@@ -0,0 +1,205 @@
+"""
+Client of language analysis worker (see `ide.expansion.analysis_worker`).
+
+The worker is a long-living subprocess of the editor window. Documents of opened tabs are sent
+to it once and then kept in sync by line deltas from `QTextDocument.contentsChange`.
+Requests carry ids, their callbacks are called in GUI thread when responses arrive.
+If the worker dies, it is started again and opened documents are sent anew.
+"""
+import json
+import os
+import sys
+from typing import Callable
+
+from PySide6.QtCore import QObject, QProcess
+from PySide6.QtGui import QTextDocument
+
+from ide.logs import logger
+
+WORKER_PATH = os.path.join(os.path.dirname(__file__), "analysis_worker.py")
+
+
+class DocumentSync(QObject):
+    """
+    Sends changes of a document to the worker
+    """
+
+    def __init__(self, client: "AnalysisClient", path: str, document: QTextDocument):
+        """
+        :param AnalysisClient client: client of the worker
+        :param str path: path to the file
+        :param QTextDocument document: document of the file
+        """
+        super().__init__(document)
+        self.client = client
+        self.path = path
+        self.document = document
+        self.block_count = document.blockCount()
+        self.revision = document.revision()
+        document.contentsChange.connect(self.on_contents_change)
+
+    def open(self) -> None:
+        """
+        Send the whole document
+        """
+        self.block_count = self.document.blockCount()
+        self.revision = self.document.revision()
+        self.client.notify("open", {"path": self.path, "text": self.document.toPlainText()})
+
+    def on_contents_change(
+        self,
+        position: int,
+        chars_removed: int,  # pylint: disable=unused-argument
+        chars_added: int
+    ) -> None:
+        """Utility method. Bound to signal"""
+        if self.document.revision() == self.revision:
+            return  # Only formatting has changed
+        end_position = min(position + chars_added, self.document.characterCount() - 1)
+        start = self.document.findBlock(position).blockNumber()
+        end = self.document.findBlock(end_position).blockNumber()
+        lines = []
+        block = self.document.findBlockByNumber(start)
+        while block.isValid() and block.blockNumber() <= end:
+            lines.append(block.text())
+            block = block.next()
+        block_count = self.document.blockCount()
+        old_end = end - (block_count - self.block_count)
+        self.block_count = block_count
+        self.revision = self.document.revision()
+        self.client.notify("change", {"path": self.path, "start": start, "end": old_end + 1, "lines": lines})
+
+
+class AnalysisClient(QObject):
+    """
+    Starts analysis worker and talks to it
+    """
+
+    MAX_RESTARTS = 3
+
+    def __init__(self, root: str | None):
+        """
+        :param str root: project root, None in light mode
+        """
+        super().__init__()
+        self.root = root
+        self.next_id = 0
+        self.callbacks: dict[int, Callable[[object], None]] = {}
+        self.documents: dict[str, DocumentSync] = {}
+        self.buffer = b""
+        self.stopping = False
+        self.restarts = 0
+        self.process = QProcess(self)
+        self.process.setProgram(sys.executable)
+        self.process.setArguments([WORKER_PATH] + ([root] if root else []))
+        self.process.readyReadStandardOutput.connect(self.on_stdout)
+        self.process.readyReadStandardError.connect(self.on_stderr)
+        self.process.finished.connect(self.on_finished)
+
+    def start(self) -> None:
+        """
+        Start the worker
+        """
+        self.buffer = b""
+        self.process.start()
+
+    def stop(self) -> None:
+        """
+        Stop the worker
+        """
+        self.stopping = True
+        if self.process.state() != QProcess.NotRunning:
+            self.notify("exit", {})
+            if not self.process.waitForFinished(1000):
+                self.process.kill()
+
+    def notify(self, method: str, params: dict) -> None:
+        """
+        Send notification
+        :param str method: method name
+        :param dict params: parameters
+        """
+        self.write({"method": method, "params": params})
+
+    def request(self, method: str, params: dict, callback: Callable[[object], None]) -> int:
+        """
+        Send request
+        :param str method: method name
+        :param dict params: parameters
+        :param callback: called with result, not called if the request fails or is cancelled
+        :return: request id
+        """
+        self.next_id += 1
+        self.callbacks[self.next_id] = callback
+        self.write({"id": self.next_id, "method": method, "params": params})
+        return self.next_id
+
+    def cancel(self, request_id: int) -> None:
+        """
+        Cancel request. Its callback won't be called
+        :param int request_id: id returned by `request`
+        """
+        if self.callbacks.pop(request_id, None) is not None:
+            self.notify("cancel", {"id": request_id})
+
+    def write(self, message: dict) -> None:
+        """Utility method. Sends message to the worker"""
+        self.process.write((json.dumps(message) + "\n").encode())
+
+    def open_document(self, path: str, document: QTextDocument) -> None:
+        """
+        Send document to the worker and keep it in sync. Document sent earlier is sent again
+        :param str path: path to the file
+        :param QTextDocument document: document of the file
+        """
+        if path not in self.documents or self.documents[path].document is not document:
+            self.documents[path] = DocumentSync(self, path, document)
+        self.documents[path].open()
+
+    def close_document(self, path: str) -> None:
+        """
+        Stop syncing document
+        :param str path: path to the file
+        """
+        sync = self.documents.pop(path, None)
+        if sync is not None:
+            sync.document.contentsChange.disconnect(sync.on_contents_change)
+            self.notify("close", {"path": path})
+
+    def on_stdout(self) -> None:
+        """Utility method. Bound to signal"""
+        self.buffer += bytes(self.process.readAllStandardOutput())
+        *lines, self.buffer = self.buffer.split(b"\n")
+        for line in lines:
+            try:
+                response = json.loads(line)
+            except ValueError:
+                logger.warning("Analysis worker sent malformed response %r", line)
+                continue
+            callback = self.callbacks.pop(response.get("id"), None)
+            if callback is None:
+                continue
+            if "error" in response:
+                logger.warning("Analysis request failed: %s", response["error"])
+            else:
+                callback(response["result"])
+
+    def on_stderr(self) -> None:
+        """Utility method. Bound to signal"""
+        data = bytes(self.process.readAllStandardError()).decode(errors="replace").rstrip()
+        if data:
+            logger.debug("Analysis worker: %s", data)
+
+    def on_finished(self) -> None:
+        """Utility method. Bound to signal"""
+        self.callbacks.clear()
+        if self.stopping:
+            return
+        if self.restarts >= self.MAX_RESTARTS:
+            logger.error("Analysis worker keeps exiting, code analysis is disabled")
+            return
+        self.restarts += 1
+        logger.warning("Analysis worker has exited unexpectedly, restarting it")
+        self.start()
+        for sync in self.documents.values():
+            sync.open()
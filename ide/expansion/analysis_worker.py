@@ -0,0 +1,263 @@
+"""
+Language analysis worker.
+
+Runs in a separate process started by `ide.expansion.analysis.AnalysisClient`, so jedi inference
+neither blocks GUI event loop nor competes with it for GIL. The script doesn't import the IDE,
+only jedi, and is started as `python analysis_worker.py [project root]`.
+
+Messages are JSON objects, one per line, read from stdin and written to stdout:
+
+- request: ``{"id": 1, "method": "complete", "params": {...}}``, answered with
+  ``{"id": 1, "result": ...}`` or ``{"id": 1, "error": "..."}``
+- notification: ``{"method": "change", "params": {...}}``, not answered
+
+Opened documents are kept as lists of lines and updated by line ranges (see `Worker.change`).
+Requests are executed one at a time in order of arrival, cancelled ones are skipped.
+Modules imported by opened documents are preloaded while there are no messages to handle.
+"""
+import json
+import queue
+import re
+import sys
+import threading
+
+import jedi
+
+IMPORT_REGEX = re.compile(r"^[ \t]*(?:from|import)[ \t]+([A-Za-z_]\w*)", re.MULTILINE)
+
+
+class Worker:
+    """
+    Owns jedi project and documents opened in the editor
+    """
+
+    def __init__(self, root: str | None):
+        """
+        :param str root: project root, project is guessed from working directory if None (light mode)
+        """
+        self.project = jedi.Project(root) if root else jedi.get_default_project()
+        self.documents: dict[str, list[str]] = {}
+        """Path -> lines without line endings"""
+        self.cancelled: set[int] = set()
+        self.messages: queue.Queue = queue.Queue()
+        self.preloaded: set[str] = set()
+        self.preload_queue: list[str] = []
+        self.output = sys.stdout
+        self.output_lock = threading.Lock()
+
+    def script(self, path: str) -> jedi.Script:
+        """
+        Create script for analysis of opened document or file on disk
+        :param str path: path to the file
+        """
+        lines = self.documents.get(path)
+        return jedi.Script(code="\n".join(lines) if lines is not None else None, path=path, project=self.project)
+
+    def open(self, path: str, text: str) -> None:
+        """
+        Start tracking document, its imports are preloaded
+        :param str path: path to the file
+        :param str text: contents of the document
+        """
+        self.documents[path] = text.split("\n")
+        for module in IMPORT_REGEX.findall(text):
+            if module not in self.preloaded:
+                self.preloaded.add(module)
+                self.preload_queue.append(module)
+
+    def change(self, path: str, start: int, end: int, lines: list[str]) -> None:
+        """
+        Apply document delta
+        :param str path: path to the file
+        :param int start: first replaced line
+        :param int end: line after the last replaced one, numbers are given before the change
+        :param list[str] lines: new lines
+        """
+        document = self.documents.get(path)
+        if document is not None:
+            document[start:end] = lines
+
+    def close(self, path: str) -> None:
+        """
+        Stop tracking document
+        :param str path: path to the file
+        """
+        self.documents.pop(path, None)
+
+    def saved(self, path: str) -> None:
+        """
+        Drop cached results after file was saved and parse it again
+        :param str path: path to the file
+        """
+        jedi.cache.clear_time_caches(delete_all=True)
+        jedi.Script(path=path, project=self.project).get_names(all_scopes=False)
+
+    def preload(self, module: str) -> None:
+        """
+        Load a module into jedi caches
+        :param str module: top-level module name
+        """
+        code = f"import {module} as x; x."
+        jedi.Script(code=code, project=self.project).complete(1, len(code))
+
+    def complete(self, path: str, line: int, column: int, limit: int) -> list[dict]:
+        """
+        Get completions at position
+        :param str path: path to the file
+        :param int line: line number starting from 1
+        :param int column: column number starting from 0
+        :param int limit: number of completions described with docstrings
+        """
+        completions = self.script(path).complete(line, column)[:limit]
+        return [{
+            "name_with_symbols": completion.name_with_symbols,
+            "complete": completion.complete,
+            "type": completion.type,
+            "description": completion.description,
+            "docstring": completion.docstring(raw=True)
+        } for completion in completions]
+
+    @staticmethod
+    def describe(name: "jedi.api.classes.Name") -> dict:
+        """
+        Convert jedi name to JSON object
+        :param name: found name
+        """
+        return {
+            "module_path": str(name.module_path) if name.module_path else None,
+            "module_name": name.module_name,
+            "line": name.line,
+            "column": name.column,
+            "description": name.description,
+            "code": name.get_line_code()
+        }
+
+    def goto(self, path: str, line: int, column: int) -> list[dict]:
+        """
+        Get definitions of name at position
+        :param str path: path to the file
+        :param int line: line number starting from 1
+        :param int column: column number starting from 0
+        """
+        return [self.describe(name) for name in self.script(path).goto(line, column, follow_imports=True)]
+
+    @staticmethod
+    def location(name: "jedi.api.classes.Name") -> tuple:
+        """
+        Get position identifying a definition
+        :param name: found name
+        """
+        return str(name.module_path), name.line, name.column
+
+    def references(self, path: str, line: int, column: int, limit: int, files: list[str] | None = None) -> list[dict]:
+        """
+        Get references to name at position
+        :param str path: path to the file
+        :param int line: line number starting from 1
+        :param int column: column number starting from 0
+        :param int limit: maximal number of references
+        :param list[str] files: the only other files that may contain references (see `SymbolIndex`),
+        jedi searches the whole project if not given
+        """
+        script = self.script(path)
+        if files is None:
+            names = script.get_references(line, column, include_builtins=False)
+            return [self.describe(name) for name in names[:limit]]
+        definitions = script.goto(line, column, follow_imports=True)
+        if not definitions:
+            return []
+        identifiers = {definition.name for definition in definitions}
+        locations = {self.location(definition) for definition in definitions}
+        names = script.get_references(line, column, include_builtins=False, scope="file")
+        identifiers.update(name.name for name in names)
+        for other_path in sorted(set(files) - {path}):
+            if len(names) >= limit:
+                break
+            for name in self.script(other_path).get_names(all_scopes=True, definitions=True, references=True):
+                if name.name in identifiers and locations.intersection(
+                        self.location(definition) for definition in name.goto(follow_imports=True)):
+                    names.append(name)
+        return [self.describe(name) for name in names[:limit]]
+
+    def handle(self, message: dict) -> dict | None:
+        """
+        Execute message
+        :param dict message: request or notification
+        :return: response to request, None for notifications and cancelled requests
+        """
+        request_id = message.get("id")
+        if request_id is not None and request_id in self.cancelled:
+            self.cancelled.discard(request_id)
+            return None
+        handler = {
+            "open": self.open,
+            "change": self.change,
+            "close": self.close,
+            "saved": self.saved,
+            "complete": self.complete,
+            "goto": self.goto,
+            "references": self.references
+        }.get(message.get("method"))
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown method {message.get('method')}")
+            result = handler(**message.get("params", {}))
+        except Exception as error:  # pylint: disable=broad-except
+            if request_id is None:
+                print(f"{message.get('method')} failed: {error!r}", file=sys.stderr)
+                return None
+            return {"id": request_id, "error": repr(error)}
+        if request_id is None:
+            return None
+        return {"id": request_id, "result": result}
+
+    def read(self, stream) -> None:
+        """
+        Read messages from stream. Cancellations are applied immediately, everything else is queued
+        :param stream: binary input stream
+        """
+        for line in stream:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get("method") == "cancel":
+                self.cancelled.add(message["params"]["id"])
+            else:
+                self.messages.put(message)
+        self.messages.put({"method": "exit"})
+
+    def send(self, response: dict) -> None:
+        """
+        Write response to stdout
+        :param dict response: response
+        """
+        with self.output_lock:
+            self.output.write(json.dumps(response) + "\n")
+            self.output.flush()
+
+    def run(self) -> None:
+        """
+        Handle messages until "exit" notification or end of input
+        """
+        threading.Thread(target=self.read, args=(sys.stdin.buffer,), daemon=True).start()
+        while True:
+            try:
+                message = self.messages.get(block=not self.preload_queue)
+            except queue.Empty:
+                try:
+                    self.preload(self.preload_queue.pop(0))
+                except Exception:  # pylint: disable=broad-except
+                    pass
+                continue
+            if message.get("method") == "exit":
+                return
+            response = self.handle(message)
+            if response is not None:
+                self.send(response)
+
+
+if __name__ == "__main__":
+    worker = Worker(sys.argv[1] if len(sys.argv) > 1 else None)
+    sys.stdout = sys.stderr  # Only responses are written to the real stdout
+    worker.run()
@@ -0,0 +1,253 @@
+"""
+Bracket index of a document for matching brackets far apart.
+
+Every line is summarized per bracket kind by its net depth change and the minimum depth reached
+inside it, relative to the start of the line. Summaries of consecutive lines combine like
+prefix sums: depth changes add up, and the minimum is the lower of the first minimum and the second
+shifted by the first depth change. Lines are kept in an implicit treap (a randomized binary search
+tree ordered by line number) whose nodes also store the summary of their subtree. The line holding
+a matching bracket is found by descending the tree, and lines are inserted, removed and updated
+without rebuilding it, all in O(log n).
+"""
+import random
+
+from ide.expansion.lexing import BRACKETS
+
+KINDS = {bracket: kind for kind, opening in enumerate(BRACKETS) for bracket in (opening, BRACKETS[opening])}
+"""Bracket -> index of its kind in a summary"""
+
+DELTAS = {bracket: 1 if bracket in BRACKETS else -1 for bracket in KINDS}
+
+EMPTY_SUMMARY = (0, 0) * len(BRACKETS)
+"""Summary of a line without brackets"""
+
+
+def summarize(text: str, brackets) -> tuple:
+    """
+    Summarize brackets of a line
+    :param str text: line
+    :param brackets: positions of brackets in code, see `find_brackets`
+    :return: (depth change, minimum depth) of every bracket kind, flattened
+    """
+    if not brackets:
+        return EMPTY_SUMMARY
+    summary = list(EMPTY_SUMMARY)
+    for position in brackets:
+        char = text[position]
+        index = 2 * KINDS[char]
+        summary[index] += DELTAS[char]
+        if summary[index] < summary[index + 1]:
+            summary[index + 1] = summary[index]
+    return tuple(summary)
+
+
+def combine(first: tuple, second: tuple) -> tuple:
+    """
+    Summary of two consecutive runs of lines
+    """
+    return (
+        first[0] + second[0], min(first[1], first[0] + second[1]),
+        first[2] + second[2], min(first[3], first[2] + second[3]),
+        first[4] + second[4], min(first[5], first[4] + second[5]),
+    )
+
+
+class Node:
+    """
+    Line of `BracketTree`
+    """
+    __slots__ = ("left", "right", "priority", "size", "summary", "total")
+
+    def __init__(self, summary: tuple):
+        self.left: Node | None = None
+        self.right: Node | None = None
+        self.priority = random.random()
+        self.size = 1
+        self.summary = summary
+        self.total = summary
+        """Summary of the subtree"""
+
+    def update(self) -> None:
+        """
+        Recalculate size and total summary from children
+        """
+        size, total = 1, self.summary
+        if self.left is not None:
+            size += self.left.size
+            total = combine(self.left.total, total)
+        if self.right is not None:
+            size += self.right.size
+            total = combine(total, self.right.total)
+        self.size, self.total = size, total
+
+
+def split(node: Node | None, count: int) -> tuple[Node | None, Node | None]:
+    """
+    Split tree into its first `count` lines and the rest
+    """
+    if node is None:
+        return None, None
+    left_size = node.left.size if node.left is not None else 0
+    if count <= left_size:
+        first, node.left = split(node.left, count)
+        node.update()
+        return first, node
+    node.right, rest = split(node.right, count - left_size - 1)
+    node.update()
+    return node, rest
+
+
+def merge(first: Node | None, second: Node | None) -> Node | None:
+    """
+    Concatenate two trees
+    """
+    if first is None:
+        return second
+    if second is None:
+        return first
+    if first.priority > second.priority:
+        first.right = merge(first.right, second)
+        first.update()
+        return first
+    second.left = merge(first, second.left)
+    second.update()
+    return second
+
+
+def build(summaries: list[tuple]) -> Node | None:
+    """
+    Build tree of lines in linear time
+    :param list summaries: summaries of lines
+    """
+    stack: list[Node] = []
+    for summary in summaries:
+        node = Node(summary)
+        last = None
+        while stack and stack[-1].priority < node.priority:
+            last = stack.pop()
+        node.left = last
+        if stack:
+            stack[-1].right = node
+        stack.append(node)
+    if not stack:
+        return None
+    order = []
+    pending = [stack[0]]
+    while pending:
+        node = pending.pop()
+        order.append(node)
+        pending.extend(child for child in (node.left, node.right) if child is not None)
+    for node in reversed(order):
+        node.update()
+    return stack[0]
+
+
+class BracketTree:
+    """
+    Bracket summaries of lines of a document
+    """
+
+    def __init__(self, summaries: list[tuple] = ()):
+        """
+        :param list summaries: summaries of lines, see `summarize`
+        """
+        self.root = build(list(summaries))
+
+    def __len__(self) -> int:
+        return self.root.size if self.root is not None else 0
+
+    def replace(self, start: int, end: int, summaries: list[tuple]) -> None:
+        """
+        Replace lines from `start` to `end` (exclusive) with new ones
+        :param int start: first replaced line
+        :param int end: line after the last replaced one
+        :param list summaries: summaries of new lines
+        """
+        first, rest = split(self.root, start)
+        _, rest = split(rest, end - start)
+        self.root = merge(merge(first, build(summaries)), rest)
+
+    def set(self, index: int, summary: tuple) -> None:
+        """
+        Update summary of a line
+        :param int index: line number
+        :param tuple summary: new summary
+        """
+        path = []
+        node = self.root
+        while node is not None:
+            path.append(node)
+            left_size = node.left.size if node.left is not None else 0
+            if index < left_size:
+                node = node.left
+            elif index == left_size:
+                node.summary = summary
+                break
+            else:
+                index -= left_size + 1
+                node = node.right
+        else:
+            raise IndexError("Line number out of range")
+        for node in reversed(path):
+            node.update()
+
+    def find_closing(self, line: int, bracket: str, depth: int) -> int | None:
+        """
+        Find the line after the given one where a closing bracket matches
+        :param int line: line number
+        :param str bracket: opening or closing bracket of the kind
+        :param int depth: number of opening brackets left unmatched at the end of the line
+        :return: line number or None if brackets are unbalanced
+        """
+        kind = 2 * KINDS[bracket]
+        first, node = split(self.root, line + 1)
+        index = line + 1
+        found = None
+        rest = node
+        while node is not None:
+            left = node.left
+            if left is not None:
+                if depth + left.total[kind + 1] <= 0:
+                    node = left
+                    continue
+                depth += left.total[kind]
+                index += left.size
+            if depth + node.summary[kind + 1] <= 0:
+                found = index
+                break
+            depth += node.summary[kind]
+            index += 1
+            node = node.right
+        self.root = merge(first, rest)
+        return found
+
+    def find_opening(self, line: int, bracket: str, depth: int) -> int | None:
+        """
+        Find the line before the given one where an opening bracket matches
+        :param int line: line number
+        :param str bracket: opening or closing bracket of the kind
+        :param int depth: number of closing brackets left unmatched at the start of the line
+        :return: line number or None if brackets are unbalanced
+        """
+        kind = 2 * KINDS[bracket]
+        node, rest = split(self.root, line)
+        first = node
+        index = line
+        found = None
+        while node is not None:
+            right = node.right
+            if right is not None:
+                # Maximal depth change of a suffix is the change of the whole run minus its minimum
+                if right.total[kind] - right.total[kind + 1] >= depth:
+                    node = right
+                    continue
+                depth -= right.total[kind]
+                index -= right.size
+            if node.summary[kind] - node.summary[kind + 1] >= depth:
+                found = index - 1
+                break
+            depth -= node.summary[kind]
+            index -= 1
+            node = node.left
+        self.root = merge(first, rest)
+        return found
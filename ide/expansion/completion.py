@@ -0,0 +1,73 @@
+"""
+Code completion running in background.
+
+Every keystroke restarts a short debounce timer, so completion is requested only when typing pauses.
+Requests are executed by the analysis worker process (see `ide.expansion.analysis`). A new keystroke
+supersedes the pending request: it is cancelled in the worker and its result is never shown.
+"""
+from PySide6.QtCore import QObject, QTimer
+from PySide6.QtWidgets import QTextEdit
+
+from ide.ui.contextmenus.jedi import AutocompleteMenu
+
+
+class CompletionService(QObject):
+    """
+    Requests completions for a text edit and shows `AutocompleteMenu` with them
+    """
+
+    DEBOUNCE_INTERVAL = 120
+
+    def __init__(self, text_edit: QTextEdit):
+        """
+        :param QTextEdit text_edit: text edit of a code editor tab
+        """
+        super().__init__(text_edit)
+        self.text_edit = text_edit
+        self.request_id: int | None = None
+        self.requested_at: tuple[int, int] | None = None
+        """Document revision and cursor position the pending request was made at"""
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.DEBOUNCE_INTERVAL)
+        self.timer.timeout.connect(self.submit)
+
+    def request(self) -> None:
+        """
+        Request completion at cursor position once typing pauses, superseding the pending request
+        """
+        self.cancel()
+        self.timer.start()
+
+    def cancel(self) -> None:
+        """
+        Drop the pending request
+        """
+        self.requested_at = None
+        self.timer.stop()
+        if self.request_id is not None:
+            self.text_edit.editor.analysis.cancel(self.request_id)
+            self.request_id = None
+
+    def submit(self) -> None:
+        """Utility method. Bound to signal"""
+        analysis = self.text_edit.editor.analysis
+        if self.text_edit.path not in analysis.documents:
+            return
+        cursor = self.text_edit.textCursor()
+        self.requested_at = (self.text_edit.document().revision(), cursor.position())
+        self.request_id = analysis.request("complete", {
+            "path": self.text_edit.path,
+            "line": cursor.blockNumber() + 1,
+            "column": cursor.positionInBlock(),
+            "limit": AutocompleteMenu.LIMIT
+        }, self.on_completed)
+
+    def on_completed(self, completions: list[dict]) -> None:
+        """Utility method. Called with response of the worker"""
+        self.request_id = None
+        if not completions or self.requested_at is None:
+            return
+        if self.requested_at != (self.text_edit.document().revision(), self.text_edit.textCursor().position()):
+            return  # Cursor has moved since the request
+        AutocompleteMenu(self.text_edit, completions).show()
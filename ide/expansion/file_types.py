@@ -1,8 +1,41 @@
 import os
+import stat
 
 from ide.ui.tabbing import ImageEditorTab
 
 
+def file_kinds(file: "str | os.DirEntry") -> tuple[frozenset[str], int | None]:
+    """
+    Classify a file with a single stat call (two for symbolic links).
+    Entries listed by `os.scandir` use their cached stat result
+    :param file: path or directory entry
+    :return: kinds of the file ("file", "directory", "link") and its modification time in nanoseconds,
+    no kinds and None if it doesn't exist
+    """
+    kinds = set()
+    try:
+        if isinstance(file, os.DirEntry):
+            if file.is_symlink():
+                kinds.add("link")
+            result = file.stat(follow_symlinks=False) if kinds else file.stat()
+        else:
+            result = os.lstat(file)
+            if stat.S_ISLNK(result.st_mode):
+                kinds.add("link")
+    except OSError:
+        return frozenset(), None
+    if kinds:
+        try:
+            result = file.stat() if isinstance(file, os.DirEntry) else os.stat(file)
+        except OSError:  # Broken link
+            return frozenset(kinds), result.st_mtime_ns
+    if stat.S_ISREG(result.st_mode):
+        kinds.add("file")
+    elif stat.S_ISDIR(result.st_mode):
+        kinds.add("directory")
+    return frozenset(kinds), result.st_mtime_ns
+
+
 class FileType:
     """
     Represents a file type
@@ -18,11 +51,32 @@ class FileType:
     do_custom_open: bool = False
     """States whether or not the file should be opened by IDE or in somewhat other way."""
 
+    lexer: str | None = None
+    """Name of pygments lexer used to highlight files of that type"""
+
+    kind: str | None = None
+    """
+    Kind of files of that type: "file", "directory" or "link". File types declaring it
+    and not overriding `applies` are resolved by `Registry` without calling `applies`
+    """
+
+    extensions: tuple[str, ...] = ()
+    """Name endings (starting with a dot) of files of that type, e.g. ".py". Any name matches if empty"""
+
+    def matches(self, file_path: str, kinds: frozenset[str]) -> bool:
+        """
+        Checks whether already classified file belongs to given type using `kind` and `extensions`
+        :param str file_path: path to file that will be checked
+        :param frozenset kinds: kinds of the file, see `file_kinds`
+        """
+        return self.kind in kinds and (not self.extensions or file_path.endswith(self.extensions))
+
     def applies(self, file_path: str) -> bool:
         """
         Checks whether the file belongs to given type
         :param str file_path: path to file that will be checked
         """
+        return self.kind is not None and self.matches(file_path, file_kinds(file_path)[0])
 
     # TODO: define editor window class
     def custom_open(self, editor, file_path: str) -> None:
@@ -46,9 +100,7 @@ class FileType:
 
 class GenericFile(FileType):
     id = "generic_file"
-
-    def applies(self, file_path: str) -> bool:
-        return os.path.isfile(file_path)
+    kind = "file"
 
     def setup_context_menu(self, editor, menu, context_file: str, context_project) -> None:
         from ide.ui.contextmenus.file_menus import DeleteFileAction
@@ -58,9 +110,7 @@ class GenericFile(FileType):
 class GenericFolder(FileType):
     id = "generic_folder"
     icon = "images/icons/folder.png"
-
-    def applies(self, file_path: str) -> bool:
-        return os.path.isdir(file_path)
+    kind = "directory"
 
     def setup_context_menu(self, editor, menu, context_file: str, context_project) -> None:
         from ide.ui.contextmenus.file_menus import DeleteFileAction, NewFileAction, NewFolderAction
@@ -75,42 +125,35 @@ class GenericFolder(FileType):
 
 class GenericLink(FileType):
     id = "generic_link"
-
-    def applies(self, file_path: str) -> bool:
-        return os.path.islink(file_path)
+    kind = "link"
 
 
 class PythonFile(GenericFile):
     id = "python_file"
     icon = "images/icons/module.png"
-
-    def applies(self, file_path: str) -> bool:
-        return super().applies(file_path) and file_path.endswith(".py")
+    lexer = "python3"
+    extensions = (".py",)
 
 
 class CppFile(GenericFile):
     id = "cpp_file"
     icon = "images/icons/cpp.png"
-
-    def applies(self, file_path: str) -> bool:
-        return super().applies(file_path) and file_path.endswith(".cpp")
+    lexer = "cpp"
+    extensions = (".cpp",)
 
 
 class TxtFile(GenericFile):
     id = "txt_file"
     icon = "images/icons/txt.png"
-
-    def applies(self, file_path: str) -> bool:
-        return super().applies(file_path) and file_path.endswith(".txt")
+    lexer = "text"
+    extensions = (".txt",)
 
 
 class ImageFile(GenericFile):
     id = "image_file"
     do_custom_open = True
     icon = "images/icons/image.png"
-
-    def applies(self, file_path: str) -> bool:
-        return super().applies(file_path) and file_path.endswith((".png", ".jpg", ".jpeg"))
+    extensions = (".png", ".jpg", ".jpeg")
 
     def custom_open(self, editor, file_path: str) -> None:
         heading = file_path.split("/")[-1]
@@ -124,6 +167,4 @@ class ImageFile(GenericFile):
 class VideoFile(GenericFile):
     id = "video_file"
     icon = "images/icons/video.png"
-
-    def applies(self, file_path: str) -> bool:
-        return super().applies(file_path) and file_path.endswith((".mp4", "avi", ".mkv"))
+    extensions = (".mp4", ".avi", ".mkv")
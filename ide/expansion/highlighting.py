@@ -1,27 +1,22 @@
-import bisect
 import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 
-from pygments import highlight as pyghighlight
-from pygments.formatter import Formatter
-from pygments.lexers import get_lexer_by_name
+from pygments.lexer import Lexer
 from pygments.styles import get_all_styles, get_style_by_name
-from PySide6.QtCore import QEvent, Qt
-from PySide6.QtGui import QColor, QFont, QSyntaxHighlighter, QTextCharFormat
+from PySide6.QtCore import QEvent, QObject, QPoint, Qt, QTimer, Signal
+from PySide6.QtGui import QColor, QFont, QSyntaxHighlighter, QTextBlock, QTextBlockUserData, QTextCharFormat, \
+    QTextDocument
 from PySide6.QtWidgets import QCheckBox, QColorDialog, QComboBox, QDialog, QDialogButtonBox, \
     QFormLayout, QGridLayout, QLabel, QPushButton, QScrollArea, QTextEdit, QWidget
 
 from ide.logs import logger
+from .brackets import EMPTY_SUMMARY, BracketTree, summarize
 from .highlighting_labels import labels
+from .lexing import BRACKETS, TOKEN_CACHE, TOKEN_TYPES, Tokens, find_brackets, get_state_table, lex_line, \
+    lex_lines
 
-
-def highlight(text, lexer, formatter):
-    if text == highlight.CACHE["text"] and highlight.CACHE["style"] == str(CustomStyle.styles):
-        return highlight.CACHE["result"]
-    highlight.CACHE = {"text": text, "style": str(CustomStyle.styles), "result": pyghighlight(text, lexer, formatter)}
-    return highlight.CACHE["result"]
-
-
-highlight.CACHE = {"text": None, "style": None, "result": None}
+TOKENIZER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tokenizer")
 
 
 def hex2QColor(color: str) -> QColor:
@@ -34,31 +29,28 @@ def hex2QColor(color: str) -> QColor:
     return QColor(red, green, blue)
 
 
-class FormatBlock:
-    def __init__(self, position, style, length):
-        self.position = position
-        self.style = style
-        self.length = length
-
-    def __lt__(self, value):
-        return self.position < value
-
-    def __gt__(self, value):
-        return self.position > value
+class BlockData(QTextBlockUserData):
+    """
+    Lexing result of a single block. Reused while block text and the state it starts with are the same
+    """
 
-    def __repr__(self):
-        return f"FormatBlock({self.position}, {self.style}, {self.length})"
+    def __init__(self, text: str, start_state: int, end_state: int, tokens: Tokens):
+        super().__init__()
+        self.text = text
+        self.start_state = start_state
+        self.end_state = end_state
+        self.tokens = tokens
 
 
-class QFormatter(Formatter):
+class QFormatter:
     """
     Class for working with highlight styles
     """
 
     def __init__(self, app):
-        Formatter.__init__(self)
         self.styles = {}
-        self.data = []
+        self.formats: list[QTextCharFormat | None] = []
+        self.style_version = -1
         self.brackets = (None, None)
         if app.config.appearance.scheme == "qt-auto":
             if app.current_theme.is_dark:
@@ -74,6 +66,8 @@ class QFormatter(Formatter):
         Converts data from Customstyle class and converts it to PySide QTextCharFormat representation
         """
         self.styles = {}
+        self.formats = []
+        self.style_version = CustomStyle.version
         for token, style in CustomStyle.styles.items():
             text_format = QTextCharFormat()
             if style['color']:
@@ -88,41 +82,452 @@ class QFormatter(Formatter):
                 text_format.setFontUnderline(True)
             self.styles[token] = text_format
 
-    def format(self, token_source, outfile):
+    def update_style(self) -> bool:
+        """
+        Rebuild formats if CustomStyle was changed since they were built
+        :return: True if formats were rebuilt
+        """
+        if self.style_version == CustomStyle.version:
+            return False
+        self.get_style()
+        return True
+
+    def get_format(self, type_id: int) -> QTextCharFormat | None:
+        """
+        Get format by interned token type id. Formats are shared by all tokens of a type,
+        tokens not present in the style use format of their parent
+        :param int type_id: id from `TOKEN_TYPES`
+        """
+        if type_id >= len(self.formats):
+            for new_id in range(len(self.formats), type_id + 1):
+                token = TOKEN_TYPES.get(new_id)
+                while token not in self.styles and token.parent is not None:
+                    token = token.parent
+                self.formats.append(self.styles.get(token))
+        return self.formats[type_id]
+
+
+class HighlightScheduler(QObject):
+    """
+    Keeps syntax highlighting of big documents off the GUI thread.
+
+    Highlighter lexes blocks synchronously only for `SYNC_BUDGET` per event loop iteration. Blocks left
+    behind are marked dirty and tokenized in the tokenizer thread on a snapshot of the document.
+    Results are applied in time-sliced batches, visible blocks first. Results of a snapshot which
+    was edited in the meantime are discarded and tokenization is restarted.
+
+    Tokenization of a freshly loaded document is stored in `TOKEN_CACHE`, so the same document
+    opened again (in another tab or editor window) is not lexed at all.
+    """
+
+    SYNC_BUDGET = 0.02
+    """Seconds of synchronous lexing allowed per event loop iteration"""
+
+    BATCH_BUDGET = 0.01
+    """Seconds spent on applying results per timer tick"""
+
+    DEBOUNCE = 50
+    """Milliseconds to wait for further edits before starting tokenization"""
+
+    tokens_ready = Signal(object)
+
+    def __init__(self, highlighter: "Highlighter"):
+        super().__init__(highlighter)
+        self.highlighter = highlighter
+        self.document = highlighter.document()
+        self.generation = 0
+        self.dirty_from: int | None = None
+        self.turn_start: float | None = None
+        self.result = None
+        self.queue: list[int] = []
+        self.restyle_queue: list[int] = []
+        self.restyle_start = 0.0
+        self.cache_key: tuple | None = None
+        self.cached: tuple[list[str], list[tuple[Tokens, int]]] | None = None
+
+        self.start_timer = QTimer(self)
+        self.start_timer.setSingleShot(True)
+        self.start_timer.setInterval(self.DEBOUNCE)
+        self.start_timer.timeout.connect(self.start_tokenization)
+        self.apply_timer = QTimer(self)
+        self.apply_timer.setInterval(0)
+        self.apply_timer.timeout.connect(self.apply_batch)
+
+        self.document.contentsChange.connect(self.on_contents_change)
+        self.tokens_ready.connect(self.on_tokens_ready)
+
+    def load(self, text: str, document_id: str) -> None:
+        """
+        Prepare for loading new text into the document
+        :param str text: text that is about to be set
+        :param str document_id: identifier of the document, e.g. file path
+        """
+        key = (document_id, hash(text))
+        self.cached = TOKEN_CACHE.get(key)
+        self.cache_key = key if self.cached is None else None
+
+    def cached_block(self, number: int, text: str, start_state: int) -> "BlockData | None":
+        """
+        Get tokenization of a block from cached document if block is the same as there
+        :param int number: block number
+        :param str text: block text
+        :param int start_state: state the block starts with
+        """
+        if self.cached is None:
+            return None
+        lines, results = self.cached
+        if number >= len(lines) or lines[number] != text:
+            return None
+        if start_state != (results[number - 1][1] if number else -1):
+            return None
+        tokens, end_state = results[number]
+        return BlockData(text, start_state, end_state, tokens)
+
+    def remember(self, start: int, lines: list[str], results: list[tuple[Tokens, int]]) -> None:
+        """
+        Put tokenization of loaded document into `TOKEN_CACHE`.
+        Blocks before the first tokenized one were lexed synchronously and are taken from the document
+        :param int start: first tokenized block
+        :param list[str] lines: tokenized lines
+        :param list results: tokenization results
+        """
+        key, self.cache_key = self.cache_key, None
+        prefix_lines, prefix_results = [], []
+        previous_state = -1
+        block = self.document.firstBlock()
+        for _ in range(start):
+            data = block.userData()
+            if not isinstance(data, BlockData) or data.text != block.text() or data.start_state != previous_state:
+                return
+            prefix_lines.append(data.text)
+            prefix_results.append((data.tokens, data.end_state))
+            previous_state = data.end_state
+            block = block.next()
+        lines = prefix_lines + lines
+        if hash("\n".join(lines)) == key[1]:
+            TOKEN_CACHE.put(key, lines, prefix_results + results)
+
+    def over_budget(self) -> bool:
+        """
+        Checks whether synchronous lexing took too long in current event loop iteration
+        """
+        now = time.perf_counter()
+        if self.turn_start is None:
+            self.turn_start = now
+            QTimer.singleShot(0, self.end_turn)
+        return now - self.turn_start > self.SYNC_BUDGET
+
+    def end_turn(self) -> None:
+        """Utility method. Called when control gets back to event loop"""
+        self.turn_start = None
+
+    def is_idle(self) -> bool:
+        """
+        Checks whether the whole document is highlighted and no work is scheduled
+        """
+        return self.dirty_from is None and not self.queue and not self.restyle_queue \
+            and not self.start_timer.isActive()
+
+    def invalidate(self, block_number: int) -> None:
+        """
+        Mark highlighting starting with given block as stale
+        :param int block_number: first stale block
+        """
+        if self.dirty_from is None or block_number < self.dirty_from:
+            self.dirty_from = block_number
+        self.start_timer.start()
+
+    def on_contents_change(
+        self,
+        position: int,
+        chars_removed: int,  # pylint: disable=unused-argument
+        chars_added: int  # pylint: disable=unused-argument
+    ) -> None:
+        """Utility method. Bound to signal"""
+        self.generation += 1
+        if self.dirty_from is not None:
+            self.invalidate(self.document.findBlock(position).blockNumber())
+
+    def visible_range(self) -> tuple[int, int]:
+        """
+        Numbers of first and last visible blocks
+        """
+        edit = self.highlighter.text_edit
+        first = edit.cursorForPosition(QPoint(0, 0)).blockNumber()
+        last = edit.cursorForPosition(QPoint(0, edit.viewport().height())).blockNumber()
+        return first, last
+
+    def visible_first(self, start: int, end: int) -> list[int]:
+        """
+        Block numbers in [start, end) with visible ones going first. Reversed to be popped from the end
+        """
+        first, last = self.visible_range()
+        first = min(max(first, start), end)
+        last = max(min(last + 1, end), first)
+        order = list(range(first, last)) + list(range(start, first)) + list(range(last, end))
+        order.reverse()
+        return order
+
+    def snapshot(self, start: int) -> list[str]:
+        """
+        Texts of all blocks starting with given one
+        :param int start: first block number
+        """
+        lines = self.document.toPlainText().split("\n")
+        if len(lines) == self.document.blockCount():
+            return lines[start:]
+        # Line separators inside blocks, fall back to reading blocks one by one
+        lines = []
+        block = self.document.findBlockByNumber(start)
+        while block.isValid():
+            lines.append(block.text())
+            block = block.next()
+        return lines
+
+    def start_state(self, start: int) -> int:
+        """
+        Interned lexer state at the beginning of given block
+        :param int start: block number
+        """
+        previous = self.document.findBlockByNumber(start - 1)
+        if not previous.isValid():
+            return -1
+        data = previous.userData()
+        if isinstance(data, BlockData) and data.text == previous.text():
+            return data.end_state
+        return previous.userState()
+
+    def start_tokenization(self) -> None:
+        """
+        Tokenize stale blocks in tokenizer thread
+        """
+        if self.dirty_from is None:
+            return
+        if self.dirty_from >= self.document.blockCount():
+            self.dirty_from = None
+            return
+        self.apply_timer.stop()
+        self.result = None
+        self.queue = []
+
+        generation = self.generation
+        start = self.dirty_from
+        start_state = self.start_state(start)
+        lines = self.snapshot(start)
+
+        if self.cached is not None:
+            cached_lines, cached_results = self.cached
+            if start_state == (cached_results[start - 1][1] if start else -1) and cached_lines[start:] == lines:
+                self.on_tokens_ready((generation, start, start_state, lines, cached_results[start:]))
+                return
+
+        def is_stale():
+            return generation != self.generation
+
+        future = TOKENIZER.submit(lex_lines, self.highlighter.lexer, lines, self.highlighter.states,
+                                  start_state, is_stale)
+
+        def done(future):
+            results = future.result()
+            if results is None:
+                return
+            try:
+                self.tokens_ready.emit((generation, start, start_state, lines, results))
+            except RuntimeError:  # Highlighter was deleted together with its tab
+                pass
+
+        future.add_done_callback(done)
+
+    def on_tokens_ready(self, result: tuple) -> None:
+        """Utility method. Bound to signal"""
+        generation, start, _, lines, results = result
+        if generation != self.generation:
+            self.start_timer.start()
+            return
+        if self.cache_key is not None:
+            self.remember(start, lines, results)
+        self.result = result
+        self.queue = self.visible_first(start, start + len(lines))
+        self.apply_timer.start()
+
+    def restyle(self) -> None:
+        """
+        Reapply formats to the whole document without blocking the GUI
+        """
+        self.restyle_start = time.perf_counter()
+        self.restyle_queue = self.visible_first(0, self.document.blockCount())
+        self.apply_timer.start()
+
+    def install(self, number: int) -> bool:
+        """
+        Store tokenization result of given block in it, so highlighter won't lex it again
+        :param int number: block number
+        :return: False if block was changed since snapshot
+        """
+        _, start, start_state, lines, results = self.result
+        block = self.document.findBlockByNumber(number)
+        text = lines[number - start]
+        if not block.isValid() or block.text() != text:
+            return False
+        previous_state = start_state if number == start else results[number - start - 1][1]
+        if block.previous().isValid():
+            block.previous().setUserState(previous_state)
+        tokens, end_state = results[number - start]
+        data = block.userData()
+        if isinstance(data, BlockData) and data.text == text and data.start_state == previous_state \
+                and data.end_state == end_state == block.userState():
+            return True  # Already highlighted this way
+        block.setUserData(BlockData(text, previous_state, end_state, tokens))
+        block.setUserState(end_state)
+        self.highlighter.brackets.touch(number)
+        self.highlighter.rehighlightBlock(block)
+        return True
+
+    def apply_batch(self) -> None:
+        """
+        Apply pending results and restyling for `BATCH_BUDGET`
+        """
+        start_time = time.perf_counter()
+        if self.queue and self.result[0] != self.generation:
+            self.queue = []
+            self.result = None
+            self.start_timer.start()
+        while self.queue and time.perf_counter() - start_time < self.BATCH_BUDGET:
+            if not self.install(self.queue.pop()):
+                self.queue = []
+                self.result = None
+                self.start_timer.start()
+                break
+            if not self.queue:
+                self.result = None
+                self.dirty_from = None
+        while self.restyle_queue and time.perf_counter() - start_time < self.BATCH_BUDGET:
+            block = self.document.findBlockByNumber(self.restyle_queue.pop())
+            if block.isValid():
+                self.highlighter.rehighlightBlock(block)
+            if not self.restyle_queue:
+                logger.info(f"Full rehighlight took {time.perf_counter() - self.restyle_start:.2f}sec")
+        if not self.queue and not self.restyle_queue:
+            self.apply_timer.stop()
+
+
+class BracketIndex(QObject):
+    """
+    Keeps `BracketTree` of a document in line with its blocks.
+
+    Edits replace summaries of changed blocks right away, block numbers of the tree always match
+    the document. Summaries themselves are recomputed lazily, when a bracket is looked up: blocks are
+    only marked as touched when they are edited or highlighted (highlighting tells which brackets are
+    in strings and comments). The tree is built on the first lookup and rebuilt after edits touching
+    a big part of the document.
+    """
+
+    def __init__(self, document: QTextDocument):
         """
-        Function that creates list containing style for each symbol from source string
+        :param QTextDocument document: document. Index must be created before the highlighter,
+        so that it sees edits before blocks are highlighted
         """
-        pos = 0
-        self.data = []
+        super().__init__(document)
+        self.document = document
+        self.tree: BracketTree | None = None
+        self.block_count = document.blockCount()
+        self.touched: set[int] = set()
+        """Numbers of blocks whose summaries have to be recomputed"""
+        document.contentsChange.connect(self.on_contents_change)
+
+    def on_contents_change(
+        self,
+        position: int,
+        chars_removed: int,  # pylint: disable=unused-argument
+        chars_added: int
+    ) -> None:
+        """Utility method. Bound to signal"""
+        block_count = self.document.blockCount()
+        delta, self.block_count = block_count - self.block_count, block_count
+        if self.tree is None:
+            return
+        end_position = min(position + chars_added, self.document.characterCount() - 1)
+        start = self.document.findBlock(position).blockNumber()
+        end = self.document.findBlock(end_position).blockNumber()
+        old_end = end - delta
+        if 2 * (end - start) > block_count:
+            self.tree = None
+            return
+        self.tree.replace(start, old_end + 1, [EMPTY_SUMMARY] * (end - start + 1))
+        self.touched = {number if number < start else number + delta
+                        for number in self.touched if number < start or number > old_end}
+        self.touched.update(range(start, end + 1))
 
-        for token, string in token_source:
-            count = string.count("\n")
-            for part in string.split("\n"):
-                if count:
-                    part += "\n"
-                    count -= 1
-                self.data.append(FormatBlock(pos, self.styles[token], len(part)))
-                pos += len(part)
+    def touch(self, number: int) -> None:
+        """
+        Mark block summary as outdated
+        :param int number: block number
+        """
+        if self.tree is not None:
+            self.touched.add(number)
+
+    @staticmethod
+    def summary(block: QTextBlock) -> tuple:
+        """
+        Summarize brackets of the block
+        """
+        text = block.text()
+        return summarize(text, Highlighter.block_brackets(block, text))
+
+    def refresh(self) -> BracketTree:
+        """
+        Bring the tree in line with the document
+        """
+        if self.tree is not None and (len(self.tree) != self.document.blockCount()
+                                      or len(self.touched) * 8 > self.document.blockCount()):
+            self.tree = None
+        if self.tree is None:
+            summaries = []
+            block = self.document.firstBlock()
+            while block.isValid():
+                summaries.append(self.summary(block))
+                block = block.next()
+            self.tree = BracketTree(summaries)
+            self.block_count = self.document.blockCount()
+        else:
+            for number in self.touched:
+                self.tree.set(number, self.summary(self.document.findBlockByNumber(number)))
+        self.touched.clear()
+        return self.tree
 
-            # Now each symbol's style is recalculated and stored. It can be optimized:
-            # 1. You can store not each symbol, but groups of symbols. As token_source gives. Not so hard.
-            # ^^ Done. 13sec -> 9sec = x1.3 speedup
-            # 2. Highlight not whole file. Highlighter works only with current line really, but without
-            # formatting the whole file
-            #    something can be lost. For example multiline strings highlighting. Ideas needed.
-        self.data.append(FormatBlock(pos, None, 0))
+    def find(self, number: int, bracket: str, depth: int, step: int) -> int | None:
+        """
+        Find block with matching bracket
+        :param int number: number of block with the bracket
+        :param str bracket: the bracket
+        :param int depth: number of brackets left unmatched at the end (or start if step is -1) of the block
+        :param int step: 1 to look for closing bracket in following blocks, -1 for opening one in previous blocks
+        :return: block number or None if there is no matching bracket
+        """
+        tree = self.refresh()
+        if step == 1:
+            return tree.find_closing(number, bracket, depth)
+        return tree.find_opening(number, bracket, depth)
 
 
 class Highlighter(QSyntaxHighlighter):
     """
-    Class for syntax highlighting
+    Class for syntax highlighting.
+
+    Every block is lexed on its own, starting with the lexer state the previous block ended with.
+    End state is stored as block state, so Qt continues to the following blocks only while it changes
+    (e.g. when multiline string is opened or closed). Long runs of blocks are left to `HighlightScheduler`.
     """
 
-    def __init__(self, text_edit: QTextEdit, formatter: QFormatter, language: str):
+    def __init__(self, text_edit: QTextEdit, formatter: QFormatter, lexer: Lexer):
         self.text_edit = text_edit
+        brackets = BracketIndex(text_edit.document())
         QSyntaxHighlighter.__init__(self, text_edit.document())
-        self.lexer = get_lexer_by_name(language)
+        self.brackets = brackets
+        self.lexer = lexer
+        self.states = get_state_table(lexer)
         self.formatter = formatter
+        self.scheduler = HighlightScheduler(self)
         self.source_keyPressEvent = self.text_edit.keyPressEvent
         self.text_edit.keyPressEvent = self.custom_keyPressEvent
         self.source_mousePressEvent = self.text_edit.mousePressEvent
@@ -135,36 +540,32 @@ class Highlighter(QSyntaxHighlighter):
     def custom_keyPressEvent(self, event: QEvent):
         self.source_keyPressEvent(event)
         self.check_brackets()
-        if event.key() in (Qt.Key_QuoteDbl, 39):  # 39 = single quote
-            cursor = self.text_edit.textCursor()
-            text = cursor.block().text()
-            pos = cursor.positionInBlock()
-            part = text[pos - 3:pos]
-            if part in ("'''", '"""'):
-                self.rehighlight()
-        elif event.key() in (Qt.Key_Backspace, Qt.Key_Delete):
-            cursor = self.text_edit.textCursor()
-            text = cursor.block().text()
-            pos = cursor.positionInBlock()
-            if pos != 0 and text[pos - 1] in ("'", '"'):
-                self.rehighlight()
 
     def highlightBlock(self, text):
         """
         Get's called when some text in file is updated and applies highlighting to it
         """
-        block = self.currentBlock()
-        position = block.position()
-        end = position + block.length()
-        text = self.document().toPlainText()
-        highlight(text, self.lexer, self.formatter)
-        data = self.formatter.data
-        index = bisect.bisect(data, position) - 1
-        while data[index].position < end and data[index].style is not None:
-            self.setFormat(data[index].position - position, data[index].length, data[index].style)
-            index += 1
+        start_state = self.previousBlockState()
+        data = self.currentBlockUserData()
+        if not isinstance(data, BlockData) or data.text != text or data.start_state != start_state:
+            if self.scheduler.over_budget():
+                # Leave the rest to the tokenizer thread. Block state is kept, so Qt stops here
+                self.scheduler.invalidate(self.currentBlock().blockNumber())
+                if isinstance(data, BlockData) and data.text == text:
+                    self.apply_tokens(data.tokens)
+                return
+            data = self.scheduler.cached_block(self.currentBlock().blockNumber(), text, start_state)
+            if data is None:
+                tokens, end_stack = lex_line(self.lexer, text, self.states.get(start_state))
+                data = BlockData(text, start_state, self.states.intern(end_stack), tokens)
+            self.setCurrentBlockUserData(data)
+            self.brackets.touch(self.currentBlock().blockNumber())
+        self.apply_tokens(data.tokens)
+        self.setCurrentBlockState(data.end_state)
+
+        position = self.currentBlock().position()
         for bracket_pos in self.formatter.brackets:
-            if not bracket_pos:
+            if bracket_pos is None:
                 continue
             block_right = self.currentBlock().position() + self.currentBlock().length()
             if self.currentBlock().position() <= bracket_pos < block_right:
@@ -172,11 +573,31 @@ class Highlighter(QSyntaxHighlighter):
                 text_format.setBackground(QColor(["orange", "red"][self.formatter.brackets.count(None) == 1]))
                 self.setFormat(bracket_pos - position, 1, text_format)
 
+    def load(self, text: str, document_id: str) -> None:
+        """
+        Should be called before new text is set into the document. Reuses cached tokenization of the same text
+        :param str text: text that is about to be set
+        :param str document_id: identifier of the document, e.g. file path
+        """
+        self.scheduler.load(text, document_id)
+
+    def apply_tokens(self, tokens: Tokens) -> None:
+        """
+        Set formats of current block
+        :param Tokens tokens: tokens of the block
+        """
+        self.formatter.update_style()
+        get_format = self.formatter.get_format
+        for position, length, type_id in zip(tokens.positions, tokens.lengths, tokens.types):
+            text_format = get_format(type_id)
+            if text_format is not None:
+                self.setFormat(position, length, text_format)
+
     def rehighlight(self):
-        start = time.perf_counter()
-        highlight.CACHE["style"] = None
-        super().rehighlight()
-        logger.info(f"Full rehighlight took {time.perf_counter() - start:.2f}sec")
+        """
+        Reapply highlighting to the whole document in background, visible blocks first
+        """
+        self.scheduler.restyle()
 
     def check_brackets(self):
         """
@@ -186,50 +607,75 @@ class Highlighter(QSyntaxHighlighter):
         .( -> ). -> (. -> .)
         where . is cursor position
         """
-        text = self.text_edit.toPlainText()
-        pos = self.text_edit.textCursor().position()
-        current_text = text[pos - 1:pos + 1].ljust(2, " ")
-        if "(" not in current_text and ")" not in current_text:
-            positions = self.formatter.brackets
-            self.formatter.brackets = (None, None)
-            self.run_bracketblocks_rehighlight(positions)
-            return
-        if current_text[1] == "(":
-            self.formatter.brackets = (pos, self.find_bracket(text, pos, 1))
-        elif current_text[0] == ")":
-            self.formatter.brackets = (self.find_bracket(text, pos - 1, -1), pos - 1)
-        elif current_text[0] == "(":
-            self.formatter.brackets = (pos - 1, self.find_bracket(text, pos - 1, 1))
-        elif current_text[1] == ")":
-            self.formatter.brackets = (self.find_bracket(text, pos, -1), pos)
+        cursor = self.text_edit.textCursor()
+        block = cursor.block()
+        text = block.text()
+        pos = cursor.positionInBlock()
+        brackets = self.block_brackets(block, text)
+        previous_positions = self.formatter.brackets
+        self.formatter.brackets = (None, None)
+        for index, step in ((pos, 1), (pos - 1, -1), (pos - 1, 1), (pos, -1)):
+            if index < 0 or index not in brackets or (text[index] in BRACKETS) != (step == 1):
+                continue
+            match = self.find_bracket(block, index, step)
+            if step == 1:
+                self.formatter.brackets = (block.position() + index, match)
+            else:
+                self.formatter.brackets = (match, block.position() + index)
+            break
 
-        self.run_bracketblocks_rehighlight(self.formatter.brackets)
+        self.run_bracketblocks_rehighlight(previous_positions + self.formatter.brackets)
 
     def run_bracketblocks_rehighlight(self, positions):
-        positions = [x for x in positions if x is not None]
-        if not positions:
-            return
-        block = self.text_edit.document().firstBlock()
-        while True:
-            for bracket_pos in positions:
-                if block.position() <= bracket_pos < block.position() + block.length():
-                    self.rehighlightBlock(block)
-            if block == self.text_edit.document().lastBlock():
-                break
-            block = block.next()
+        document = self.text_edit.document()
+        blocks = {document.findBlock(position).blockNumber() for position in positions if position is not None}
+        for number in blocks:
+            self.rehighlightBlock(document.findBlockByNumber(number))
 
-    def find_bracket(self, text, index, step):
+    @staticmethod
+    def block_brackets(block: QTextBlock, text: str) -> array:
         """
-        Go right through the text and return closing bracket position
+        Bracket positions in block. Taken from block tokens, so brackets in strings and comments are skipped
+        """
+        data = block.userData()
+        if isinstance(data, BlockData) and data.text == text:
+            return data.tokens.brackets
+        return find_brackets(text)
+
+    def find_bracket(self, block: QTextBlock, index: int, step: int) -> int | None:
+        """
+        Find position of the bracket matching the one at `index` of `block` in document.
+        Brackets of the block are walked, other blocks are looked up in `BracketIndex`.
 
         Step is 1 to find closing bracket and -1 to find opening bracket
         """
-        brackets = 0
-        while 0 <= index < len(text):
-            brackets += {"(": 1, ")": -1}.get(text[index], 0)
-            if brackets == 0:
-                return index
-            index += step
+        char = block.text()[index]
+        opening = char if step == 1 else next(key for key, value in BRACKETS.items() if value == char)
+        depth_change = {opening: step, BRACKETS[opening]: -step}
+        position, depth = self.scan_brackets(block, index, step, depth_change, 0)
+        if position is not None:
+            return position
+        number = self.brackets.find(block.blockNumber(), char, depth, step)
+        if number is None:
+            return None
+        block = self.document().findBlockByNumber(number)
+        return self.scan_brackets(block, None, step, depth_change, depth)[0]
+
+    def scan_brackets(self, block: QTextBlock, index: int | None, step: int, depth_change: dict[str, int],
+                      depth: int) -> tuple[int | None, int]:
+        """
+        Walk brackets of the block in direction of the step, starting from `index` or the edge of the block
+        :return: position of the bracket bringing depth to 0 in document (or None) and depth at the end of walk
+        """
+        text = block.text()
+        brackets = self.block_brackets(block, text)
+        for position in (brackets if step == 1 else reversed(brackets)):
+            if index is not None and (position - index) * step < 0:
+                continue
+            depth += depth_change.get(text[position], 0)
+            if depth == 0:
+                return block.position() + position, depth
+        return None, depth
 
 
 class ColorListWidget(QWidget):
@@ -345,25 +791,38 @@ class CustomStyle:
     https://pygments.org/docs/tokens/
     """
     styles = dict(get_style_by_name("monokai"))
+    version = 0
+    """Incremented every time styles are changed"""
 
     @staticmethod
     def get_style_by_name(name):
         """
         Changes current style by loading pre-built theme
         """
+        changed = False
         for key, value in get_style_by_name(name):
-            CustomStyle.styles[key] = value
+            if CustomStyle.styles.get(key) != value:
+                CustomStyle.styles[key] = value
+                changed = True
+        if changed:
+            CustomStyle.version += 1
 
     @staticmethod
     def get_style_by_dict(styling_dict):
         """
         Changes current style by iterating over dictionary (coming from color dialog)
         """
+        changed = False
         for token, styling in styling_dict.items():
-            CustomStyle.styles[token] = {
+            style = {
                 "color": styling["foreground_button"].text().strip("#").lower() or None,
                 "bgcolor": styling["background_button"].text().strip("#").lower() or None,
                 "bold": styling["bold"].isChecked(),
                 "italic": styling["italic"].isChecked(),
                 "underline": styling["underline"].isChecked()
             }
+            if any(CustomStyle.styles[token].get(key) != value for key, value in style.items()):
+                CustomStyle.styles[token] = style
+                changed = True
+        if changed:
+            CustomStyle.version += 1
@@ -0,0 +1,379 @@
+"""
+Line-by-line lexing on top of pygments.
+
+Pygments lexers are written to process the whole text at once. For incremental highlighting
+each line is lexed on its own, starting from the lexer state stack the previous line ended with.
+Stacks are interned to integers so they can be stored as `QTextBlock` user state.
+
+Pygments rules matching across line breaks can't match a single line. Block comments and docstrings,
+which such rules match, are continued on the following lines with synthetic states, see `lex_line`.
+
+Tokens of a line are kept in parallel integer arrays, token types are interned to ids
+which double as style ids of `QFormatter`. Positions of brackets outside of strings and
+comments are collected together with tokens and serve as bracket index of the line.
+"""
+import re
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, NamedTuple
+
+from pygments.lexer import ExtendedRegexLexer, Lexer, RegexLexer
+from pygments.token import Comment, Error, String, Whitespace, _TokenType
+
+ROOT_STATE = ("root",)
+
+CONTINUATION = "\0"
+"""
+Prefix of synthetic states of tokens continued on the next line:
+followed by id of the token type, the prefix again and the closing delimiter
+"""
+
+BLOCK_COMMENTS = {"/*": "*/"}
+"""Opening delimiters of block comments mapped to closing ones"""
+
+BLOCK_COMMENTS_START = {opening[0] for opening in BLOCK_COMMENTS}
+
+DOCSTRING_RULE = re.compile(r'"""\(\?:\.\|\\n\)\*\?"""')
+"""Matches the pattern of pygments rule for docstrings spanning lines"""
+
+DOCSTRING_RE = re.compile(r'(\s*)([rRuUbB]{,2})("""|\'\'\')')
+
+BRACKETS = {"(": ")", "[": "]", "{": "}"}
+"""Opening brackets mapped to closing ones"""
+
+BRACKET_RE = re.compile(r"[()\[\]{}]")
+
+
+class TokenTypeTable:
+    """
+    Interns pygments token types to ids
+    """
+
+    def __init__(self):
+        self.types: list[_TokenType] = []
+        self.ids: dict[_TokenType, int] = {}
+        self.literal: list[bool] = []
+        """Whether tokens of the type are strings or comments"""
+        self.lock = Lock()
+
+    def intern(self, token: _TokenType) -> int:
+        """
+        Get id of the token type, registering it if needed
+        :param _TokenType token: pygments token type
+        """
+        type_id = self.ids.get(token)
+        if type_id is None:
+            with self.lock:
+                type_id = self.ids.get(token)
+                if type_id is None:
+                    type_id = len(self.types)
+                    self.types.append(token)
+                    self.literal.append(token in String or token in Comment)
+                    self.ids[token] = type_id
+        return type_id
+
+    def get(self, type_id: int) -> _TokenType:
+        """
+        Get token type by id
+        :param int type_id: interned id
+        """
+        return self.types[type_id]
+
+
+TOKEN_TYPES = TokenTypeTable()
+
+
+class Tokens(NamedTuple):
+    """
+    Tokens of a line as parallel arrays
+    """
+    positions: array
+    lengths: array
+    types: array
+    brackets: array
+    """Positions of brackets in code"""
+
+
+def find_brackets(text: str, positions: array | None = None, types: array | None = None) -> array:
+    """
+    Find positions of brackets in line, skipping ones inside strings and comments if tokens are given
+    :param str text: line
+    :param array positions: token positions
+    :param array types: token type ids
+    """
+    brackets = array("I")
+    for match in BRACKET_RE.finditer(text):
+        position = match.start()
+        if positions is not None:
+            index = bisect_right(positions, position) - 1
+            if index >= 0 and TOKEN_TYPES.literal[types[index]]:
+                continue
+        brackets.append(position)
+    return brackets
+
+
+class StateTable:
+    """
+    Interns lexer state stacks. Id 0 is always the root state.
+    Can be shared between GUI thread and tokenizer thread
+    """
+
+    def __init__(self):
+        self.states: list[tuple[str, ...]] = [ROOT_STATE]
+        self.ids: dict[tuple[str, ...], int] = {ROOT_STATE: 0}
+        self.lock = Lock()
+
+    def intern(self, stack: tuple[str, ...]) -> int:
+        """
+        Get id of the state stack, registering it if needed
+        :param tuple stack: lexer state stack
+        """
+        state_id = self.ids.get(stack)
+        if state_id is None:
+            with self.lock:
+                state_id = self.ids.get(stack)
+                if state_id is None:
+                    state_id = len(self.states)
+                    self.states.append(stack)
+                    self.ids[stack] = state_id
+        return state_id
+
+    def get(self, state_id: int) -> tuple[str, ...]:
+        """
+        Get state stack by id. Negative ids (block without state) mean root state
+        :param int state_id: interned id
+        """
+        if state_id < 0:
+            return ROOT_STATE
+        return self.states[state_id]
+
+
+STATE_TABLES: dict[Lexer, StateTable] = {}
+
+
+def get_state_table(lexer: Lexer) -> StateTable:
+    """
+    State table shared by all highlighters using the lexer, so their states and cached results are compatible
+    :param Lexer lexer: pygments lexer
+    """
+    if lexer not in STATE_TABLES:
+        STATE_TABLES[lexer] = StateTable()
+    return STATE_TABLES[lexer]
+
+
+class TokenCache:
+    """
+    LRU cache of whole document tokenization results keyed by (document id, revision).
+    Lets tabs and editor windows opening an already tokenized document skip lexing
+    """
+
+    def __init__(self, size: int = 16):
+        self.size = size
+        self.entries: OrderedDict[tuple, tuple[list[str], list[tuple[Tokens, int]]]] = OrderedDict()
+
+    def get(self, key: tuple) -> tuple[list[str], list[tuple[Tokens, int]]] | None:
+        """
+        Get lines and their (tokens, end state) by key
+        :param tuple key: (document id, revision)
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, lines: list[str], results: list[tuple[Tokens, int]]) -> None:
+        """
+        Store tokenization result of a document, evicting least recently used ones
+        :param tuple key: (document id, revision)
+        :param list[str] lines: document lines
+        :param list results: (tokens, end state) of every line
+        """
+        self.entries[key] = (lines, results)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+TOKEN_CACHE = TokenCache()
+
+
+def supports_states(lexer: Lexer) -> bool:
+    """
+    Checks whether lexing of the lexer can be resumed from a state stack
+    """
+    return isinstance(lexer, RegexLexer) and not isinstance(lexer, ExtendedRegexLexer)
+
+
+DOCSTRING_LEXERS: dict[type, bool] = {}
+
+
+def has_docstrings(lexer: Lexer) -> bool:
+    """
+    Checks whether root state of the lexer has rule for docstrings spanning lines, like python lexer does
+    """
+    lexer_type = type(lexer)
+    if lexer_type not in DOCSTRING_LEXERS:
+        rules = lexer._tokens["root"]  # pylint: disable=protected-access
+        patterns = [rexmatch.__self__.pattern for rexmatch, _, _ in rules]
+        DOCSTRING_LEXERS[lexer_type] = any(DOCSTRING_RULE.search(pattern) for pattern in patterns)
+    return DOCSTRING_LEXERS[lexer_type]
+
+
+def continued_state(token: _TokenType, closing: str) -> str:
+    """
+    Synthetic state of a token continued until the closing delimiter
+    """
+    return f"{CONTINUATION}{TOKEN_TYPES.intern(token)}{CONTINUATION}{closing}"
+
+
+def match_open_comment(statetokens: list, text: str, pos: int) -> tuple[_TokenType, str] | None:
+    """
+    Find block comment starting at the position and left open at the end of line.
+    Rules of the state are tried on the line with the comment closed, so it is lexed as a comment
+    only if the lexer would do so on the whole text
+    :param list statetokens: rules of the current state
+    :param str text: line with line break
+    :param int pos: position in line
+    :return: token type of the comment and its closing delimiter or None
+    """
+    for opening, closing in BLOCK_COMMENTS.items():
+        if text.startswith(opening, pos) and text.find(closing, pos + len(opening)) == -1:
+            probe = text[:-1] + closing + "\n"
+            for rexmatch, action, _ in statetokens:
+                match = rexmatch(probe, pos)
+                if match:
+                    if type(action) is _TokenType and action in Comment \
+                            and match.end() >= len(probe) - 1:  # pylint: disable=unidiomatic-typecheck
+                        return action, closing
+                    return None
+    return None
+
+
+def lex_line(lexer: Lexer, text: str, stack: tuple[str, ...] = ROOT_STATE) -> tuple[Tokens, tuple[str, ...]]:
+    """
+    Lex a single line starting from given state stack.
+
+    Mirrors `RegexLexer.get_tokens_unprocessed`, but also returns the stack the line ended with.
+    Token post-processing done by lexers overriding `get_tokens_unprocessed` is not applied.
+    Rules matching across line breaks fall back to their single-line alternatives, except for two kinds
+    of tokens, which are continued with a synthetic state until their closing delimiter as pygments matches
+    them: block comments left open at the end of line (C-family `/*`) and docstrings starting a line
+    (python lexer). Lexers which can't be resumed are run on the line alone.
+
+    :param Lexer lexer: pygments lexer
+    :param str text: line without line break
+    :param tuple stack: state stack at the beginning of the line
+    :return: tokens and state stack at the end of the line
+    """
+    positions, lengths, types = array("I"), array("I"), array("I")
+    intern = TOKEN_TYPES.intern
+    if not supports_states(lexer):
+        for pos, token, value in lexer.get_tokens_unprocessed(text + "\n"):
+            positions.append(pos)
+            lengths.append(len(value))
+            types.append(intern(token))
+        return Tokens(positions, lengths, types, find_brackets(text, positions, types)), ROOT_STATE
+
+    line = text
+    text += "\n"
+    pos = 0
+    tokendefs = lexer._tokens  # pylint: disable=protected-access
+    statestack = list(stack)
+    if statestack[-1].startswith(CONTINUATION):
+        _, type_id, closing = statestack[-1].split(CONTINUATION, 2)
+        end = line.find(closing)
+        positions.append(0)
+        types.append(int(type_id))
+        if end == -1:
+            lengths.append(len(text))
+            return Tokens(positions, lengths, types, array("I")), stack
+        pos = end + len(closing)
+        lengths.append(pos)
+        statestack.pop()
+    elif statestack == ["root"] and has_docstrings(lexer):
+        match = DOCSTRING_RE.match(line)
+        if match and line.find(match.group(3), match.end()) == -1:
+            for group, token in enumerate((Whitespace, String.Affix, String.Doc), 1):
+                if match.group(group):
+                    positions.append(match.start(group))
+                    lengths.append(len(text) - match.start(group) if token is String.Doc else len(match.group(group)))
+                    types.append(intern(token))
+            return Tokens(positions, lengths, types, array("I")), (*stack, continued_state(String.Doc, match.group(3)))
+    statetokens = tokendefs[statestack[-1]]
+    while pos < len(text):
+        if text[pos] in BLOCK_COMMENTS_START:
+            comment = match_open_comment(statetokens, text, pos)
+            if comment is not None:
+                positions.append(pos)
+                lengths.append(len(text) - pos)
+                types.append(intern(comment[0]))
+                statestack.append(continued_state(*comment))
+                break
+        for rexmatch, action, new_state in statetokens:
+            match = rexmatch(text, pos)
+            if match:
+                if action is not None:
+                    if type(action) is _TokenType:  # pylint: disable=unidiomatic-typecheck
+                        positions.append(pos)
+                        lengths.append(match.end() - pos)
+                        types.append(intern(action))
+                    else:
+                        for index, token, value in action(lexer, match):
+                            positions.append(index)
+                            lengths.append(len(value))
+                            types.append(intern(token))
+                pos = match.end()
+                if new_state is not None:
+                    if isinstance(new_state, tuple):
+                        for state in new_state:
+                            if state == "#pop":
+                                if len(statestack) > 1:
+                                    statestack.pop()
+                            elif state == "#push":
+                                statestack.append(statestack[-1])
+                            else:
+                                statestack.append(state)
+                    elif isinstance(new_state, int):
+                        if abs(new_state) >= len(statestack):
+                            del statestack[1:]
+                        else:
+                            del statestack[new_state:]
+                    elif new_state == "#push":
+                        statestack.append(statestack[-1])
+                    statetokens = tokendefs[statestack[-1]]
+                break
+        else:
+            if text[pos] == "\n":
+                statestack = list(ROOT_STATE)
+                statetokens = tokendefs["root"]
+                token = Whitespace
+            else:
+                token = Error
+            positions.append(pos)
+            lengths.append(1)
+            types.append(intern(token))
+            pos += 1
+    return Tokens(positions, lengths, types, find_brackets(line, positions, types)), tuple(statestack)
+
+
+def lex_lines(lexer: Lexer, lines: list[str], states: StateTable, start_state: int,
+              is_stale: Callable[[], bool] = lambda: False) -> list[tuple[Tokens, int]] | None:
+    """
+    Lex consecutive lines. Meant to be run in tokenizer thread on a document snapshot
+    :param Lexer lexer: pygments lexer
+    :param list[str] lines: lines without line breaks
+    :param StateTable states: state table of the highlighter
+    :param int start_state: interned state at the beginning of the first line
+    :param is_stale: checked periodically, lexing is abandoned once it returns True
+    :return: (tokens, interned end state) for every line or None if abandoned
+    """
+    results = []
+    stack = states.get(start_state)
+    for index, line in enumerate(lines):
+        if index % 500 == 0 and is_stale():
+            return None
+        tokens, stack = lex_line(lexer, line, stack)
+        results.append((tokens, states.intern(stack)))
+    return results
@@ -1,11 +1,10 @@
-import jedi
-from jedi.api.classes import Name
 from PySide6 import QtCore, QtWidgets
 from PySide6.QtCore import QEvent, Qt
-from PySide6.QtGui import QKeyEvent
+from PySide6.QtGui import QKeyEvent, QTextCursor
 from PySide6.QtWidgets import QTextEdit
 
-from ide.ui.contextmenus.jedi import AutocompleteMenu, ReferencesMenu
+from ide.expansion.completion import CompletionService
+from ide.ui.contextmenus.jedi import ReferencesMenu
 
 
 class TextEdit(QTextEdit):
@@ -30,67 +29,47 @@ class TextEdit(QTextEdit):
     def __init__(self, editor):
         super().__init__()
         self.editor = editor
+        self.path: str | None = None
+        """Path to edited file"""
+        self.completion = CompletionService(self)
+
+    def line_before_cursor(self) -> str | None:
+        """
+        Text of the current line to the left of the cursor. Only the current block is read,
+        so the cost doesn't depend on document size
+        :return: None if cursor is at the start of the document
+        """
+        cursor = self.textCursor()
+        if cursor.position() == 0:
+            return None
+        return cursor.block().text()[:cursor.positionInBlock()]
+
+    @staticmethod
+    def leading_spaces(text: str) -> int:
+        """
+        Number of spaces at the start of the text
+        """
+        return len(text) - len(text.lstrip(" "))
 
     def keyPressEvent(self, event):
         """Overwrites keyPressEvent for tab key. Replaces tab with 4 spaces.
         Supports auto indentation"""
         if event.key() == Qt.Key_Tab:
-            cursor_pos = self.textCursor().position() - 1
-
-            if cursor_pos >= 0:
-                text = self.toPlainText()
-
-                space_count = 0
-
-                char = text[cursor_pos]
-                i = cursor_pos
-                while i >= 0 and char != "\n":
-                    if char == " ":
-                        space_count += 1
-                    else:
-                        # Some text detected to the left of the cursor, add default 4 spaces
-                        space_count = 0
-                        break
-
-                    i -= 1
-                    char = text[i]
-
-                if space_count == 0:
-                    event = QKeyEvent(QEvent.KeyPress, Qt.Key_Space, Qt.KeyboardModifiers(), "    ")
-                else:
-                    space_count = (space_count // 4 + 1) * 4 - space_count
-                    event = QKeyEvent(QEvent.KeyPress, Qt.Key_Space, Qt.KeyboardModifiers(), " " * space_count)
-
-            else:
+            line = self.line_before_cursor()
+            space_count = len(line) if line and self.leading_spaces(line) == len(line) else 0
+            if space_count == 0:
+                # Nothing to align with, add default 4 spaces
                 event = QKeyEvent(QEvent.KeyPress, Qt.Key_Space, Qt.KeyboardModifiers(), "    ")
+            else:
+                space_count = (space_count // 4 + 1) * 4 - space_count
+                event = QKeyEvent(QEvent.KeyPress, Qt.Key_Space, Qt.KeyboardModifiers(), " " * space_count)
 
         # Auto indentation
         elif event.key() == Qt.Key_Return:
-            cursor_pos = self.textCursor().position() - 1
-
-            if cursor_pos >= 0:
-                text = self.toPlainText()
-
-                char = text[cursor_pos]
-                i = cursor_pos
-                while i >= 0 and char == " ":
-                    i -= 1
-                    char = text[i]
-
-                space_count = 0
-
-                i = cursor_pos
-                char = text[i]
-                while i >= 0 and char != "\n":
-                    if char == " ":
-                        space_count += 1
-                    else:
-                        space_count = 0
-
-                    i -= 1
-                    char = text[i]
-
-                if text[cursor_pos] == ":":
+            line = self.line_before_cursor()
+            if line is not None:
+                space_count = self.leading_spaces(line)
+                if line.endswith(":"):
                     space_count += 4
 
                 super().keyPressEvent(QKeyEvent(QEvent.KeyPress, Qt.Key_Return, Qt.KeyboardModifiers(), ""))
@@ -98,72 +77,51 @@ class TextEdit(QTextEdit):
 
         # Remove indentation layers automatically
         elif event.key() == Qt.Key_Backspace:
-            cursor_pos = self.textCursor().position() - 1
-
-            if cursor_pos >= 0:
-                text = self.toPlainText()
-
-                space_count = 0
-
-                i = cursor_pos
-                char = text[i]
-                while i >= 0 and char != "\n":
-                    if char == " ":
-                        space_count += 1
-                    else:
-                        space_count = 0  # Some text detected to the left of the cursor, don't multiply backspaces
-                        break
-
-                    i -= 1
-                    char = text[i]
-
-                if space_count != 0 and space_count % 4 == 0:
-                    for _ in range(3):
-                        super().keyPressEvent(QKeyEvent(QEvent.KeyPress, Qt.Key_Backspace, Qt.NoModifier))
+            line = self.line_before_cursor()
+            # Don't multiply backspaces if some text is to the left of the cursor
+            if line and self.leading_spaces(line) == len(line) and len(line) % 4 == 0:
+                for _ in range(3):
+                    super().keyPressEvent(QKeyEvent(QEvent.KeyPress, Qt.Key_Backspace, Qt.NoModifier))
 
         super().keyPressEvent(event)
 
         if event.key() not in self.autocompletion_ignore_keys:
-            script = jedi.Script(
-                code=self.toPlainText(),
-                project=jedi.Project(self.editor.project.root)
-            )
-            completions = script.complete(
-                self.textCursor().blockNumber() + 1,
-                self.textCursor().positionInBlock()
-            )
-            if completions:
-                AutocompleteMenu(self, completions).show()
+            self.completion.request()
+        else:
+            self.completion.cancel()
 
     def mousePressEvent(self, event):
         super().mousePressEvent(event)
+        self.completion.cancel()
         modifiers = QtWidgets.QApplication.keyboardModifiers()
-        if modifiers & QtCore.Qt.ControlModifier:
+        if modifiers & QtCore.Qt.ControlModifier and self.path in self.editor.analysis.documents:
             cursor = self.cursorForPosition(event.pos())
-            script = jedi.Script(
-                code=self.toPlainText(),
-                project=jedi.Project(self.editor.project.root)
-            )
+            params = {"path": self.path, "line": cursor.blockNumber() + 1, "column": cursor.positionInBlock()}
             if modifiers & QtCore.Qt.AltModifier:
-                references = script.get_references(
-                    cursor.blockNumber() + 1,
-                    cursor.positionInBlock(),
-                    include_builtins=False
-                )
-                ReferencesMenu(self, references).show()
+                params["limit"] = ReferencesMenu.LIMIT
+                if self.editor.symbol_index is not None:
+                    cursor.select(QTextCursor.WordUnderCursor)
+                    files = self.editor.symbol_index.files_with_identifier(cursor.selectedText())
+                    if files is not None:
+                        params["files"] = sorted(files.union(self.editor.analysis.documents))
+                self.editor.analysis.request("references", params, self.show_references)
             else:
-                gotos = script.goto(
-                    cursor.blockNumber() + 1,
-                    cursor.positionInBlock(),
-                    follow_imports=True
-                )
-                if gotos:
-                    goto: Name = gotos[0]
-                    if goto.module_path:
-                        self.editor.open_file(str(goto.module_path))
-                    tab_index = self.editor.ui.workspace_tabs.currentIndex()
-                    opened_tab = list(self.editor.opened_workspace_tabs.values())[tab_index]
-                    cursor = opened_tab.text_edit.textCursor()
-                    cursor.setPosition(0)
-                    opened_tab.text_edit.setTextCursor(cursor)
-                    opened_tab.text_edit.find(goto.description)
+                self.editor.analysis.request("goto", params, self.go_to_definition)
+
+    def show_references(self, references: list[dict]) -> None:
+        """Utility method. Called with response of analysis worker"""
+        if references:
+            ReferencesMenu(self, references).show()
+
+    def go_to_definition(self, gotos: list[dict]) -> None:
+        """Utility method. Called with response of analysis worker"""
+        if gotos:
+            goto = gotos[0]
+            if goto["module_path"]:
+                self.editor.open_file(goto["module_path"])
+            tab_index = self.editor.ui.workspace_tabs.currentIndex()
+            opened_tab = list(self.editor.opened_workspace_tabs.values())[tab_index]
+            cursor = opened_tab.text_edit.textCursor()
+            cursor.setPosition(0)
+            opened_tab.text_edit.setTextCursor(cursor)
+            opened_tab.text_edit.find(goto["description"])
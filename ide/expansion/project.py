@@ -36,7 +36,8 @@ class Project:
                 "last_opened": {
                     "files": [],
                     "index": -1
-                }
+                },
+                "exclude": []
             }
         if default_run_profiles_preset is None:
             default_run_profiles_preset = []
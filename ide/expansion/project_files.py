@@ -0,0 +1,268 @@
+"""
+Listing of project files shared by search, search index and reformatting.
+
+Project is walked with `os.scandir` once, directories and files matched by exclude rules are skipped.
+Exclude rules come from `.gitignore` files found in the project (patterns of nested ones apply to their
+own directory), `exclude` list of project config and `DEFAULT_EXCLUDES`. The listing is cached and kept
+up to date from filesystem events, see `ProjectFiles.handle_event`.
+"""
+import os
+import re
+from threading import Lock
+
+DEFAULT_EXCLUDES = [".git/", ".ide/", "venv/", ".venv/", "__pycache__/"]
+
+
+class IgnoreRule:
+    """
+    Single `.gitignore` pattern
+    """
+
+    def __init__(self, pattern: str, base: str = ""):
+        """
+        :param str pattern: pattern line
+        :param str base: directory of the `.gitignore` relative to project root, "" for root
+        """
+        self.base = base
+        self.negated = pattern.startswith("!")
+        if self.negated or pattern.startswith("\\"):
+            pattern = pattern[1:]
+        self.directory_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        expression = self.translate(pattern)
+        if not anchored:
+            expression = "(?:.*/)?" + expression
+        self.regex = re.compile(expression)
+
+    @staticmethod
+    def translate(pattern: str) -> str:
+        """
+        Convert glob pattern to regular expression
+        :param str pattern: glob pattern without leading and trailing slashes
+        """
+        result = []
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith("**/", i):
+                result.append("(?:.*/)?")
+                i += 3
+            elif pattern.startswith("**", i):
+                result.append(".*")
+                i += 2
+            elif pattern[i] == "*":
+                result.append("[^/]*")
+                i += 1
+            elif pattern[i] == "?":
+                result.append("[^/]")
+                i += 1
+            elif pattern[i] == "[" and "]" in pattern[i + 1:]:
+                end = pattern.index("]", i + 1)
+                content = pattern[i + 1:end]
+                if content.startswith("!"):
+                    content = "^" + content[1:]
+                result.append(f"[{content}]")
+                i = end + 1
+            elif pattern[i] == "\\" and i + 1 < len(pattern):
+                result.append(re.escape(pattern[i + 1]))
+                i += 2
+            else:
+                result.append(re.escape(pattern[i]))
+                i += 1
+        return "".join(result)
+
+    def matches(self, relative_path: str, is_dir: bool) -> bool:
+        """
+        Checks whether the pattern matches the path
+        :param str relative_path: path relative to project root with "/" separators
+        :param bool is_dir: whether the path is a directory
+        """
+        if self.directory_only and not is_dir:
+            return False
+        if self.base:
+            if not relative_path.startswith(self.base + "/"):
+                return False
+            relative_path = relative_path[len(self.base) + 1:]
+        return self.regex.fullmatch(relative_path) is not None
+
+
+def parse_rules(lines: list[str], base: str = "") -> list[IgnoreRule]:
+    """
+    Parse `.gitignore` contents
+    :param list[str] lines: lines of the file
+    :param str base: directory of the file relative to project root
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip("\n").rstrip()
+        if line and not line.startswith("#"):
+            rules.append(IgnoreRule(line, base))
+    return rules
+
+
+def is_ignored(rules: list[IgnoreRule], relative_path: str, is_dir: bool) -> bool:
+    """
+    Checks path against rules, the last matching rule wins
+    :param list[IgnoreRule] rules: rules in order of priority
+    :param str relative_path: path relative to project root with "/" separators
+    :param bool is_dir: whether the path is a directory
+    """
+    ignored = False
+    for rule in rules:
+        if rule.negated == ignored and rule.matches(relative_path, is_dir):
+            ignored = not rule.negated
+    return ignored
+
+
+class ProjectFiles:
+    """
+    Cached list of project files
+    """
+
+    def __init__(self, root: str, excludes: list[str] | None = None):
+        """
+        :param str root: project root
+        :param list[str] excludes: additional gitignore-style patterns
+        """
+        self.root = root
+        self.base_rules = parse_rules(DEFAULT_EXCLUDES + list(excludes or []))
+        self.rules: dict[str, list[IgnoreRule]] = {}
+        """Rules applying to entries of a directory, keyed by directory path relative to root"""
+        self.cache: set[str] | None = None
+        self.sorted_cache: list[str] | None = None
+        self.lock = Lock()
+
+    def relative(self, path: str) -> str:
+        """
+        Path relative to project root with "/" separators
+        :param str path: absolute path
+        """
+        relative_path = os.path.relpath(path, self.root)
+        return "" if relative_path == "." else relative_path.replace(os.sep, "/")
+
+    def read_rules(self, relative_directory: str, rules: list[IgnoreRule]) -> list[IgnoreRule]:
+        """
+        Add rules of `.gitignore` in a directory to the ones applying to the directory itself
+        :param str relative_directory: directory path relative to root
+        :param list[IgnoreRule] rules: rules applying to the directory
+        """
+        try:
+            with open(os.path.join(self.root, relative_directory, ".gitignore"), "r", encoding="utf-8",
+                      errors="ignore") as file:
+                return rules + parse_rules(file.readlines(), relative_directory)
+        except OSError:
+            return rules
+
+    def scan(self) -> None:
+        """Utility method. Should be called with lock held"""
+        files = set()
+        self.rules = {}
+        stack = [(self.root, "", self.base_rules)]
+        while stack:
+            directory, relative_directory, rules = stack.pop()
+            try:
+                with os.scandir(directory) as iterator:
+                    entries = list(iterator)
+            except OSError:
+                continue
+            if any(entry.name == ".gitignore" for entry in entries):
+                rules = self.read_rules(relative_directory, rules)
+            self.rules[relative_directory] = rules
+            for entry in entries:
+                relative_path = f"{relative_directory}/{entry.name}" if relative_directory else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if is_ignored(rules, relative_path, is_dir):
+                        continue
+                    if is_dir:
+                        stack.append((entry.path, relative_path, rules))
+                    elif entry.is_file():
+                        files.add(entry.path)
+                except OSError:
+                    continue
+        self.cache = files
+        self.sorted_cache = None
+
+    def files(self, extensions: tuple[str, ...] | None = None, path: str | None = None) -> list[str]:
+        """
+        Get sorted paths of project files
+        :param tuple extensions: extensions (without dot) of files to list, all files if not given
+        :param str path: list only files inside this directory
+        """
+        with self.lock:
+            if self.cache is None:
+                self.scan()
+            if self.sorted_cache is None:
+                self.sorted_cache = sorted(self.cache)
+            files = self.sorted_cache
+        if path is not None and os.path.normpath(path) != os.path.normpath(self.root):
+            prefix = os.path.join(path, "")
+            files = [file for file in files if file.startswith(prefix)]
+        if extensions is not None:
+            files = [file for file in files if os.path.splitext(file)[1][1:] in extensions]
+        return files
+
+    def is_included(self, path: str) -> bool:
+        """
+        Checks whether file is inside project and not excluded, by the same rules as files are listed.
+        Doesn't require the listing, e.g. for a file just saved
+        :param str path: absolute path to file
+        """
+        relative_path = self.relative(path)
+        if relative_path in ("", "..") or relative_path.startswith("../"):
+            return False
+        parts = relative_path.split("/")
+        directories = ["/".join(parts[:depth]) for depth in range(len(parts))]
+        with self.lock:
+            # Rules are outdated when listing was dropped, e.g. after `.gitignore` was changed
+            known_rules = [self.rules.get(directory) if self.cache is not None else None for directory in directories]
+        rules = self.base_rules
+        for directory, directory_rules in zip(directories, known_rules):
+            if directory and is_ignored(rules, directory, True):
+                return False
+            rules = directory_rules if directory_rules is not None else self.read_rules(directory, rules)
+        return not is_ignored(rules, relative_path, False)
+
+    def invalidate(self) -> None:
+        """
+        Drop cached listing, project will be walked again on next request
+        """
+        with self.lock:
+            self.cache = None
+            self.sorted_cache = None
+
+    def handle_event(self, event_type: str, path: str, is_directory: bool, dest_path: str | None = None) -> None:
+        """
+        Update listing after a filesystem event. Created and deleted files are applied
+        incrementally, changes of directories and `.gitignore` files cause rescan
+        :param str event_type: "created", "deleted", "moved" or "modified"
+        :param str path: affected path
+        :param bool is_directory: whether the path is a directory
+        :param str dest_path: new path for "moved" event
+        """
+        if event_type == "moved":
+            self.handle_event("deleted", path, is_directory)
+            self.handle_event("created", dest_path, is_directory)
+            return
+        if event_type not in ("created", "deleted"):
+            return
+        with self.lock:
+            if self.cache is None:
+                return
+            if is_directory or os.path.basename(path) == ".gitignore":
+                self.cache = None
+                self.sorted_cache = None
+                return
+            relative_path = self.relative(path)
+            if event_type == "deleted":
+                if path in self.cache:
+                    self.cache.discard(path)
+                    self.sorted_cache = None
+                return
+            directory = relative_path.rpartition("/")[0]
+            rules = self.rules.get(directory)
+            if rules is None or path in self.cache or is_ignored(rules, relative_path, False):
+                return
+            self.cache.add(path)
+            self.sorted_cache = None
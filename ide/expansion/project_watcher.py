@@ -0,0 +1,125 @@
+"""
+Watching project folder for changes made outside of the IDE.
+
+Events come from watchdog observer thread. They are queued and delivered to listeners
+in GUI thread in batches every `ProjectWatcher.COALESCE_INTERVAL` milliseconds, after
+being coalesced by `coalesce`: a burst of events for one path (e.g. editors saving
+through a temporary file) turns into at most one event.
+"""
+from threading import Lock
+from typing import Callable
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+Event = tuple[str, str, bool, str | None]
+"""Event type, path, whether the path is a directory and destination path of moved one"""
+Listener = Callable[[str, str, bool, str | None], None]
+"""Called with fields of `Event`"""
+
+
+def coalesce(events: list[Event]) -> list[Event]:
+    """
+    Merge events, so every path is mentioned once. Moves are split into deletion and creation,
+    modifications of directories are dropped
+    :param list events: events in order of arrival
+    :return: "created", "deleted" and "modified" events in order of last change of their paths
+    """
+    result: dict[str, tuple[str, bool]] = {}
+
+    def put(event_type: str, path: str, is_directory: bool) -> None:
+        previous = result.pop(path, None)
+        if previous is not None:
+            if previous[0] == "created" and event_type == "deleted":
+                return
+            if previous[0] == "created" and event_type == "modified":
+                event_type = "created"
+            elif previous[0] == "deleted" and event_type == "created" and not is_directory:
+                event_type = "modified"
+        result[path] = (event_type, is_directory)
+
+    for event_type, path, is_directory, dest_path in events:
+        if event_type == "moved":
+            put("deleted", path, is_directory)
+            put("created", dest_path, is_directory)
+        elif event_type in ("created", "deleted") or event_type == "modified" and not is_directory:
+            put(event_type, path, is_directory)
+    return [(event_type, path, is_directory, None) for path, (event_type, is_directory) in result.items()]
+
+
+class ProjectEventHandler(FileSystemEventHandler):
+    """
+    Passes filesystem events to a callback. Runs in observer thread
+    """
+
+    def __init__(self, callback: Listener):
+        self.callback = callback
+
+    def on_any_event(self, event: FileSystemEvent):
+        self.callback(event.event_type, event.src_path, event.is_directory, getattr(event, "dest_path", None))
+
+
+class ProjectWatcher(QObject):
+    """
+    Observes project folder recursively
+    """
+
+    COALESCE_INTERVAL = 100
+    events_queued = Signal()
+
+    def __init__(self, root: str):
+        """
+        :param str root: project root
+        """
+        super().__init__()
+        self.root = root
+        self.listeners: list[Listener] = []
+        self.queue: list[Event] = []
+        self.lock = Lock()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.COALESCE_INTERVAL)
+        self.timer.timeout.connect(self.flush)
+        self.events_queued.connect(self.timer.start)
+        self.handler = ProjectEventHandler(self.queue_event)
+        self.observer = Observer()
+        self.observer.daemon = True
+
+    def add_listener(self, listener: Listener) -> None:
+        """
+        Subscribe to filesystem events
+        :param listener: function called from GUI thread
+        """
+        self.listeners.append(listener)
+
+    def queue_event(self, event_type: str, path: str, is_directory: bool, dest_path: str | None) -> None:
+        """Utility method. Called from observer thread"""
+        with self.lock:
+            self.queue.append((event_type, path, is_directory, dest_path))
+            first = len(self.queue) == 1
+        if first:
+            try:
+                self.events_queued.emit()
+            except RuntimeError:  # Watcher was deleted together with its window
+                pass
+
+    def flush(self) -> None:
+        """Utility method. Bound to signal"""
+        with self.lock:
+            events, self.queue = self.queue, []
+        for event in coalesce(events):
+            for listener in self.listeners:
+                listener(*event)
+
+    def start(self) -> None:
+        """Start watching"""
+        self.observer.schedule(self.handler, self.root, recursive=True)
+        self.observer.start()
+
+    def stop(self) -> None:
+        """Stop watching"""
+        if self.observer.is_alive():
+            self.observer.stop()
+            self.observer.join()
+        self.timer.stop()
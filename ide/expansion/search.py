@@ -1,15 +1,17 @@
 """modules for work with os, PySide"""
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+import mmap
 import os
+import re
 from os.path import abspath, basename
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QTextDocument
-from PySide6.QtWidgets import QHBoxLayout, QLineEdit, QListWidget, QListWidgetItem, QMainWindow, QRadioButton, \
-    QVBoxLayout, QWidget, QLabel, QTreeWidgetItem, QTreeWidget
+from PySide6.QtCore import QAbstractItemModel, QModelIndex, QObject, Qt, QTimer, Signal
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QAbstractItemView, QCheckBox, QHBoxLayout, QLineEdit, QMainWindow, QRadioButton, \
+    QTreeView, QVBoxLayout, QWidget, QLabel
 
-from ide.expansion.file_types import GenericFolder
-from ide.registry import Registry
-from ide.ui.tabbing import CodeEditorTab
+from ide.ui.tabbing import CodeEditorTab, LargeFileTab
 
 
 @dataclass
@@ -20,6 +22,162 @@ class FoundFragment:
     """
     line_with_fragment: str
     line_file_path: str
+    line_number: int = 0
+    """Zero-based number of the line"""
+    column: int = 0
+    """Offset of the fragment in the line"""
+    length: int = 0
+    """Length of the fragment"""
+
+
+SEARCHER = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="search")
+
+BINARY_SNIFF_SIZE = 8192
+"""Number of leading bytes checked for NUL to tell binary files apart"""
+
+PREVIEW_MARGIN = 200
+"""Number of characters shown before and after a found fragment, the rest of a long line is cut"""
+
+
+def compile_pattern(text: str, regex: bool = False, ignore_case: bool = False,
+                    whole_word: bool = False) -> re.Pattern | None:
+    """
+    Compile searching fragment to a pattern. Raises `re.error` if regex is invalid
+
+    :param str text: searching fragment
+    :param bool regex: treat fragment as regular expression
+    :param bool ignore_case: case-insensitive search
+    :param bool whole_word: fragment must not be surrounded by word characters
+    :return: pattern or None if fragment is empty
+    """
+    if not text:
+        return None
+    expression = text if regex else re.escape(text)
+    if whole_word:
+        expression = rf"(?<!\w)(?:{expression})(?!\w)"
+    return re.compile(expression, re.IGNORECASE if ignore_case else 0)
+
+
+def find_fragments(content: str, pattern: re.Pattern, path: str | None) -> list[FoundFragment]:
+    """
+    Find all matches of the pattern in the file
+
+    :param str content: text of the file
+    :param re.Pattern pattern: compiled searching fragment
+    :param str path: file path stored in found fragments
+    """
+    fragments = []
+    line_number = 0
+    line_start = 0
+    for match in pattern.finditer(content):
+        start, end = match.span()
+        if start == end:
+            continue
+        line_number += content.count("\n", line_start, start)
+        line_start = content.rfind("\n", 0, start) + 1
+        line_end = content.find("\n", start)
+        if line_end == -1:
+            line_end = len(content)
+        preview = content[max(line_start, start - PREVIEW_MARGIN):min(line_end, end + PREVIEW_MARGIN)]
+        fragments.append(FoundFragment(line_with_fragment=preview, line_file_path=path,
+                                       line_number=line_number, column=start - line_start, length=end - start))
+    return fragments
+
+
+def bytes_pattern(text: str, regex: bool = False, ignore_case: bool = False,
+                  whole_word: bool = False) -> re.Pattern | None:
+    """
+    Compile searching fragment to a pattern searching utf-8 encoded text.
+    Only plain ASCII fragments match encoded text the same way as decoded one: character classes,
+    ignoring case and word boundaries differ for other characters
+
+    :param str text: searching fragment
+    :param bool regex: treat fragment as regular expression
+    :param bool ignore_case: case-insensitive search
+    :param bool whole_word: fragment must not be surrounded by word characters
+    :return: pattern or None if files have to be decoded and searched with `compile_pattern` result
+    """
+    if not text or regex or ignore_case or whole_word or not text.isascii():
+        return None
+    try:
+        return re.compile(re.escape(text).encode("ascii"))
+    except re.error:
+        return None
+
+
+def find_fragments_in_file(path: str, pattern: re.Pattern, file_pattern: re.Pattern | None = None) \
+        -> list[FoundFragment]:
+    """
+    Find all matches of the pattern in a file on disk. With bytes pattern file is memory-mapped and searched
+    as bytes, only lines with matches are decoded, otherwise the whole file is decoded. Binary files are skipped
+
+    :param str path: file path
+    :param re.Pattern pattern: compiled searching fragment
+    :param re.Pattern file_pattern: the same fragment compiled by `bytes_pattern`
+    """
+    try:
+        with open(abspath(path), "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if b"\0" in data[:BINARY_SNIFF_SIZE]:
+                    return []
+                if file_pattern is not None:
+                    return find_byte_fragments(data, file_pattern, path)
+                content = data[:].decode("utf-8", errors="replace")
+    except (OSError, ValueError):
+        return []
+    return find_fragments(content, pattern, path)
+
+
+def find_byte_fragments(data: mmap.mmap | bytes, pattern: re.Pattern, path: str | None) -> list[FoundFragment]:
+    """
+    Find all matches of bytes pattern in utf-8 encoded text
+
+    :param data: encoded text of the file
+    :param re.Pattern pattern: searching fragment compiled by `bytes_pattern`
+    :param str path: file path stored in found fragments
+    """
+    fragments = []
+    line_number = 0
+    line_start = 0
+    line_end = -1
+    column = 0
+    position = 0  # end of the previous fragment, text before it is already counted
+    for match in pattern.finditer(data):
+        start, end = match.span()
+        if start == end:
+            continue
+        newlines = data[position:start].count(b"\n")
+        if newlines:
+            line_number += newlines
+            line_start = position = data.rfind(b"\n", position, start) + 1
+            column = 0
+        if line_end < start:
+            line_end = data.find(b"\n", start)
+            if line_end == -1:
+                line_end = len(data)
+        column += len(data[position:start].decode("utf-8", errors="replace"))
+        position = end
+        # Characters take up to 4 bytes in utf-8, and must not be cut
+        preview_start = max(line_start, start - 4 * PREVIEW_MARGIN)
+        preview_end = min(line_end, end + 4 * PREVIEW_MARGIN)
+        while preview_start > line_start and 0x80 <= data[preview_start] < 0xC0:
+            preview_start -= 1
+        while preview_end < line_end and 0x80 <= data[preview_end] < 0xC0:
+            preview_end += 1
+        text = data[start:end].decode("utf-8", errors="replace")
+        preview = data[preview_start:start].decode("utf-8", errors="replace")[-PREVIEW_MARGIN:] + text \
+            + data[end:preview_end].decode("utf-8", errors="replace")[:PREVIEW_MARGIN]
+        fragments.append(FoundFragment(
+            line_with_fragment=preview.rstrip("\r"),
+            line_file_path=path,
+            line_number=line_number,
+            column=column,
+            length=len(text)
+        ))
+        column += len(text)
+    return fragments
 
 
 class Search(QMainWindow):
@@ -50,15 +208,25 @@ class Search(QMainWindow):
             self.project_radio_button.setVisible(False)
         self.horizontal_layout = HLayout()
         self.horizontal_layout.add_widgets([self.file_radio_button, self.project_radio_button])
-        self.list_widget = ListWidget()
 
-        self.tree_widget = TreeWidget(window=self)
-        self.tree_widget.setEnabled(False)
-        self.tree_widget.setVisible(False)
+        self.regex_check_box = QCheckBox("Regex")
+        self.ignore_case_check_box = QCheckBox("Ignore case")
+        self.whole_word_check_box = QCheckBox("Whole word")
+        self.options_layout = HLayout()
+        self.options_layout.add_widgets([self.regex_check_box, self.ignore_case_check_box, self.whole_word_check_box])
+        self.results_model = SearchResultsModel(self.main_window.project and self.main_window.project.root)
+        self.results_view = ResultsView(self.results_model)
+
+        self.files_model = SearchFilesModel(self)
+        self.files_view = FilesView(self.files_model)
+        self.files_view.setEnabled(False)
+        self.files_view.setVisible(False)
 
         self.widget = EmptyWidget(self.horizontal_layout)
+        self.options_widget = EmptyWidget(self.options_layout)
 
-        widgets = [self.line_edit, self.widget, self.warning_label, self.tree_widget, self.list_widget]
+        widgets = [self.line_edit, self.widget, self.options_widget, self.warning_label, self.files_view,
+                   self.results_view]
         self.layout = VLayout()
         self.layout.add_widgets(widgets)
 
@@ -70,11 +238,14 @@ class Search(QMainWindow):
 
     def widget_signals_init(self):
         """Initializes widget signal functions"""
-        self.tree_widget.itemDoubleClicked.connect(self.open_file_from_tree)
+        self.files_view.doubleClicked.connect(self.open_file_from_tree)
         self.project_radio_button.toggled.connect(lambda: self.choose_search(self.line_edit.text()))
-        self.tree_widget.itemCollapsed.connect(lambda: self.tree_widget.setFixedHeight(20))
-        self.tree_widget.itemExpanded.connect(lambda: self.tree_widget.setFixedHeight(100))
-        self.tree_widget.itemChanged.connect(self.tree_widget.item_change_event)
+        for check_box in (self.regex_check_box, self.ignore_case_check_box, self.whole_word_check_box):
+            check_box.toggled.connect(lambda: self.choose_search(self.line_edit.text()))
+        self.files_view.collapsed.connect(lambda: self.files_view.setFixedHeight(20))
+        self.files_view.expanded.connect(lambda: self.files_view.setFixedHeight(100))
+        self.files_model.check_state_changed.connect(lambda: self.choose_search(self.line_edit.text()))
+        self.results_view.doubleClicked.connect(self.file_search.scroll_choose)
 
     def choose_search(self, text: str):
         """
@@ -82,29 +253,38 @@ class Search(QMainWindow):
 
         :param str text: the searched fragment
         """
-        self.list_widget.clear()
+        self.results_model.clear()
+        if self.main_window.project is not None:
+            self.project_search.cancel()
+
+        try:
+            pattern = compile_pattern(text, self.regex_check_box.isChecked(), self.ignore_case_check_box.isChecked(),
+                                      self.whole_word_check_box.isChecked())
+        except re.error as error:
+            self.warning_label.setVisible(True)
+            self.warning_label.setText(f"Invalid regular expression: {error}")
+            return
 
         if self.file_radio_button.isChecked():
             self.file_search.scroll = self.file_search.scroll_to_element
-            self.tree_widget.setVisible(False)
-            self.tree_widget.setEnabled(False)
-            self.file_search.search_in_file_manager(text)
+            self.files_view.setVisible(False)
+            self.files_view.setEnabled(False)
+            self.file_search.search_in_file_manager(pattern)
         elif self.project_radio_button.isChecked():
             self.file_search.scroll = self.project_search.scroll_to_element
-            self.tree_widget.setVisible(True)
-            self.tree_widget.setEnabled(True)
-            self.project_search.project_search_manager(text)
+            self.files_view.setVisible(True)
+            self.files_view.setEnabled(True)
+            self.project_search.project_search_manager(text, pattern)
 
-    def open_file_from_tree(self, item: QTreeWidgetItem, column: int):
+    def open_file_from_tree(self, index: QModelIndex):
         """
-        Opens the file at the address corresponding to the element :param item that was clicked
+        Opens the file corresponding to the element that was clicked
 
-        :param QTreeWidgetItem item: Tree element that stores the relative path to the file in which the search is
-                    performed and the name of this file
-        :param int column: top-level element index
+        :param QModelIndex index: index of the file in files model
         """
-        if item is not self.tree_widget.topLevelItem(0):
-            self.main_window.open_file(abspath(item.whatsThis(column)))
+        path = self.files_model.path(index)
+        if path is not None:
+            self.main_window.open_file(abspath(path))
 
     def list_all_specified_files(self, path: str = None) -> list[str]:
 
@@ -113,24 +293,7 @@ class Search(QMainWindow):
 
         :param str path: path to the directory in which the search for the necessary files will be performed
         """
-
-        if path is None:
-            path = self.main_window.project.root
-
-        directories = os.listdir(path)
-
-        files = []
-        for directory in directories:
-            absolute_path = os.path.join(path, directory)
-            for file_type in Registry.find_file_types(absolute_path):
-                if (absolute_path.split(".")[-1] in Search.searching_files_formats) and (absolute_path not in files):
-                    files.append(absolute_path)
-                elif isinstance(file_type, GenericFolder) and "venv" not in absolute_path:
-                    temp = self.list_all_specified_files(path=absolute_path)
-                    for python_file in temp:
-                        files.append(python_file)
-
-        return files
+        return self.main_window.project_files.files(Search.searching_files_formats, path)
 
 
 class FileSearch:
@@ -139,16 +302,16 @@ class FileSearch:
     def __init__(self, window: Search):
         self.window = window
 
-    def search_in_file_manager(self, text: str):
+    def search_in_file_manager(self, pattern: re.Pattern | None):
         """
-        Start search in project
+        Start search in file
 
-        :param str text: searching fragment
+        :param re.Pattern pattern: compiled searching fragment
         """
 
         if len(self.window.main_window.opened_workspace_tabs.keys()) != 0:
             self.window.warning_label.setVisible(False)
-            self.window.list_widget.list_widget_form(self.search_in_file(text, True, None))
+            self.window.results_view.add_fragments(self.search_in_file(pattern, True, None))
         else:
             self.window.warning_label.setVisible(True)
             self.window.warning_label.setText("Attention! No open file :(")
@@ -163,7 +326,7 @@ class FileSearch:
         tab_index = self.window.main_window.ui.workspace_tabs.currentIndex()
         return list(self.window.main_window.opened_workspace_tabs.keys())[tab_index]
 
-    def search_in_file(self, text: str, search_flag: bool,
+    def search_in_file(self, pattern: re.Pattern | None, search_flag: bool,
                        path: str = None) -> list[FoundFragment]:
 
         """
@@ -171,33 +334,29 @@ class FileSearch:
 
         :param str path: desired file path
         :param bool search_flag: Set search mode(True: search in file, False: search in project)
-        :param str text: searching fragment
+        :param re.Pattern pattern: compiled searching fragment
 
         """
-        file = self.transform_text(self.get_text_object_on_path(search_flag, path))
-
-        lines = []
+        if pattern is None:
+            return []
+        source = self.get_text_object_on_path(search_flag, path)
+        if source is None:
+            return find_fragments_in_file(path, pattern)
+        return find_fragments(self.transform_text(source), pattern, path)
 
-        if not text.startswith(" ") and text:
-            for line in file:
-                if text in line:
-                    lines.append(FoundFragment(line_with_fragment=line, line_file_path=path))
-
-        return lines
-
-    def transform_text(self, tab: CodeEditorTab | list) -> list[str]:
+    def transform_text(self, tab: CodeEditorTab | str) -> str:
         """
-        Converts the getting parameter tab to a list of strings
+        Get text of the file
 
-        :param CodeEditorTab | list tab: An object that stores the text of the searched file
+        :param CodeEditorTab | str tab: An object that stores the text of the searched file
         """
-        if isinstance(tab, CodeEditorTab):
-            return (tab.text_edit.toPlainText()).split("\n")
-        return tab.split("\n")
+        if isinstance(tab, (CodeEditorTab, LargeFileTab)):
+            return tab.text_edit.toPlainText()
+        return tab
 
-    def get_text_object_on_path(self, search_flag: bool, path: str = None) -> CodeEditorTab | str:
+    def get_text_object_on_path(self, search_flag: bool, path: str = None) -> CodeEditorTab | None:
         """
-        Return TextIO or CodeEditorTab object
+        Return CodeEditorTab object or None if file is not opened and has to be searched on disk
 
         :param bool search_flag: set search mode(True: search in file, False: search in project)
         :param str path: path to text file
@@ -208,87 +367,193 @@ class FileSearch:
         if path in self.window.main_window.opened_workspace_tabs.keys():
             return self.window.main_window.opened_workspace_tabs[path]
 
-        return open(abspath(path), encoding='utf-8').read()
+        return None
 
-    def scroll_choose(self, list_item: QListWidgetItem):
+    def scroll_choose(self, index: QModelIndex):
         """
         Start need scroll function depending on radio button
 
-         :param QListWidgetItem list_item: an element that stores a string with the desired fragment and the path
-         to the file of this string
-         """
+        :param QModelIndex index: index of the found fragment in results model
+        """
+        fragment = self.window.results_model.fragment(index)
+        if fragment is None:
+            return
         if self.window.file_radio_button.isChecked():
-            self.scroll_to_element(list_item)
+            self.scroll_to_element(fragment)
         elif self.window.project_radio_button.isChecked():
-            self.window.project_search.scroll_to_element(list_item)
+            self.window.project_search.scroll_to_element(fragment)
 
-    def scroll_to_element(self, list_item: QListWidgetItem):
+    def scroll_to_element(self, fragment: FoundFragment):
         """
-        Scrolls the viewport to the given line
+        Scrolls the viewport to the found fragment and selects it
 
-        :param list_item: store the line containing the searched fragment
+        :param FoundFragment fragment: found fragment with its position
         """
-        if list_item.whatsThis() == "":
+        if fragment.line_file_path is None:
             key = self.get_active_tab_path()
         else:
-            key = list_item.whatsThis()
+            key = fragment.line_file_path
+
+        line_number, column, length = fragment.line_number, fragment.column, fragment.length
+        text_edit = self.window.main_window.opened_workspace_tabs[key].text_edit
+        block = text_edit.document().findBlockByNumber(line_number)
+        if not block.isValid():
+            return
+        cursor = QTextCursor(block)
+        cursor.setPosition(min(block.position() + column, text_edit.document().characterCount() - 1))
+        cursor.setPosition(min(block.position() + column + length, text_edit.document().characterCount() - 1),
+                           QTextCursor.KeepAnchor)
+        text_edit.setTextCursor(cursor)
+        text_edit.ensureCursorVisible()
+
 
-        if not (self.window.main_window.opened_workspace_tabs[key]).text_edit.find(list_item.text()):
-            (self.window.main_window.opened_workspace_tabs[key]).text_edit.find(
-                list_item.text(), QTextDocument.FindFlag.FindBackward)
+class ProjectSearch(QObject):
+    """
+    Keep function for search in project.
+
+    Files are scanned in `SEARCHER` threads in chunks of `CHUNK_SIZE`. Found fragments are
+    streamed into the list widget in batches every `FLUSH_INTERVAL` milliseconds.
+    Starting a new search cancels the previous one: its pending chunks are skipped and
+    fragments already found by it are dropped.
+    """
+
+    CHUNK_SIZE = 16
+    """Number of files scanned by a single task"""
 
+    FLUSH_INTERVAL = 50
+    """Milliseconds between adding batches of found fragments to the list"""
 
-class ProjectSearch:
-    """Keep function for search in project"""
+    found = Signal(int, object)
 
     def __init__(self, file_search_object: FileSearch):
+        super().__init__()
         self.file_search_object = file_search_object
+        self.generation = 0
+        self.remaining = 0
+        self.pending: list[FoundFragment] = []
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(self.FLUSH_INTERVAL)
+        self.flush_timer.timeout.connect(self.flush)
+        self.found.connect(self.on_found)
 
-    def project_search_manager(self, text: str):
+    def project_search_manager(self, text: str, pattern: re.Pattern | None):
         """
         If there are open files start project search
 
         :param str text: the searched fragment
+        :param re.Pattern pattern: compiled searching fragment
         """
         if len(self.file_search_object.window.main_window.list_all_python_files()) == 0:
+            self.cancel()
             self.file_search_object.window.warning_label.setVisible(True)
             self.file_search_object.window.warning_label.setText("Attention! No python files in current project :|")
-            self.file_search_object.window.tree_widget.setVisible(False)
-            self.file_search_object.window.tree_widget.setEnabled(False)
+            self.file_search_object.window.files_view.setVisible(False)
+            self.file_search_object.window.files_view.setEnabled(False)
         else:
             self.file_search_object.window.warning_label.setVisible(False)
-            self.project_search(text)
+            self.project_search(text, pattern)
+
+    def cancel(self):
+        """Cancel search in progress"""
+        self.generation += 1
+        self.remaining = 0
+        self.pending = []
+        self.flush_timer.stop()
 
-    def project_search(self, text: str):
+    def project_search(self, text: str, pattern: re.Pattern | None):
         """
         start search in project
 
         :param str text: searching fragment
+        :param re.Pattern pattern: compiled searching fragment
         """
+        self.cancel()
+        if pattern is None:
+            return
+        generation = self.generation
+
         project_file_path = self.path_list_form()
+        main_window = self.file_search_object.window.main_window
+        candidates = None
+        if not self.file_search_object.window.regex_check_box.isChecked():
+            candidates = main_window.search_index.candidates(text)
+        if candidates is not None:
+            project_file_path = [path for path in project_file_path if path in candidates
+                                 or path in main_window.opened_workspace_tabs
+                                 or not main_window.search_index.covers(path)]
+
+        # Texts of opened tabs can only be taken in GUI thread
+        files = []
         for path in project_file_path:
-            data = self.file_search_object.search_in_file(text, False, path)
-            self.file_search_object.window.list_widget.list_widget_form(data)
-
-    def scroll_to_element(self, List_item: QListWidgetItem):
+            tab = main_window.opened_workspace_tabs.get(path)
+            if isinstance(tab, CodeEditorTab) or isinstance(tab, LargeFileTab) and tab.loaded:
+                files.append((path, tab.text_edit.toPlainText()))
+            else:
+                files.append((path, None))
+
+        window = self.file_search_object.window
+        file_pattern = bytes_pattern(text, window.regex_check_box.isChecked(),
+                                     window.ignore_case_check_box.isChecked(), window.whole_word_check_box.isChecked())
+        for start in range(0, len(files), self.CHUNK_SIZE):
+            self.remaining += 1
+            SEARCHER.submit(self.search_chunk, generation, files[start:start + self.CHUNK_SIZE], pattern,
+                            file_pattern)
+
+    def search_chunk(self, generation: int, files: list[tuple[str, str | None]], pattern: re.Pattern,
+                     file_pattern: re.Pattern | None):
+        """
+        Search the fragment in files. Runs in `SEARCHER` thread
+
+        :param int generation: search the chunk belongs to
+        :param files: paths of files with texts of opened ones
+        :param re.Pattern pattern: compiled searching fragment
+        :param re.Pattern file_pattern: the same fragment for searching files on disk or None, see `bytes_pattern`
+        """
+        fragments = []
+        for path, content in files:
+            if generation != self.generation:
+                return
+            if content is None:
+                fragments.extend(find_fragments_in_file(path, pattern, file_pattern))
+            else:
+                fragments.extend(find_fragments(content, pattern, path))
+        try:
+            self.found.emit(generation, fragments)
+        except RuntimeError:  # Search window was closed
+            pass
+
+    def on_found(self, generation: int, fragments: list[FoundFragment]):
+        """Utility method. Bound to signal"""
+        if generation != self.generation:
+            return
+        self.pending.extend(fragments)
+        self.remaining -= 1
+        if self.remaining == 0:
+            self.flush()
+        elif not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        """Add found fragments to the list"""
+        self.flush_timer.stop()
+        pending, self.pending = self.pending, []
+        if pending:
+            self.file_search_object.window.results_view.add_fragments(pending)
+
+    def scroll_to_element(self, fragment: FoundFragment):
         """
         Scroll to searching fragment
 
-        :param str List_item: object that stores information about a fragment
+        :param FoundFragment fragment: found fragment with its position
         """
-        self.file_search_object.window.main_window.open_file(List_item.whatsThis())
-        self.file_search_object.scroll_to_element(List_item)
+        self.file_search_object.window.main_window.open_file(fragment.line_file_path)
+        self.file_search_object.scroll_to_element(fragment)
 
     def path_list_form(self) -> list[str]:
         """Generates a list of project files in which the fragment is searched"""
-
-        paths = []
-
-        for obj in self.file_search_object.window.tree_widget.get_all_children():
-            if obj.checkState(0) == Qt.CheckState.Checked:
-                paths.append(obj.whatsThis(0))
-
-        return paths
+        return self.file_search_object.window.files_model.checked_paths()
 
 
 class LineEdit(QLineEdit):
@@ -300,33 +565,194 @@ class LineEdit(QLineEdit):
         self.move(x_cord, y_cord)
 
 
-class ListWidget(QListWidget):
-    """List widget class"""
+class ResultGroup:
+    """
+    Fragments found in a single file. Positions are kept in parallel arrays
+    """
 
-    def __init__(self):
+    __slots__ = ("path", "line_numbers", "columns", "lengths", "lines")
+
+    def __init__(self, path: str | None):
+        self.path = path
+        self.line_numbers = array("I")
+        self.columns = array("I")
+        self.lengths = array("I")
+        self.lines: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def append(self, fragment: FoundFragment) -> None:
+        """
+        Add found fragment to the group
+        :param FoundFragment fragment: fragment found in the file of the group
+        """
+        self.line_numbers.append(fragment.line_number)
+        self.columns.append(fragment.column)
+        self.lengths.append(fragment.length)
+        self.lines.append(fragment.line_with_fragment)
+
+    def fragment(self, row: int) -> FoundFragment:
+        """
+        Get found fragment by its number in the group
+        :param int row: fragment number
+        """
+        return FoundFragment(line_with_fragment=self.lines[row], line_file_path=self.path,
+                             line_number=self.line_numbers[row], column=self.columns[row], length=self.lengths[row])
+
+
+class SearchResultsModel(QAbstractItemModel):
+    """
+    Found fragments grouped by file. Top level rows are files with number of fragments found in them,
+    their children are the fragments. Nothing is created per row, the view asks for data of visible rows only.
+
+    Internal id of an index is 0 for file rows and file row + 1 for fragment rows
+    """
+
+    def __init__(self, root: str | None = None):
+        """
+        :param str root: project root, file paths are shown relative to it
+        """
+        super().__init__()
+        self.root = root
+        self.groups: list[ResultGroup] = []
+        self.group_rows: dict[str | None, int] = {}
+        self.total = 0
+
+    def clear(self) -> None:
+        """Remove all found fragments"""
+        self.beginResetModel()
+        self.groups = []
+        self.group_rows = {}
+        self.total = 0
+        self.endResetModel()
+
+    def add_fragments(self, fragments: list[FoundFragment]) -> list[QModelIndex]:
+        """
+        Append found fragments
+
+        :param list[FoundFragment] fragments: found fragments
+        :return: indexes of added file rows
+        """
+        by_path: dict[str | None, list[FoundFragment]] = {}
+        for fragment in fragments:
+            by_path.setdefault(fragment.line_file_path, []).append(fragment)
+
+        added = []
+        for path, path_fragments in by_path.items():
+            row = self.group_rows.get(path)
+            if row is None:
+                row = len(self.groups)
+                self.beginInsertRows(QModelIndex(), row, row)
+                self.groups.append(ResultGroup(path))
+                self.group_rows[path] = row
+                self.endInsertRows()
+                added.append(self.index(row, 0))
+            group = self.groups[row]
+            parent = self.index(row, 0)
+            self.beginInsertRows(parent, len(group), len(group) + len(path_fragments) - 1)
+            for fragment in path_fragments:
+                group.append(fragment)
+            self.endInsertRows()
+            self.total += len(path_fragments)
+            self.dataChanged.emit(parent, parent)
+        return added
+
+    def fragment(self, index: QModelIndex) -> FoundFragment | None:
+        """
+        Get found fragment by index
+
+        :param QModelIndex index: index of fragment row
+        :return: found fragment or None for file rows
+        """
+        if not index.isValid() or index.internalId() == 0:
+            return None
+        return self.groups[index.internalId() - 1].fragment(index.row())
+
+    def display_path(self, path: str | None) -> str:
+        """
+        Utility method. Path shown in file row
+        """
+        if path is None:
+            return "Current file"
+        if self.root is not None:
+            return os.path.relpath(path, self.root)
+        return path
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, 0)
+        return self.createIndex(row, column, parent.row() + 1)
+
+    def parent(self, index: QModelIndex) -> QModelIndex:  # pylint: disable=arguments-differ
+        if not index.isValid() or index.internalId() == 0:
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, 0)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if not parent.isValid():
+            return len(self.groups)
+        if parent.internalId() == 0:
+            return len(self.groups[parent.row()])
+        return 0
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 1
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if index.internalId() == 0:
+            group = self.groups[index.row()]
+            row = None
+        else:
+            group = self.groups[index.internalId() - 1]
+            row = index.row()
+        if role == Qt.DisplayRole:
+            if row is None:
+                return f"{self.display_path(group.path)} ({len(group)})"
+            return f"{group.line_numbers[row] + 1}: {group.lines[row].strip()}"
+        if role == Qt.ToolTipRole:
+            return group.path
+        return None
+
+
+class ResultsView(QTreeView):
+    """
+    View of found fragments
+    """
+
+    EXPAND_LIMIT = 10000
+    """File rows added while there are fewer fragments found are expanded"""
+
+    def __init__(self, model: SearchResultsModel):
         super().__init__()
+        self.setModel(model)
+        self.setHeaderHidden(True)
+        self.setUniformRowHeights(True)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.set_stylesheet()
 
-    def list_widget_form(self, lines: list[FoundFragment]):
+    def add_fragments(self, fragments: list[FoundFragment]):
         """
-        Form list of lines containing searching fragment
+        Add found fragments to the model
 
-        :param list[FoundFragment] lines: list of lines containing searching fragment
+        :param list[FoundFragment] fragments: list of found fragments
         """
-
-        for line in lines:
-            item = QListWidgetItem(line.line_with_fragment, self)
-            item.setWhatsThis(line.line_file_path)
-            item.setToolTip(line.line_file_path)
+        for index in self.model().add_fragments(fragments):
+            if self.model().total < self.EXPAND_LIMIT:
+                self.expand(index)
 
     def set_stylesheet(self):
-        """Set style sheet for List Widget"""
-        self.setStyleSheet("QListWidget"
+        """Set style sheet for results view"""
+        self.setStyleSheet("QTreeView"
                            "{"
                            "border : 1px solid black;"
                            "font-size: 15px;"
                            "}"
-                           "QListView::item"
+                           "QTreeView::item"
                            "{"
                            "border-bottom: 1px solid gray;"
                            "padding: 1px 0px;"
@@ -334,80 +760,125 @@ class ListWidget(QListWidget):
                            )
 
 
-class TreeWidgetItem(QTreeWidgetItem):
-    def __init__(self, parent):
-        super().__init__(parent)
-        self.is_called_in_parent: bool = False
+class SearchFilesModel(QAbstractItemModel):
+    """
+    Project files to search in, each with a check box. A single top level "Files" row
+    checks or unchecks all of them. Only unchecked paths are stored.
 
+    Internal id of an index is 0 for "Files" row and 1 for file rows
+    """
 
-class TreeWidget(QTreeWidget):
-    """Tree widget class"""
+    check_state_changed = Signal()
 
     def __init__(self, window: Search):
         super().__init__()
-        if window.main_window.project is None:
-            return
         self.search_window = window
-        self.setup_widget()
-        self.add_items()
+        self.root: str | None = None
+        self.paths: list[str] = []
+        if window.main_window.project is not None:
+            self.root = window.main_window.project.root
+            self.paths = window.list_all_specified_files()
+        self.unchecked: set[str] = set()
 
-    def setup_widget(self):
-        """Setup tree widget"""
-        self.setColumnCount(1)
-        self.setHeaderHidden(True)
-        self.setFixedHeight(20)
-        self.setStyleSheet("QTreeWidget { border : 0 px }")
-
-    def add_items(self):
-        """Setup child elements"""
-        top_level_item = TreeWidgetItem(self)
-        top_level_item.setText(0, "Files")
-        top_level_item.setCheckState(0, Qt.CheckState.Checked)
-        for path in self.search_window.list_all_specified_files():
-            item = TreeWidgetItem(top_level_item)
-            item.setText(0, self.path_parsing(path))
-            item.setWhatsThis(0, path)
-            item.setCheckState(0, Qt.CheckState.Checked)
-
-    def path_parsing(self, path: str) -> str:
+    def path(self, index: QModelIndex) -> str | None:
         """
-        create name for child element
+        Get file path by index
 
-        :param str path: file path
+        :param QModelIndex index: index of file row
+        :return: path or None for "Files" row
         """
-        root_path = self.search_window.main_window.project.root
-        root_name = basename(root_path)
-        path = path[(len(self.search_window.main_window.project.root) - len(root_name)):]
-        return path
+        if not index.isValid() or index.internalId() == 0:
+            return None
+        return self.paths[index.row()]
 
-    def get_all_children(self) -> list[TreeWidgetItem]:
-        """get tree widget child element"""
+    def checked_paths(self) -> list[str]:
+        """Get paths of checked files"""
+        if not self.unchecked:
+            return list(self.paths)
+        return [path for path in self.paths if path not in self.unchecked]
 
-        children = []
-
-        item = self.search_window.tree_widget.topLevelItem(0)
-
-        for i in range(item.childCount()):
-            children.append(item.child(i))
-
-        return children
-
-    def item_change_event(self, change_element: TreeWidgetItem):
+    def path_parsing(self, path: str) -> str:
         """
-        Checks the state of elements
+        create name for child element
 
-        :param TreeWidgetItem change_element: element which was changed
+        :param str path: file path
         """
-        if change_element.is_called_in_parent:
-            change_element.is_called_in_parent = False
-            return
+        root_name = basename(self.root)
+        return path[(len(self.root) - len(root_name)):]
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        return self.createIndex(row, column, 1 if parent.isValid() else 0)
+
+    def parent(self, index: QModelIndex) -> QModelIndex:  # pylint: disable=arguments-differ
+        if not index.isValid() or index.internalId() == 0:
+            return QModelIndex()
+        return self.createIndex(0, 0, 0)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if not parent.isValid():
+            return 1 if self.root is not None else 0
+        if parent.internalId() == 0:
+            return len(self.paths)
+        return 0
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 1
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        path = self.path(index)
+        if role == Qt.DisplayRole:
+            return "Files" if path is None else self.path_parsing(path)
+        if role == Qt.ToolTipRole:
+            return path
+        if role == Qt.CheckStateRole:
+            if path is not None:
+                return Qt.Unchecked if path in self.unchecked else Qt.Checked
+            if not self.unchecked:
+                return Qt.Checked
+            if len(self.unchecked) == len(self.paths):
+                return Qt.Unchecked
+            return Qt.PartiallyChecked
+        return None
+
+    def setData(self, index: QModelIndex, value, role: int = Qt.EditRole) -> bool:
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+        checked = Qt.CheckState(value) != Qt.Unchecked
+        path = self.path(index)
+        top = self.index(0, 0)
+        if path is None:
+            self.unchecked = set() if checked else set(self.paths)
+            if self.paths:
+                self.dataChanged.emit(self.index(0, 0, top), self.index(len(self.paths) - 1, 0, top))
+        elif checked:
+            self.unchecked.discard(path)
+        else:
+            self.unchecked.add(path)
+        self.dataChanged.emit(index, index)
+        self.dataChanged.emit(top, top)
+        self.check_state_changed.emit()
+        return True
+
 
-        if change_element.text(0) == "Files":
-            for child in self.get_all_children():
-                child.is_called_in_parent = True
-                child.setCheckState(0, change_element.checkState(0))
+class FilesView(QTreeView):
+    """View of project files to search in"""
 
-        self.search_window.choose_search(self.search_window.line_edit.text())
+    def __init__(self, model: SearchFilesModel):
+        super().__init__()
+        self.setModel(model)
+        self.setHeaderHidden(True)
+        self.setUniformRowHeights(True)
+        self.setFixedHeight(20)
+        self.setStyleSheet("QTreeView { border : 0 px }")
 
 
 class HLayout(QHBoxLayout):
@@ -0,0 +1,200 @@
+"""
+Trigram index of project files used by project-wide search.
+
+For every file the set of (lowercased) three-character substrings it contains is stored.
+Files containing a fragment must contain all of its trigrams, so only files present in
+posting lists of every trigram of the fragment have to be scanned. The index is kept in
+`.ide/search_index.json` and is refreshed in a background thread: only files whose
+modification time or size has changed are read again.
+"""
+import json
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+
+from ide.expansion.project_files import ProjectFiles
+from ide.logs import logger
+
+INDEXER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-index")
+
+INDEX_VERSION = 1
+
+
+def trigrams(text: str) -> set[str]:
+    """
+    Get all lowercased three-character substrings of the text
+    :param str text: text
+    """
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Maps trigrams to project files containing them
+    """
+
+    def __init__(self, project_files: ProjectFiles, extensions: tuple[str, ...]):
+        """
+        :param ProjectFiles project_files: listing of project files
+        :param tuple extensions: extensions of files to index
+        """
+        self.project_files = project_files
+        self.root = project_files.root
+        self.extensions = extensions
+        self.path = os.path.join(self.root, ".ide", "search_index.json")
+        self.files: dict[str, tuple[float, int, str]] = {}
+        """Relative path -> (modification time, size, concatenated trigrams)"""
+        self.postings: dict[str, set[str]] = {}
+        self.ready = False
+        """Whether the index was checked against files on disk at least once"""
+        self.changed = False
+        self.lock = Lock()
+
+    def collect_files(self) -> list[str]:
+        """
+        Get relative paths of all files that should be indexed
+        """
+        return [os.path.relpath(path, self.root) for path in self.project_files.files(self.extensions)]
+
+    def load(self) -> None:
+        """
+        Load index saved by previous session
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            logger.warning("Search index at %s is damaged, rebuilding it", self.path)
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        with self.lock:
+            for relative_path, (mtime, size, grams) in data["files"].items():
+                self.add(relative_path, mtime, size, grams)
+
+    def save(self) -> None:
+        """
+        Write index to `.ide` folder of the project if it was changed
+        """
+        with self.lock:
+            if not self.changed:
+                return
+            data = {
+                "version": INDEX_VERSION,
+                "files": {path: list(entry) for path, entry in self.files.items()}
+            }
+            self.changed = False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+
+    def add(self, relative_path: str, mtime: float, size: int, grams: str) -> None:
+        """Utility method. Should be called with lock held"""
+        self.files[relative_path] = (mtime, size, grams)
+        for i in range(0, len(grams), 3):
+            self.postings.setdefault(grams[i:i + 3], set()).add(relative_path)
+
+    def discard(self, relative_path: str) -> None:
+        """Utility method. Should be called with lock held"""
+        entry = self.files.pop(relative_path, None)
+        if entry is None:
+            return
+        grams = entry[2]
+        for i in range(0, len(grams), 3):
+            paths = self.postings.get(grams[i:i + 3])
+            if paths is not None:
+                paths.discard(relative_path)
+                if not paths:
+                    del self.postings[grams[i:i + 3]]
+        self.changed = True
+
+    def update_file(self, relative_path: str) -> None:
+        """
+        Reindex a file if it was changed since it was indexed
+        :param str relative_path: path relative to project root
+        """
+        absolute_path = os.path.join(self.root, relative_path)
+        try:
+            stat = os.stat(absolute_path)
+        except OSError:
+            with self.lock:
+                self.discard(relative_path)
+            return
+        entry = self.files.get(relative_path)
+        if entry is not None and entry[0] == stat.st_mtime and entry[1] == stat.st_size:
+            return
+        try:
+            with open(absolute_path, "r", encoding="utf-8", errors="ignore") as file:
+                grams = "".join(trigrams(file.read()))
+        except OSError:
+            return
+        with self.lock:
+            self.discard(relative_path)
+            self.add(relative_path, stat.st_mtime, stat.st_size, grams)
+            self.changed = True
+
+    def refresh(self) -> None:
+        """
+        Bring index in line with files on disk: index new and changed files, forget deleted ones
+        """
+        if not self.files and not self.ready:
+            self.load()
+        files = self.collect_files()
+        for relative_path in files:
+            self.update_file(relative_path)
+        with self.lock:
+            for relative_path in set(self.files) - set(files):
+                self.discard(relative_path)
+        self.ready = True
+        self.save()
+
+    def refresh_in_background(self) -> Future:
+        """
+        Refresh index in indexer thread
+        """
+        return INDEXER.submit(self.refresh)
+
+    def update_in_background(self, path: str) -> Future:
+        """
+        Reindex a single file in indexer thread, e.g. after it was saved
+        :param str path: absolute path to file
+        """
+        relative_path = os.path.relpath(path, self.root)
+        if relative_path.split(".")[-1] not in self.extensions or not self.project_files.is_included(path):
+            return INDEXER.submit(lambda: None)
+        return INDEXER.submit(self.update_file, relative_path)
+
+    def save_in_background(self) -> Future:
+        """
+        Save index in indexer thread after pending updates are done
+        """
+        return INDEXER.submit(self.save)
+
+    def covers(self, path: str) -> bool:
+        """
+        Checks whether file is indexed. Files which are not have to be scanned anyway
+        :param str path: absolute path to file
+        """
+        return os.path.relpath(path, self.root) in self.files
+
+    def candidates(self, text: str) -> set[str] | None:
+        """
+        Get absolute paths of files that may contain the fragment
+        :param str text: searched fragment
+        :return: set of paths or None if every file has to be scanned
+        """
+        if not self.ready or len(text) < 3:
+            return None
+        with self.lock:
+            posting_lists = []
+            for gram in trigrams(text):
+                paths = self.postings.get(gram)
+                if paths is None:
+                    return set()
+                posting_lists.append(paths)
+            posting_lists.sort(key=len)
+            result = set(posting_lists[0]).intersection(*posting_lists[1:])
+        return {os.path.join(self.root, relative_path) for relative_path in result}
@@ -0,0 +1,322 @@
+"""
+Index of Python symbols of the project used by "go to symbol" and references search.
+
+Every Python file is parsed with `ast`: classes, functions, methods and module-level names are
+stored with their positions, together with the set of identifiers used in the file. The latter
+tells which files may refer to a name, so only them are examined by jedi when references are searched.
+
+The index is kept in `.ide/symbol_index.json`. Files are parsed again only if their modification
+time or size has changed and the hash of their contents differs from the stored one. Many changed files
+(e.g. on the first launch) are parsed in parallel by a process pool.
+"""
+import ast
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from threading import Lock
+
+from ide.expansion.project_files import ProjectFiles
+from ide.logs import logger
+
+SYMBOL_INDEXER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="symbol-index")
+
+SYMBOL_INDEX_VERSION = 1
+
+PARALLEL_THRESHOLD = 32
+"""Number of changed files starting from which they are parsed by a process pool"""
+
+IDENTIFIER_REGEX = re.compile(r"[A-Za-z_]\w*")
+
+
+@dataclass
+class Symbol:
+    """
+    Class, function or module-level name defined in a project file
+    """
+    name: str
+    """Name qualified by enclosing classes, e.g. `Class.method`"""
+    kind: str
+    """One of "class", "function", "method" and "variable" """
+    path: str
+    line: int
+    """Line number starting from 1"""
+    column: int
+
+
+def collect_symbols(tree: ast.Module) -> list[list]:
+    """
+    Get definitions of the module
+    :param ast.Module tree: parsed module
+    :return: [name, kind, line, column] of every definition
+    """
+    symbols = []
+
+    def visit(body: list[ast.stmt], prefix: str) -> None:
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                symbols.append([prefix + node.name, "class", node.lineno, node.col_offset])
+                visit(node.body, f"{prefix}{node.name}.")
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                symbols.append([prefix + node.name, "method" if prefix else "function", node.lineno, node.col_offset])
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)) and not prefix:
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    for name in ast.walk(target):
+                        if isinstance(name, ast.Name):
+                            symbols.append([name.id, "variable", name.lineno, name.col_offset])
+            elif isinstance(node, (ast.If, ast.Try, ast.With)):
+                # Conditional definitions, e.g. `try: import ... except ImportError: def ...`
+                visit(node.body, prefix)
+                visit(getattr(node, "orelse", []), prefix)
+                visit(getattr(node, "finalbody", []), prefix)
+                for handler in getattr(node, "handlers", []):
+                    visit(handler.body, prefix)
+
+    visit(tree.body, "")
+    return symbols
+
+
+def collect_identifiers(tree: ast.Module) -> set[str]:
+    """
+    Get all names used or defined in the module
+    :param ast.Module tree: parsed module
+    """
+    identifiers = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            identifiers.add(node.id)
+        elif isinstance(node, ast.Attribute):
+            identifiers.add(node.attr)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            identifiers.add(node.name)
+        elif isinstance(node, ast.arg):
+            identifiers.add(node.arg)
+        elif isinstance(node, ast.keyword) and node.arg:
+            identifiers.add(node.arg)
+        elif isinstance(node, ast.alias):
+            identifiers.update(node.name.split("."))
+            if node.asname:
+                identifiers.add(node.asname)
+    return identifiers
+
+
+def parse_file(path: str, known_hash: str | None = None) -> tuple | None:
+    """
+    Parse a file. Runs in process pool, so it's a module-level function
+    :param str path: absolute path to the file
+    :param str known_hash: hash of contents stored in index
+    :return: (modification time, size, hash, symbols, identifiers), symbols and identifiers are None
+    if the hash is equal to the known one. None if the file can't be read
+    """
+    try:
+        stat = os.stat(path)
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    if digest == known_hash:
+        return stat.st_mtime, stat.st_size, digest, None, None
+    text = data.decode("utf-8", errors="replace")
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return stat.st_mtime, stat.st_size, digest, [], sorted(set(IDENTIFIER_REGEX.findall(text)))
+    return stat.st_mtime, stat.st_size, digest, collect_symbols(tree), sorted(collect_identifiers(tree))
+
+
+class SymbolIndex:
+    """
+    Symbols of project Python files
+    """
+
+    def __init__(self, project_files: ProjectFiles):
+        """
+        :param ProjectFiles project_files: listing of project files
+        """
+        self.project_files = project_files
+        self.root = project_files.root
+        self.path = os.path.join(self.root, ".ide", "symbol_index.json")
+        self.files: dict[str, tuple[float, int, str, list[list], list[str]]] = {}
+        """Relative path -> (modification time, size, hash, symbols, identifiers)"""
+        self.identifier_files: dict[str, set[str]] = {}
+        self.ready = False
+        """Whether the index was checked against files on disk at least once"""
+        self.changed = False
+        self.lock = Lock()
+
+    def load(self) -> None:
+        """
+        Load index saved by previous session
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            logger.warning("Symbol index at %s is damaged, rebuilding it", self.path)
+            return
+        if data.get("version") != SYMBOL_INDEX_VERSION:
+            return
+        with self.lock:
+            for relative_path, entry in data["files"].items():
+                self.add(relative_path, tuple(entry))
+
+    def save(self) -> None:
+        """
+        Write index to `.ide` folder of the project if it was changed
+        """
+        with self.lock:
+            if not self.changed:
+                return
+            data = {
+                "version": SYMBOL_INDEX_VERSION,
+                "files": {path: list(entry) for path, entry in self.files.items()}
+            }
+            self.changed = False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+
+    def add(self, relative_path: str, entry: tuple) -> None:
+        """Utility method. Should be called with lock held"""
+        self.files[relative_path] = entry
+        for identifier in entry[4]:
+            self.identifier_files.setdefault(identifier, set()).add(relative_path)
+
+    def discard(self, relative_path: str) -> None:
+        """Utility method. Should be called with lock held"""
+        entry = self.files.pop(relative_path, None)
+        if entry is None:
+            return
+        for identifier in entry[4]:
+            paths = self.identifier_files.get(identifier)
+            if paths is not None:
+                paths.discard(relative_path)
+                if not paths:
+                    del self.identifier_files[identifier]
+        self.changed = True
+
+    def is_outdated(self, relative_path: str) -> bool:
+        """
+        Checks whether file was changed since it was indexed
+        :param str relative_path: path relative to project root
+        """
+        entry = self.files.get(relative_path)
+        if entry is None:
+            return True
+        try:
+            stat = os.stat(os.path.join(self.root, relative_path))
+        except OSError:
+            return True
+        return entry[0] != stat.st_mtime or entry[1] != stat.st_size
+
+    def apply(self, relative_path: str, result: tuple | None) -> None:
+        """
+        Store result of `parse_file`
+        :param str relative_path: path relative to project root
+        :param result: parsing result
+        """
+        with self.lock:
+            if result is None:
+                self.discard(relative_path)
+                return
+            mtime, size, digest, symbols, identifiers = result
+            entry = self.files.get(relative_path)
+            if symbols is None:
+                symbols, identifiers = entry[3], entry[4]
+            self.discard(relative_path)
+            self.add(relative_path, (mtime, size, digest, symbols, identifiers))
+            self.changed = True
+
+    def update_file(self, relative_path: str) -> None:
+        """
+        Reindex a file if it was changed since it was indexed
+        :param str relative_path: path relative to project root
+        """
+        if not self.is_outdated(relative_path):
+            return
+        entry = self.files.get(relative_path)
+        self.apply(relative_path, parse_file(os.path.join(self.root, relative_path), entry and entry[2]))
+
+    def refresh(self) -> None:
+        """
+        Bring index in line with files on disk: index new and changed files, forget deleted ones
+        """
+        if not self.files and not self.ready:
+            self.load()
+        files = [os.path.relpath(path, self.root) for path in self.project_files.files(("py",))]
+        outdated = [relative_path for relative_path in files if self.is_outdated(relative_path)]
+        if len(outdated) >= PARALLEL_THRESHOLD:
+            known_hashes = [self.files[path][2] if path in self.files else None for path in outdated]
+            paths = [os.path.join(self.root, relative_path) for relative_path in outdated]
+            with ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as pool:
+                for relative_path, result in zip(outdated, pool.map(parse_file, paths, known_hashes, chunksize=16)):
+                    self.apply(relative_path, result)
+        else:
+            for relative_path in outdated:
+                self.update_file(relative_path)
+        with self.lock:
+            for relative_path in set(self.files) - set(files):
+                self.discard(relative_path)
+        self.ready = True
+        self.save()
+
+    def refresh_in_background(self) -> Future:
+        """
+        Refresh index in indexer thread
+        """
+        return SYMBOL_INDEXER.submit(self.refresh)
+
+    def update_in_background(self, path: str) -> Future:
+        """
+        Reindex a single file in indexer thread, e.g. after it was saved
+        :param str path: absolute path to file
+        """
+        relative_path = os.path.relpath(path, self.root)
+        if not relative_path.endswith(".py") or not self.project_files.is_included(path):
+            return SYMBOL_INDEXER.submit(lambda: None)
+        return SYMBOL_INDEXER.submit(self.update_file, relative_path)
+
+    def save_in_background(self) -> Future:
+        """
+        Save index in indexer thread after pending updates are done
+        """
+        return SYMBOL_INDEXER.submit(self.save)
+
+    def search(self, query: str, limit: int = 100) -> list[Symbol]:
+        """
+        Find symbols by part of the name, case-insensitive. Names starting with the query come first
+        :param str query: part of the name
+        :param int limit: maximal number of symbols
+        """
+        query = query.lower()
+        found = []
+        with self.lock:
+            for relative_path, entry in self.files.items():
+                for name, kind, line, column in entry[3]:
+                    short_name = name.rpartition(".")[2].lower()
+                    position = short_name.find(query)
+                    if position == -1:
+                        continue
+                    found.append((position != 0, len(short_name), name, relative_path, kind, line, column))
+        found.sort()
+        return [Symbol(name, kind, os.path.join(self.root, relative_path), line, column)
+                for _, _, name, relative_path, kind, line, column in found[:limit]]
+
+    def files_with_identifier(self, identifier: str) -> set[str] | None:
+        """
+        Get absolute paths of files that use or define the name
+        :param str identifier: name
+        :return: set of paths or None if every file has to be examined
+        """
+        if not self.ready:
+            return None
+        with self.lock:
+            paths = set(self.identifier_files.get(identifier, ()))
+        return {os.path.join(self.root, relative_path) for relative_path in paths}
@@ -0,0 +1,77 @@
+"""
+dialog.py - "Go to symbol" popup.
+Symbols are looked up in `SymbolIndex` of the project while the name is being typed
+"""
+import os
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QDialog, QLineEdit, QListWidget, QListWidgetItem, QVBoxLayout
+
+from ide.expansion.symbol_index import Symbol
+from ide.logs import logger
+
+
+class GoToSymbolDialog(QDialog):
+    """
+    Finds classes, functions and module-level names of the project and opens them
+    """
+
+    LIMIT = 100
+
+    def __init__(self, editor):
+        """
+        :param editor: editor window
+        """
+        super().__init__(editor)
+        self.editor = editor
+        self.setWindowTitle("Go to symbol")
+        self.resize(500, 400)
+        self.line_edit = QLineEdit(self)
+        self.line_edit.setPlaceholderText("Symbol name")
+        self.list_widget = QListWidget(self)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.line_edit)
+        layout.addWidget(self.list_widget)
+        self.symbols: list[Symbol] = []
+
+        self.line_edit.textEdited.connect(self.trigger_search)
+        self.line_edit.returnPressed.connect(lambda: self.trigger_open(self.list_widget.currentItem()))
+        self.list_widget.itemActivated.connect(self.trigger_open)
+        logger.info("Opened go to symbol dialog")
+
+    def keyPressEvent(self, event) -> None:
+        """Arrows move selection in the list while typing"""
+        if event.key() in (Qt.Key_Down, Qt.Key_Up) and self.line_edit.hasFocus():
+            row = self.list_widget.currentRow() + (1 if event.key() == Qt.Key_Down else -1)
+            if 0 <= row < self.list_widget.count():
+                self.list_widget.setCurrentRow(row)
+            return
+        super().keyPressEvent(event)
+
+    def trigger_search(self, text: str) -> None:
+        """Utility method. Bound to signal"""
+        self.list_widget.clear()
+        self.symbols = self.editor.symbol_index.search(text, self.LIMIT) if text else []
+        for symbol in self.symbols:
+            relative_path = os.path.relpath(symbol.path, self.editor.project.root)
+            item = QListWidgetItem(f"{symbol.name}  ({symbol.kind})  {relative_path}:{symbol.line}")
+            self.list_widget.addItem(item)
+        if self.symbols:
+            self.list_widget.setCurrentRow(0)
+
+    def trigger_open(self, item: QListWidgetItem | None) -> None:
+        """Utility method. Bound to signal"""
+        if item is None:
+            return
+        symbol = self.symbols[self.list_widget.row(item)]
+        self.editor.open_file(symbol.path)
+        tab = self.editor.opened_workspace_tabs.get(symbol.path)
+        if tab is not None and hasattr(tab, "text_edit"):
+            block = tab.text_edit.document().findBlockByNumber(symbol.line - 1)
+            cursor = QTextCursor(block)
+            cursor.movePosition(QTextCursor.Right, n=min(symbol.column, block.length() - 1))
+            tab.text_edit.setTextCursor(cursor)
+            tab.text_edit.ensureCursorVisible()
+            tab.text_edit.setFocus()
+        self.close()
@@ -1,14 +1,14 @@
 import os
 
 import autopep8
-from PySide6.QtCore import Qt, QEvent
+from PySide6.QtCore import Qt, QEvent, QModelIndex
 from PySide6.QtGui import QKeySequence, QShortcut
 from PySide6.QtGui import QTextCursor, QIcon
 from PySide6.QtWidgets import QFileDialog, QLabel, QMainWindow, QWidgetAction
 from PySide6.QtWidgets import QMenu
 from PySide6.QtWidgets import QAbstractItemView
 
-from ide.expansion.file_types import PythonFile, GenericFolder
+from ide.expansion.file_types import PythonFile
 from ide.expansion.plugins import EditorPlugin
 from ide.frames.dialogs.plugins.dialog import PluginsDialog
 from ide.logs import logger
@@ -25,14 +25,20 @@ except ImportError:
     from data_ui.editor import Ui_MainWindow  # pylint: disable=ungrouped-imports
 
 from ide.configuration.config import Config  # pylint: disable=ungrouped-imports
+from ide.expansion.analysis import AnalysisClient
 from ide.expansion.highlighting import ColoringDialog, CustomStyle, QFormatter
 from ide.expansion.project import Project
+from ide.expansion.project_files import ProjectFiles
+from ide.expansion.project_watcher import ProjectWatcher
 from ide.expansion.search import Search
+from ide.expansion.search_index import TrigramIndex
+from ide.expansion.symbol_index import SymbolIndex
+from ide.frames.dialogs.go_to_symbol.dialog import GoToSymbolDialog
 from ide.frames.dialogs.run_profiles.dialog import RunProfilesDialog
 from ide.registry import Registry
-from ide.ui.file_tree_items import FileTreeItem
+from ide.ui.project_tree import ProjectTreeModel
 from ide.ui.tabbing import AbstractWorkspaceTab
-from ide.ui.tabbing import CodeEditorTab
+from ide.ui.tabbing import CodeEditorTab, LargeFileTab
 from ide.ui.contextmenus.file_menus import DeleteFilesAction
 from ide.utils.terminal import TerminalTextEdit
 from ide.frames.dialogs.about.dialog import AboutDialog
@@ -52,24 +58,41 @@ class EditorWindow(QMainWindow):
         self.syntax_formatter = QFormatter(self.app)
         if project is not None:
             self.project = Project(project)
+            self.project_files = ProjectFiles(self.project.root, self.project.config.get("exclude"))
+            self.project_watcher = ProjectWatcher(self.project.root)
+            self.project_watcher.add_listener(self.project_files.handle_event)
+            self.project_watcher.add_listener(self.trigger_project_file_change)
+            self.project_watcher.start()
+            self.search_index = TrigramIndex(self.project_files, Search.searching_files_formats)
+            self.search_index.refresh_in_background()
+            self.symbol_index = SymbolIndex(self.project_files)
+            self.symbol_index.refresh_in_background()
         else:
             self.project = None
-        self.project_tree_item: FileTreeItem = None
+            self.project_files = None
+            self.project_watcher = None
+            self.search_index = None
+            self.symbol_index = None
+        self.analysis = AnalysisClient(self.project and self.project.root)
+        self.analysis.start()
+        self.project_tree_model: ProjectTreeModel | None = None
         self.previous_expanded = None
+        self.pending_expansion: str | None = None
         self.ui.project_tree.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
 
         self.ui.toolbar_about_btn.clicked.connect(self.trigger_open_about_dialog)
         # self.ui.toolbar_about_btn.setIcon(QIcon("images/logo/icon_negative.png"))
         self.code_run_task: None = None  # Used to avoid ShellRunTask cleaning
 
-        self.ui.terminal_edit = TerminalTextEdit(self.ui.bottom_terminal_tab, cwd=self.project and self.project.root)
+        self.ui.terminal_edit = TerminalTextEdit(self.ui.bottom_terminal_tab, cwd=self.project and self.project.root,
+                                                 scrollback=self.app.config.run.scrollback_lines)
         self.ui.gridLayout_2.addWidget(self.ui.terminal_edit, 0, 0, 1, 1)
 
         self.ui.workspace_tabs.tabCloseRequested.connect(self.trigger_close_tab)
         self.ui.workspace_tabs.currentChanged.connect(self.trigger_changing_tabs)
         self.ui.toolbar_run_btn.clicked.connect(self.trigger_file_running)
         self.ui.toolbar_run_btn.setIcon(QIcon("images/icons/play_icon.png"))
-        self.ui.project_tree.itemDoubleClicked.connect(self.trigger_file_opening_from_tree)
+        self.ui.project_tree.doubleClicked.connect(self.trigger_file_opening_from_tree)
         self.ui.toolbar_edit_btn.clicked.connect(self.trigger_profile_edit)
         self.ui.toolbar_stop_btn.clicked.connect(self.trigger_process_stop)
         self.ui.toolbar_stop_btn.setIcon(QIcon("images/icons/stop_icon.png"))
@@ -131,15 +154,27 @@ class EditorWindow(QMainWindow):
         shortcut_new_file = QShortcut(QKeySequence("Ctrl+n"), self)
         shortcut_new_file.activated.connect(self.trigger_new_project_creation)
 
+        shortcut_go_to_symbol = QShortcut(QKeySequence("Ctrl+t"), self)
+        shortcut_go_to_symbol.activated.connect(self.trigger_go_to_symbol)
+
     def color_menu(self):
         dialog = ColoringDialog()
         logger.info("Opened color menu")
         if dialog.exec():
             CustomStyle.get_style_by_dict(dialog.scroll_area_widget.styling)
-            self.syntax_formatter.get_style()
-            for tab in self.opened_workspace_tabs.values():
-                if isinstance(tab, CodeEditorTab):
-                    tab.highlighter.rehighlight()
+            editors = self.app.editors if self in self.app.editors else self.app.editors + [self]
+            for editor in editors:
+                editor.restyle_tabs()
+
+    def restyle_tabs(self) -> None:
+        """
+        Reapply highlighting formats after CustomStyle has changed. Tokens are reused, nothing is lexed again
+        """
+        if not self.syntax_formatter.update_style():
+            return
+        for tab in self.opened_workspace_tabs.values():
+            if isinstance(tab, CodeEditorTab):
+                tab.highlighter.rehighlight()
 
     def reformat_all_files(self) -> None:
         logger.info("Reformatting all files:")
@@ -166,23 +201,11 @@ class EditorWindow(QMainWindow):
                                                     f"font-size: {tab.editor.app.config.editor.font_size}px;")
 
     def list_all_python_files(self, path=None) -> list[str]:
-        if path is None:
-            path = self.project.root
-
-        directories = os.listdir(path)
-
-        python_files = []
-        for directory in directories:
-            absolute_path = os.path.join(path, directory)
-            for file_type in Registry.find_file_types(absolute_path):
-                if isinstance(file_type, PythonFile):
-                    python_files.append(absolute_path)
-                elif isinstance(file_type, GenericFolder) and "venv" not in absolute_path:
-                    temp = self.list_all_python_files(path=absolute_path)
-                    for python_file in temp:
-                        python_files.append(python_file)
-
-        return python_files
+        """
+        Get all python files of the project, see `ProjectFiles`
+        :param str path: list only files inside this directory
+        """
+        return self.project_files.files(("py",), path)
 
     def reformat_current_file(self) -> None:
         for tab in self.opened_workspace_tabs.values():
@@ -210,7 +233,7 @@ class EditorWindow(QMainWindow):
 
         opened_paths = []
         for tab in self.opened_workspace_tabs.values():
-            if isinstance(tab, CodeEditorTab):
+            if isinstance(tab, (CodeEditorTab, LargeFileTab)):
                 opened_paths.append(tab.identifier)
 
         if self.project is None:
@@ -220,17 +243,29 @@ class EditorWindow(QMainWindow):
             self.project.config["last_opened"]["files"] = opened_paths
             self.project.config["last_opened"]["index"] = self.ui.workspace_tabs.currentIndex()
             self.project.save_config()
+            self.project_watcher.stop()
+            self.search_index.save_in_background()
+            self.symbol_index.save_in_background()
         if self in self.app.editors:
             self.app.editors.remove(self)
 
         self.ui.terminal_edit.process.kill()
         if isinstance(self.ui.run_edit, TerminalTextEdit):
             self.ui.run_edit.process.kill()
+        self.analysis.stop()
+
+    def trigger_go_to_symbol(self) -> None:
+        """Utility method. Bound to signal"""
+        if self.symbol_index is None:
+            return
+        self.dialog = GoToSymbolDialog(self)
+        self.dialog.show()
 
     def search_event(self):
+        if self.search_index is not None:
+            self.search_index.refresh_in_background()
         self.dialog = Search(main_window=self)
         self.dialog.line_edit.textEdited.connect(self.dialog.choose_search)
-        self.dialog.list_widget.itemDoubleClicked.connect(self.dialog.file_search.scroll_choose)
         self.dialog.show()
 
     def closeEvent(
@@ -244,20 +279,42 @@ class EditorWindow(QMainWindow):
             if self.dialog.isEnabled():
                 self.dialog.close()
 
+    def trigger_project_file_change(
+        self,
+        event_type: str,
+        path: str,
+        is_directory: bool,
+        dest_path: str | None = None  # pylint: disable=unused-argument
+    ) -> None:
+        """Utility method. Bound to project watcher"""
+        if self.project_tree_model is not None:
+            self.project_tree_model.handle_event(event_type, path, is_directory)
+        if is_directory:
+            return
+        self.search_index.update_in_background(path)
+        self.symbol_index.update_in_background(path)
+        tab = self.opened_workspace_tabs.get(path)
+        if isinstance(tab, (CodeEditorTab, LargeFileTab)):
+            tab.handle_external_change(event_type)
+
     def trigger_tree_context_menu(self, pos) -> None:
         """Utility method. Bound to signal"""
-        item: FileTreeItem = self.ui.project_tree.itemAt(pos)
-        if item is not None:
+        index = self.ui.project_tree.indexAt(pos)
+        if index.isValid():
             menu = QMenu()
 
-            if len(self.ui.project_tree.selectedItems()) > 1:
+            selected_indexes = self.ui.project_tree.selectionModel().selectedIndexes()
+            if len(selected_indexes) > 1:
                 paths = []
-                for item in self.ui.project_tree.selectedItems():
-                    paths.append(item.path)
+                for selected_index in selected_indexes:
+                    paths.append(self.project_tree_model.path(selected_index))
 
                 menu.addAction(DeleteFilesAction(paths, self))
             else:
-                item.file_type.setup_context_menu(self, menu, item.path, self.project)
+                node = self.project_tree_model.node(index)
+                if node.file_type is None:
+                    return
+                node.file_type.setup_context_menu(self, menu, node.path, self.project)
             menu.exec_(self.ui.project_tree.viewport().mapToGlobal(pos))
 
     def trigger_editor_closing(self) -> None:
@@ -287,6 +344,10 @@ class EditorWindow(QMainWindow):
             del self.opened_workspace_tabs[tab.identifier]
         if isinstance(tab, CodeEditorTab):
             tab.save()
+            self.analysis.close_document(tab.identifier)
+        elif isinstance(tab, LargeFileTab):
+            tab.stop_loading()
+            tab.save()
         self.ui.workspace_tabs.removeTab(tab_index)
         if self.ui.workspace_tabs.count() == 0:
             self.ui.path_label.setText("Nothing has been opened yet")
@@ -301,14 +362,14 @@ class EditorWindow(QMainWindow):
     def trigger_file_saving(self) -> None:
         """Utility method. Bound to signal"""
         for tab in self.opened_workspace_tabs.values():
-            if isinstance(tab, CodeEditorTab):
+            if isinstance(tab, (CodeEditorTab, LargeFileTab)):
                 tab.save()
 
     def trigger_file_running(self) -> None:
         """Utility method. Bound to signal"""
         for tab in self.opened_workspace_tabs.values():
             logger.info("Running file %s...", tab.identifier)
-            if isinstance(tab, CodeEditorTab):
+            if isinstance(tab, (CodeEditorTab, LargeFileTab)):
                 tab.save()
 
         if self.ui.run_profile_box.currentData() is not None:
@@ -327,7 +388,8 @@ class EditorWindow(QMainWindow):
                 self.ui.bottom_terminal_tab,
                 cwd=self.project and self.project.root,
                 python_run_command='python main.py',
-                run_button=self.ui.toolbar_run_btn
+                run_button=self.ui.toolbar_run_btn,
+                scrollback=self.app.config.run.scrollback_lines
             )
             self.ui.gridLayout.addWidget(self.ui.run_edit, 0, 0, 1, 1)
             self.ui.run_edit.setFocus()
@@ -340,12 +402,12 @@ class EditorWindow(QMainWindow):
 
     def trigger_file_opening_from_tree(
         self,
-        item: FileTreeItem,
-        *args  # pylint: disable=unused-argument
+        index: QModelIndex
     ) -> None:
         """Utility method. Bound to signal"""
-        if os.path.isfile(item.path):
-            self.open_file(item.path)
+        path = self.project_tree_model.path(index)
+        if path is not None and os.path.isfile(path):
+            self.open_file(path)
 
     def setup_top_menu(self) -> None:
         """
@@ -458,11 +520,9 @@ class EditorWindow(QMainWindow):
         """
         Loads project file tree
         """
-        self.project_tree_item = FileTreeItem(self.project.root, show_full_path=True)
-        for i in range(self.ui.project_tree.topLevelItemCount()):
-            self.ui.project_tree.takeTopLevelItem(i)
-        self.ui.project_tree.addTopLevelItem(self.project_tree_item)
-        FileTreeItem.hook_into_tree(self.ui.project_tree)
+        self.project_tree_model = ProjectTreeModel(self.project.root)
+        self.project_tree_model.directory_loaded.connect(self.trigger_tree_directory_loaded)
+        self.ui.project_tree.setModel(self.project_tree_model)
 
     def open_file(self, file_path: str) -> None:
         """
@@ -489,10 +549,15 @@ class EditorWindow(QMainWindow):
                 if file_types[0].do_custom_open:
                     file_types[0].custom_open(self, file_path)
                     return
-            with open(file_path, "r", encoding='utf-8') as file:
-                text = file.read()
-            tab = CodeEditorTab(file_path, self)
-            tab.set_area_text(text)
+            if os.path.getsize(file_path) >= LargeFileTab.SIZE_THRESHOLD:
+                logger.info("File %s is large, highlighting and code analysis are disabled", file_path)
+                tab = LargeFileTab(file_path, self)
+                tab.load()
+            else:
+                with open(file_path, "r", encoding='utf-8') as file:
+                    text = file.read()
+                tab = CodeEditorTab(file_path, self, Registry.get_lexer(file_path))
+                tab.set_area_text(text)
             self.open_tab_raw(file_path, heading, tab)
             if file_path in self.app.config.misc.recent_files:
                 self.app.config.misc.recent_files.remove(file_path)
@@ -525,10 +590,10 @@ class EditorWindow(QMainWindow):
         Refreshes the file tree
         """
         if self.ui.project_tree is not None and self.project is not None:
-            if self.project_tree_item is None:
+            if self.project_tree_model is None:
                 self.load_file_tree()
             else:
-                self.project_tree_item.refresh()
+                self.project_tree_model.refresh()
                 logger.debug("Refreshing file tree")
 
     def trigger_textedit_text_setting(self, text: str, widget: "QTextEdit") -> None:
@@ -585,18 +650,34 @@ class EditorWindow(QMainWindow):
         if self.previous_expanded:
             if self.previous_expanded in tabs.values():
                 previous_tab_path = list(tabs.keys())[list(tabs.values()).index(self.previous_expanded)]
-                if self.project_tree_item:
-                    if self.project_tree_item.path in previous_tab_path:
-                        self.project_tree_item.expand_to_file(previous_tab_path, False)
+                self.expand_tree_to_file(previous_tab_path, False)
 
         if tab in tabs.values():
             current_tab_path = list(tabs.keys())[list(tabs.values()).index(tab)]
-            if self.project_tree_item:
-                if self.project_tree_item.path in current_tab_path:
-                    self.project_tree_item.expand_to_file(current_tab_path, mode)
+            self.expand_tree_to_file(current_tab_path, mode)
 
         self.previous_expanded = tab
 
+    def expand_tree_to_file(self, path: str, mode: bool = True) -> None:
+        """
+        Expand or collapse project tree directories on the way to the file.
+        Directories which are not listed yet are expanded once they are loaded
+        :param str path: file path
+        :param bool mode: expand if True, collapse otherwise
+        """
+        if self.project_tree_model is None:
+            return
+        indexes = self.project_tree_model.ancestor_indexes(path)
+        for index in indexes:
+            self.ui.project_tree.setExpanded(index, mode)
+        complete = len(indexes) == len(os.path.relpath(path, self.project.root).split(os.sep))
+        self.pending_expansion = path if mode and indexes and not complete else None
+
+    def trigger_tree_directory_loaded(self, index: QModelIndex) -> None:  # pylint: disable=unused-argument
+        """Utility method. Bound to signal"""
+        if self.pending_expansion is not None:
+            self.expand_tree_to_file(self.pending_expansion)
+
 
 
 
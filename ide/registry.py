@@ -1,4 +1,9 @@
-from ide.expansion.file_types import FileType
+import os
+
+from pygments.lexer import Lexer
+from pygments.lexers import get_lexer_by_name
+
+from ide.expansion.file_types import FileType, file_kinds
 from ide.expansion.project import ProjectGenerator
 from ide.expansion.theme import Theme
 
@@ -9,20 +14,91 @@ class Registry:
     themes: list[Theme] = []
     run_profile_types: list = []
     project_generators: list[ProjectGenerator] = []
+    lexers: dict[str, Lexer] = {}
+    file_type_candidates: dict[str, list[FileType]] = {}
+    """Extension -> file types that may apply to files with it, last registered first"""
+    file_type_cache: dict[str, tuple[int, list[FileType]]] = {}
+    """Path -> (modification time, applicable file types)"""
+
+    DEFAULT_LEXER = "text"
+    FILE_TYPE_CACHE_SIZE = 65536
+
+    @staticmethod
+    def extension(file_path: str) -> str:
+        """
+        Get the last extension of file name, including the dot
+        :param str file_path: file path or name ending
+        """
+        name = os.path.basename(file_path)
+        return name[name.rfind("."):] if "." in name else ""
+
+    @staticmethod
+    def is_declarative(file_type: FileType) -> bool:
+        """
+        Checks whether file type is resolved by its `kind` and `extensions` instead of `applies`
+        :param FileType file_type: file type
+        """
+        return file_type.kind is not None and type(file_type).applies is FileType.applies
 
     @staticmethod
-    def find_file_types(file_path: str) -> list[FileType]:
+    def find_file_type_candidates(extension: str) -> list[FileType]:
+        """
+        Get file types that may apply to files with given extension.
+        File types declaring other extensions are left out
+        :param str extension: extension including the dot
+        """
+        candidates = Registry.file_type_candidates.get(extension)
+        if candidates is None:
+            candidates = [
+                file_type for file_type in reversed(Registry.file_types)
+                if not Registry.is_declarative(file_type) or not file_type.extensions
+                or any(Registry.extension(ending) == extension for ending in file_type.extensions)
+            ]
+            Registry.file_type_candidates[extension] = candidates
+        return candidates
+
+    @staticmethod
+    def find_file_types(file_path: "str | os.DirEntry") -> list[FileType]:
         """
         Finds all file types that are applicable to file by given path.
         Note: it sorts it automatically based on order of registration.
         Last registered file type will come first.
-        :param str file_path: file to resolve
+        Results are memoized until modification time of the file changes
+        :param file_path: file to resolve, entries listed by `os.scandir` are classified without extra calls
         """
+        path = os.fspath(file_path)
+        kinds, mtime = file_kinds(file_path)
+        cached = Registry.file_type_cache.get(path)
+        if cached is not None and mtime is not None and cached[0] == mtime:
+            return list(cached[1])
         applicable = []
-        for file_type in reversed(Registry.file_types):
-            if file_type.applies(file_path):
+        for file_type in Registry.find_file_type_candidates(Registry.extension(path)):
+            if Registry.is_declarative(file_type):
+                if file_type.matches(path, kinds):
+                    applicable.append(file_type)
+            elif file_type.applies(path):
                 applicable.append(file_type)
-        return applicable
+        if mtime is not None:
+            if len(Registry.file_type_cache) >= Registry.FILE_TYPE_CACHE_SIZE:
+                Registry.file_type_cache.clear()
+            Registry.file_type_cache[path] = (mtime, applicable)
+        return list(applicable)
+
+    @staticmethod
+    def get_lexer(file_path: str) -> Lexer:
+        """
+        Get lexer for highlighting given file. Lexer is defined by the first
+        applicable file type that has one and is shared by all files of that type
+        :param str file_path: file to resolve
+        """
+        name = Registry.DEFAULT_LEXER
+        for file_type in Registry.find_file_types(file_path):
+            if file_type.lexer:
+                name = file_type.lexer
+                break
+        if name not in Registry.lexers:
+            Registry.lexers[name] = get_lexer_by_name(name)
+        return Registry.lexers[name]
 
     @staticmethod
     def get_project_generator(uid: str) -> None | ProjectGenerator:
@@ -81,6 +157,8 @@ class Registry:
         if isinstance(obj, FileType):
             if obj not in Registry.file_types:
                 Registry.file_types.append(obj)
+                Registry.file_type_candidates.clear()
+                Registry.file_type_cache.clear()
         elif isinstance(obj, Theme):
             if obj not in Registry.themes:
                 Registry.themes.append(obj)
@@ -1,4 +1,3 @@
-from jedi.api.classes import Completion
 from PySide6 import QtWidgets
 from PySide6.QtCore import QEvent
 from PySide6.QtGui import QAction, QIcon, QKeyEvent, Qt
@@ -7,17 +6,19 @@ from .base_menu import BaseMenu
 
 
 class AutocompleteMenu(BaseMenu):
+    LIMIT = 5
+
     def generate_actions(self):
-        self.data: list[Completion]
-        for complete in self.data[:5]:
-            action = QAction(complete.name_with_symbols, self)
+        self.data: list[dict]
+        for complete in self.data[:self.LIMIT]:
+            action = QAction(complete["name_with_symbols"], self)
             action.setToolTip(
-                complete.description + "\n\n" + (complete.docstring(raw=True) or "No docstring found...")
+                complete["description"] + "\n\n" + (complete["docstring"] or "No docstring found...")
             )
             action.triggered.connect(self.choose_action)
-            action.setIcon(QIcon(f"images/icons/{complete.type}"))
+            action.setIcon(QIcon(f"images/icons/{complete['type']}"))
             self.addAction(action)
-            self.mapping[complete.name_with_symbols] = complete
+            self.mapping[complete["name_with_symbols"]] = complete
 
     def keyPressEvent(self, event: QKeyEvent) -> None:
         # Ignore these keys
@@ -51,7 +52,7 @@ class AutocompleteMenu(BaseMenu):
         self.parent().keyPressEvent(event)
 
     def choose_action(self):
-        self.parent().insertPlainText(self.mapping[self.sender().text()].complete)
-        if self.mapping[self.sender().text()].type == "function":
+        self.parent().insertPlainText(self.mapping[self.sender().text()]["complete"])
+        if self.mapping[self.sender().text()]["type"] == "function":
             self.parent().insertPlainText("()")
             self.parent().keyPressEvent(QKeyEvent(QEvent.KeyPress, Qt.Key_Left, Qt.KeyboardModifiers()))
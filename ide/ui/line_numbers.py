@@ -1,16 +1,21 @@
-from enum import Enum
+from collections import Counter
 
-from PySide6.QtGui import QPainter, QFont, QColor
+from PySide6.QtCore import QEvent, QObject, QPoint
+from PySide6.QtGui import QPainter, QFont, QFontMetrics, QColor
 from PySide6.QtWidgets import QWidget
 
 
-class GutterAnnotation(Enum):
+class GutterAnnotation:
     """Represents annotation on line numbering gutter"""
 
     COLOR = 0
     TEXT = 1
 
     def __init__(self, type_: int, data: str | QColor | None = None):
+        """
+        :param int type_: `GutterAnnotation.COLOR` to paint line number with color given as data
+        or `GutterAnnotation.TEXT` to add text given as data after the line number
+        """
         self.type = type_
         self.data = data
 
@@ -19,6 +24,13 @@ class NumberGutter(QWidget):
     """
     Line numbering left gutter
     Modification of: https://nachtimwald.com/2009/08/15/qtextedit-with-line-numbers/
+
+    Only lines visible in the text edit are painted. Gutter is repainted when the text edit is scrolled,
+    its cursor moves or its document is laid out again, and resized when the number of lines changes.
+
+    Font and its metrics are built once and rebuilt only when editor font settings change, which is checked
+    when the font of the text edit changes. Widths of text annotations are counted, so adding and removing
+    annotations doesn't rescan the others. Painting never changes the width of the gutter.
     """
 
     def __init__(self, editor, edit=None):
@@ -27,40 +39,101 @@ class NumberGutter(QWidget):
         self.app = editor.app
         self.highest_line = 0
         self.gutter_annotations: dict[int, list[GutterAnnotation]] = {}
-        self.widest_annotation = ""
-
-    def recalculate_annotations(self):
+        self.annotation_texts: Counter[str] = Counter()
+        """Number of text annotations with each text"""
+        self.annotation_widths: Counter[int] = Counter()
+        """Number of text annotations with each width in pixels"""
+        self.widest_annotation = 0
+        """Width of the widest text annotation in pixels"""
+        self.font_settings: tuple | None = None
+        self.painting_font: QFont | None = None
+        self.font_metrics: QFontMetrics | None = None
+        self.digit_width = 0
+        if edit is not None:
+            self.highest_line = edit.document().blockCount()
+            edit.verticalScrollBar().valueChanged.connect(self.trigger_repaint)
+            edit.cursorPositionChanged.connect(self.trigger_repaint)
+            edit.document().documentLayout().update.connect(self.trigger_repaint)
+            edit.document().blockCountChanged.connect(self.trigger_block_count_change)
+            edit.installEventFilter(self)
+        self.update()
+
+    def trigger_repaint(self, *args) -> None:  # pylint: disable=unused-argument
+        """Utility method. Bound to signal"""
+        super().update()
+
+    def trigger_block_count_change(self, block_count: int) -> None:
+        """Utility method. Bound to signal"""
+        self.highest_line = block_count
+        self.update()
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        if watched is self.edit and event.type() in (QEvent.FontChange, QEvent.StyleChange):
+            self.update()  # Width depends on font
+        return super().eventFilter(watched, event)
+
+    def update_font(self) -> bool:
         """
-        Recalculate self.widest_annotation
+        Rebuild font and metrics if editor font settings have changed since they were built
+        :return: True if font was rebuilt
         """
-        for _, annotations in self.gutter_annotations.items():
-            for annotation in annotations:
-                if annotation.type == GutterAnnotation.TEXT:
-                    self.widest_annotation = annotation.data \
-                        if len(self.widest_annotation) < len(annotation.data) \
-                        else self.widest_annotation
+        config = self.app.config.editor
+        settings = (config.use_default_font, config.font_name, config.font_size)
+        if settings == self.font_settings:
+            return False
+        self.font_settings = settings
+        if config.use_default_font:
+            self.painting_font = QFont(self.app.default_font)
+        else:
+            self.painting_font = QFont(config.font_name, config.font_size)
+        self.painting_font.setPixelSize(config.font_size)
+        self.font_metrics = QFontMetrics(self.painting_font)
+        self.digit_width = max(self.font_metrics.horizontalAdvance(digit) for digit in "0123456789")
+        self.annotation_widths = Counter()
+        for text, count in self.annotation_texts.items():
+            self.annotation_widths[self.font_metrics.horizontalAdvance(text)] += count
+        self.widest_annotation = max(self.annotation_widths, default=0)
+        return True
+
+    def count_annotation(self, annotation: GutterAnnotation, count: int) -> None:
+        """
+        Update counters of text annotations
+        :param GutterAnnotation annotation: added or removed annotation
+        :param int count: 1 if annotation is added, -1 if it's removed
+        """
+        if annotation.type != GutterAnnotation.TEXT:
+            return
+        self.update_font()
+        text = annotation.data
+        width = self.font_metrics.horizontalAdvance(text)
+        self.annotation_texts[text] += count
+        if self.annotation_texts[text] <= 0:
+            del self.annotation_texts[text]
+        self.annotation_widths[width] += count
+        if self.annotation_widths[width] <= 0:
+            del self.annotation_widths[width]
+            if width == self.widest_annotation:
+                self.widest_annotation = max(self.annotation_widths, default=0)
+        else:
+            self.widest_annotation = max(self.widest_annotation, width)
 
     def add_annotation(self, line: int, annotation: GutterAnnotation) -> None:
         """
         Add annotation on line
         """
-        if line in self.gutter_annotations:
-            self.gutter_annotations[line].append(annotation)
-        else:
-            self.gutter_annotations[line] = [annotation]
-        if annotation.type == GutterAnnotation.TEXT:
-            self.widest_annotation = annotation.data \
-                if len(self.widest_annotation) < len(annotation.data) \
-                else self.widest_annotation
+        self.gutter_annotations.setdefault(line, []).append(annotation)
+        self.count_annotation(annotation, 1)
 
     def remove_annotation(self, line: int, annotation: GutterAnnotation) -> None:
         """
         Remove specific annotation on specific line
         """
-        if line in self.gutter_annotations:
-            if annotation in self.gutter_annotations[line]:
-                self.gutter_annotations[line].remove(annotation)
-        self.recalculate_annotations()
+        annotations = self.gutter_annotations.get(line)
+        if annotations is not None and annotation in annotations:
+            annotations.remove(annotation)
+            self.count_annotation(annotation, -1)
+            if not annotations:
+                del self.gutter_annotations[line]
 
     def remove_annotations(self, line: int | None = None) -> None:
         """
@@ -68,18 +141,19 @@ class NumberGutter(QWidget):
         """
         if line is None:
             self.gutter_annotations = {}
+            self.annotation_texts = Counter()
+            self.annotation_widths = Counter()
             self.widest_annotation = 0
         else:
-            self.gutter_annotations[line] = []
-            self.recalculate_annotations()
+            for annotation in self.gutter_annotations.pop(line, []):
+                self.count_annotation(annotation, -1)
 
     def update(self, *args):
         """
         Update width and display
         """
-        width_self = self.fontMetrics().boundingRect(str(self.highest_line) + "xy").width()
-        width_add = self.fontMetrics().boundingRect(self.widest_annotation).width()
-        width = width_self + width_add + 8
+        self.update_font()
+        width = self.digit_width * (len(str(self.highest_line)) + 2) + self.widest_annotation + 8
         if self.width() != width:
             self.setFixedWidth(width)
         super().update(*args)
@@ -90,24 +164,19 @@ class NumberGutter(QWidget):
         """
         bottom_edit_y = self.edit.verticalScrollBar().value() - 4
         page_bottom = bottom_edit_y + self.edit.viewport().height()
-        font_metrics = self.fontMetrics()
-        current_block = self.edit.document().findBlock(self.edit.textCursor().position())
+        font_metrics = self.font_metrics
+        current_block = self.edit.textCursor().block()
+        layout = self.edit.document().documentLayout()
         painter = QPainter(self)
-        if self.app.config.editor.use_default_font:
-            font = self.app.default_font
-        else:
-            font = QFont(self.app.config.editor.font_name, self.app.config.editor.font_size)
-        font.setPixelSize(self.app.config.editor.font_size)
-        painter.setFont(font)
+        painter.setFont(self.painting_font)
 
-        line_count = 0
-        block = self.edit.document().begin()
+        block = self.edit.cursorForPosition(QPoint(0, 0)).block()
+        line_count = block.blockNumber()
         while block.isValid():
             line_count += 1
             additional_text = ""
 
-            block_top_left_pos = \
-                self.edit.document().documentLayout().blockBoundingRect(block).topLeft()
+            block_top_left_pos = layout.blockBoundingRect(block).topLeft()
 
             if block_top_left_pos.y() > page_bottom:
                 break
@@ -126,11 +195,14 @@ class NumberGutter(QWidget):
                     elif annotation.type == GutterAnnotation.TEXT:
                         additional_text += annotation.data
 
+            number = str(line_count)
+            text_width = self.digit_width * len(number)
+            if additional_text:
+                text_width += font_metrics.horizontalAdvance(additional_text)
             painter.drawText(
-                self.width() - font_metrics.boundingRect(str(line_count) +
-                                                         additional_text).width() - 20,
+                self.width() - text_width - 20,
                 round(block_top_left_pos.y()) - bottom_edit_y + font_metrics.ascent(),
-                str(line_count) + additional_text
+                number + additional_text
             )
 
             if prev_painter_pen is not None:
@@ -138,7 +210,6 @@ class NumberGutter(QWidget):
 
             block = block.next()
 
-        self.highest_line = line_count
         painter.end()
 
         super().paintEvent(event)
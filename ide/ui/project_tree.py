@@ -0,0 +1,351 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QAbstractItemModel, QModelIndex, Qt, Signal
+from PySide6.QtGui import QIcon
+
+from ide.expansion.file_types import FileType
+from ide.registry import Registry
+
+LISTER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="project-tree")
+
+
+def list_directory(path: str) -> list[tuple[str, bool]] | None:
+    """
+    List directory entries, directories first. Runs in `LISTER` thread
+    :param str path: directory path
+    :return: (name, is directory) of every entry or None if directory can't be read
+    """
+    entries = []
+    try:
+        with os.scandir(path) as iterator:
+            for entry in iterator:
+                try:
+                    entries.append((entry.name, entry.is_dir()))
+                except OSError:
+                    entries.append((entry.name, False))
+    except OSError:
+        return None
+    entries.sort(key=lambda entry: (not entry[1], entry[0].lower(), entry[0]))
+    return entries
+
+
+class ProjectTreeNode:
+    """
+    File or directory shown in project tree
+    """
+
+    __slots__ = ("path", "name", "is_dir", "parent", "row", "stale_row", "children", "names", "fetched", "fetching",
+                 "_file_type")
+
+    def __init__(self, path: str, name: str, is_dir: bool, parent: "ProjectTreeNode | None" = None):
+        self.path = path
+        self.name = name
+        self.is_dir = is_dir
+        self.parent = parent
+        self.row = 0
+        self.stale_row: int | None = None
+        """First child whose row may be outdated after children were inserted or removed"""
+        self.children: list[ProjectTreeNode] = []
+        self.names: dict[str, ProjectTreeNode] = {}
+        self.fetched = False
+        self.fetching = False
+        self._file_type: FileType | None = None
+
+    @property
+    def file_type(self) -> FileType | None:
+        """First file type applicable to the node, resolved on first use"""
+        if self._file_type is None:
+            file_types = Registry.find_file_types(self.path)
+            if file_types:
+                self._file_type = file_types[0]
+        return self._file_type
+
+    def sort_key(self) -> tuple[bool, str, str]:
+        """Directories go first, then entries are sorted by name"""
+        return not self.is_dir, self.name.lower(), self.name
+
+    def mark_stale(self, row: int) -> None:
+        """Rows of children starting from the given one are outdated, they are updated on first use"""
+        if self.stale_row is None or row < self.stale_row:
+            self.stale_row = row
+
+    def renumber(self) -> None:
+        """Update outdated rows of children after they were inserted or removed"""
+        if self.stale_row is None:
+            return
+        for row in range(self.stale_row, len(self.children)):
+            self.children[row].row = row
+        self.stale_row = None
+
+
+class ProjectTreeModel(QAbstractItemModel):
+    """
+    Model of project file tree.
+
+    Directories are listed lazily: only when they are expanded for the first time (`canFetchMore`/`fetchMore`).
+    Listing is done with `os.scandir` in `LISTER` thread, entries are inserted in a single batch when it's done.
+    Children of a directory are kept in a list for rows and in a dict by name for lookups.
+    `refresh` lists already fetched directories again and applies only the difference.
+    """
+
+    entries_ready = Signal(str, object)
+    directory_loaded = Signal(QModelIndex)
+    """Emitted after entries of a directory were listed and applied"""
+
+    def __init__(self, root: str):
+        """
+        :param str root: project root
+        """
+        super().__init__()
+        self.root = ProjectTreeNode(root, f"{os.path.split(root)[-1]} ({root})", True)
+        self.icons: dict[str, QIcon] = {}
+        self.queued: set[str] = set()
+        """Directories waiting for `LISTER`, they aren't queued twice"""
+        self.entries_ready.connect(self.on_entries_ready)
+
+    def node(self, index: QModelIndex) -> ProjectTreeNode | None:
+        """
+        Get node by index
+        :param QModelIndex index: model index
+        """
+        if not index.isValid():
+            return None
+        return index.internalPointer()
+
+    def path(self, index: QModelIndex) -> str | None:
+        """
+        Get file path by index
+        :param QModelIndex index: model index
+        """
+        node = self.node(index)
+        return node.path if node is not None else None
+
+    def node_index(self, node: ProjectTreeNode) -> QModelIndex:
+        """
+        Get index of node
+        :param ProjectTreeNode node: node of this model
+        """
+        if node.parent is not None:
+            node.parent.renumber()
+        return self.createIndex(node.row, 0, node)
+
+    def find_node(self, path: str) -> ProjectTreeNode | None:
+        """
+        Find node by path among already listed ones
+        :param str path: file path
+        """
+        relative_path = os.path.relpath(path, self.root.path)
+        if relative_path == ".":
+            return self.root
+        if relative_path.startswith(".."):
+            return None
+        node = self.root
+        for name in relative_path.split(os.sep):
+            node = node.names.get(name)
+            if node is None:
+                return None
+        return node
+
+    def ancestor_indexes(self, path: str) -> list[QModelIndex]:
+        """
+        Indexes of listed directories on the way from root to the path
+        :param str path: file path
+        """
+        relative_path = os.path.relpath(path, self.root.path)
+        if relative_path.startswith(".."):
+            return []
+        indexes = [self.node_index(self.root)]
+        node = self.root
+        for name in relative_path.split(os.sep)[:-1]:
+            node = node.names.get(name)
+            if node is None or not node.is_dir:
+                break
+            indexes.append(self.node_index(node))
+        return indexes
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, self.root)
+        return self.createIndex(row, column, self.node(parent).children[row])
+
+    def parent(self, index: QModelIndex) -> QModelIndex:  # pylint: disable=arguments-differ
+        node = self.node(index)
+        if node is None or node.parent is None:
+            return QModelIndex()
+        return self.node_index(node.parent)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if not parent.isValid():
+            return 1
+        return len(self.node(parent).children)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 1
+
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        if not parent.isValid():
+            return True
+        node = self.node(parent)
+        return node.is_dir and (not node.fetched or bool(node.children))
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        node = self.node(parent)
+        return node is not None and node.is_dir and not node.fetched and not node.fetching
+
+    def fetchMore(self, parent: QModelIndex) -> None:
+        node = self.node(parent)
+        if node is None or node.fetching:
+            return
+        self.list_in_background(node)
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and section == 0:
+            return "File Name"
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        node = self.node(index)
+        if node is None:
+            return None
+        if role == Qt.DisplayRole:
+            return node.name
+        if role == Qt.ToolTipRole:
+            return node.path
+        if role == Qt.DecorationRole:
+            file_type = node.file_type
+            if file_type is None or not file_type.icon:
+                return None
+            if file_type.icon not in self.icons:
+                self.icons[file_type.icon] = QIcon(file_type.icon)
+            return self.icons[file_type.icon]
+        return None
+
+    def list_in_background(self, node: ProjectTreeNode) -> None:
+        """
+        List directory in `LISTER` thread
+        :param ProjectTreeNode node: directory node
+        """
+        node.fetching = True
+        path = node.path
+        if path in self.queued:
+            return
+        self.queued.add(path)
+
+        def list_queued():
+            self.queued.discard(path)
+            return list_directory(path)
+
+        def done(future):
+            try:
+                self.entries_ready.emit(path, future.result())
+            except RuntimeError:  # Model was deleted together with its window
+                pass
+
+        LISTER.submit(list_queued).add_done_callback(done)
+
+    def on_entries_ready(self, path: str, entries: list[tuple[str, bool]] | None) -> None:
+        """Utility method. Bound to signal"""
+        node = self.find_node(path)
+        if node is None or not node.is_dir:
+            return
+        node.fetching = False
+        self.apply_entries(node, entries or [])
+        self.directory_loaded.emit(self.node_index(node))
+
+    def apply_entries(self, node: ProjectTreeNode, entries: list[tuple[str, bool]]) -> None:
+        """
+        Bring children of the node in line with listed entries
+        :param ProjectTreeNode node: directory node
+        :param entries: (name, is directory) sorted by `list_directory`
+        """
+        parent = self.node_index(node)
+        if not node.fetched:
+            node.fetched = True
+            if not entries:
+                # Expander was shown before the directory was listed
+                self.layoutAboutToBeChanged.emit()
+                self.layoutChanged.emit()
+                return
+
+        # Removed entries are taken out in contiguous runs, from the end so rows of earlier runs stay the same.
+        # Rows of the following children are updated once, unless the view asks for them in between
+        listed = dict(entries)
+        kept = [listed.get(child.name) == child.is_dir for child in node.children]
+        row = len(node.children)
+        while row > 0:
+            if kept[row - 1]:
+                row -= 1
+                continue
+            last = row - 1
+            while row > 0 and not kept[row - 1]:
+                row -= 1
+            self.beginRemoveRows(parent, row, last)
+            for child in node.children[row:last + 1]:
+                del node.names[child.name]
+            del node.children[row:last + 1]
+            node.mark_stale(row)
+            self.endRemoveRows()
+
+        # Children and entries are sorted the same way, so new entries are merged in contiguous runs
+        row = 0
+        new_children: list[ProjectTreeNode] = []
+        for name, is_dir in entries + [(None, False)]:
+            if name is not None and name not in node.names:
+                new_children.append(ProjectTreeNode(os.path.join(node.path, name), name, is_dir, node))
+                continue
+            if new_children:
+                self.beginInsertRows(parent, row, row + len(new_children) - 1)
+                node.children[row:row] = new_children
+                for child in new_children:
+                    node.names[child.name] = child
+                node.mark_stale(row)
+                self.endInsertRows()
+                row += len(new_children)
+                new_children = []
+            row += 1
+        node.renumber()
+
+    def refresh(self, path: str | None = None) -> None:
+        """
+        List directories again and apply changes. Directories which were never expanded are left alone
+        :param str path: directory to refresh, all listed directories if not given
+        """
+        if path is not None:
+            node = self.find_node(path)
+            if node is not None and node.is_dir and node.fetched:
+                self.list_in_background(node)
+            return
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.fetched:
+                self.list_in_background(node)
+                stack.extend(child for child in node.children if child.is_dir)
+
+    def handle_event(self, event_type: str, path: str, is_directory: bool, dest_path: str | None = None) -> None:
+        """
+        Update the tree after a filesystem event. Only the directory containing the path is listed again
+        and only if it was listed before
+        :param str event_type: "created", "deleted", "moved" or "modified"
+        :param str path: affected path
+        :param bool is_directory: whether the path is a directory
+        :param str dest_path: new path for "moved" event
+        """
+        if event_type == "moved":
+            self.handle_event("deleted", path, is_directory)
+            self.handle_event("created", dest_path, is_directory)
+            return
+        if event_type not in ("created", "deleted"):
+            return
+        self.refresh(os.path.dirname(path))
+        if event_type == "created" and is_directory:
+            # Directory could be replaced with another one, its listing is outdated
+            self.refresh(path)
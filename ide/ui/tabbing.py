@@ -1,16 +1,22 @@
 import os.path
+from concurrent.futures import ThreadPoolExecutor
 
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QPixmap, QTextOption
-from PySide6.QtWidgets import QHBoxLayout, QLabel, QSizePolicy, QWidget
+from pygments.lexer import Lexer
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QPixmap, QTextCursor, QTextOption
+from PySide6.QtWidgets import QHBoxLayout, QLabel, QMessageBox, QPlainTextEdit, QProgressBar, QSizePolicy, \
+    QVBoxLayout, QWidget
 
 from ide.logs import logger
+from ide.utils.files import read_chunks
 
 from ide.expansion.highlighting import Highlighter
 from ide.expansion.overwritten_qtextedit import TextEdit
 from ide.frames.dialogs.save_conflict.dialog import SaveConflictDialog
 from ide.ui.line_numbers import NumberGutter
 
+FILE_READER = ThreadPoolExecutor(max_workers=2, thread_name_prefix="file-reader")
+
 
 class AbstractWorkspaceTab(QWidget):
     """Base class for all workspace tabs"""
@@ -23,25 +29,29 @@ class AbstractWorkspaceTab(QWidget):
 class CodeEditorTab(AbstractWorkspaceTab):
     """Represents an opened code editor tab"""
 
-    def __init__(self, identifier, editor):
+    def __init__(self, identifier, editor, lexer: Lexer):
+        """
+        :param identifier: path to the file
+        :param editor: main window
+        :param Lexer lexer: lexer highlighting the file, see `Registry.get_lexer`
+        """
         super().__init__(identifier)
         self.h_layout = QHBoxLayout(self)
         self.h_layout.setSpacing(0)
         self.h_layout.setContentsMargins(0, 0, 0, 0)
         self.text_edit = TextEdit(editor)
+        self.text_edit.path = identifier
         if editor.app.config.editor.use_default_font:
             self.text_edit.setStyleSheet(f"font-family: \"{editor.app.default_font_family}\"; "
                                          f"font-size: {editor.app.config.editor.font_size}px;")
         else:
             self.text_edit.setStyleSheet(f"font-family: \"{editor.app.config.editor.font_name}\"; "
                                          f"font-size: {editor.app.config.editor.font_size}px;")
-        self.text_edit.installEventFilter(self)
-        self.text_edit.viewport().installEventFilter(self)
         self.gutter = NumberGutter(editor, self.text_edit)
         self.h_layout.addWidget(self.gutter)
         self.h_layout.addWidget(self.text_edit)
 
-        self.highlighter = Highlighter(self.text_edit, editor.syntax_formatter, "python3")
+        self.highlighter = Highlighter(self.text_edit, editor.syntax_formatter, lexer)
         self.editor = editor
 
         self.last_saved_text = None
@@ -50,21 +60,17 @@ class CodeEditorTab(AbstractWorkspaceTab):
         option.setFlags(QTextOption.ShowTabsAndSpaces)
         self.text_edit.document().setDefaultTextOption(option)
 
-    def eventFilter(self, obj, event):
-        """Utility method. Updates gutter when needed"""
-        if obj in (self.text_edit, self.text_edit.viewport()):
-            self.gutter.update()
-            return False
-        return super().eventFilter(obj, event)
-
     def set_area_text(self, text: str) -> None:
         """
         Wrapper for `self.text_edit.setText(str)`.
         Also saves text (required for conflict resolving)
         :param str text: text
         """
+        self.highlighter.load(text, self.identifier)
         self.text_edit.setText(text)
         self.last_saved_text = text
+        if self.identifier.endswith(".py"):
+            self.editor.analysis.open_document(self.identifier, self.text_edit.document())
 
     def save(self) -> None:
         """
@@ -98,6 +104,211 @@ class CodeEditorTab(AbstractWorkspaceTab):
             with open(self.identifier, "w", encoding='utf-8') as file:
                 file.write(self.text_edit.toPlainText())
             self.last_saved_text = self.text_edit.toPlainText()
+        if self.editor.search_index is not None:
+            self.editor.search_index.update_in_background(self.identifier)
+            self.editor.symbol_index.update_in_background(self.identifier)
+        if self.identifier.endswith(".py"):
+            self.editor.analysis.notify("saved", {"path": self.identifier})
+
+    def handle_external_change(self, event_type: str) -> None:
+        """
+        React to the file being changed on disk. Tab without unsaved changes is reloaded,
+        otherwise conflict is left for `save` to resolve
+        :param str event_type: "created", "deleted" or "modified"
+        """
+        if event_type == "deleted":
+            logger.warning("File %s was deleted outside of the editor", self.identifier)
+            return
+        try:
+            with open(self.identifier, "r", encoding='utf-8') as file:
+                present_saved_text = file.read()
+        except (OSError, UnicodeDecodeError):
+            return
+        if present_saved_text == self.last_saved_text:
+            return  # Saved by this tab
+        if self.text_edit.toPlainText() != self.last_saved_text:
+            logger.warning("File %s was modified outside of the editor and has unsaved changes", self.identifier)
+            return
+        logger.info("File %s was modified outside of the editor, reloading", self.identifier)
+        position = self.text_edit.textCursor().position()
+        scroll = self.text_edit.verticalScrollBar().value()
+        self.set_area_text(present_saved_text)
+        cursor = self.text_edit.textCursor()
+        cursor.setPosition(min(position, self.text_edit.document().characterCount() - 1))
+        self.text_edit.setTextCursor(cursor)
+        self.text_edit.verticalScrollBar().setValue(scroll)
+
+
+class LargeFileTab(AbstractWorkspaceTab):
+    """
+    Represents an opened file too big for `CodeEditorTab`.
+
+    Text is shown by `QPlainTextEdit`, which lays out only the blocks it displays, and is loaded
+    in chunks read in background, so the editor stays responsive while the file is being opened.
+    Highlighting, code analysis and whitespace visualization are disabled.
+    """
+
+    SIZE_THRESHOLD = 2 * 1024 * 1024
+    """Files of this size in bytes and bigger are opened in this tab"""
+    CHUNK_SIZE = 512 * 1024
+
+    chunk_read = Signal(int, str, int, bool)
+    """Loading generation, text, number of bytes read so far and whether invalid bytes were replaced in text"""
+    loading_finished = Signal(int, str)
+    """Loading generation and error message, empty if file was read successfully"""
+
+    def __init__(self, identifier, editor):
+        super().__init__(identifier)
+        self.editor = editor
+        self.v_layout = QVBoxLayout(self)
+        self.v_layout.setSpacing(0)
+        self.v_layout.setContentsMargins(0, 0, 0, 0)
+        self.text_edit = QPlainTextEdit(self)
+        self.text_edit.setLineWrapMode(QPlainTextEdit.NoWrap)
+        if editor.app.config.editor.use_default_font:
+            self.text_edit.setStyleSheet(f"font-family: \"{editor.app.default_font_family}\"; "
+                                         f"font-size: {editor.app.config.editor.font_size}px;")
+        else:
+            self.text_edit.setStyleSheet(f"font-family: \"{editor.app.config.editor.font_name}\"; "
+                                         f"font-size: {editor.app.config.editor.font_size}px;")
+        self.progress = QProgressBar(self)
+        self.progress.setFormat("Loading %p%")
+        self.progress.hide()
+        self.v_layout.addWidget(self.text_edit)
+        self.v_layout.addWidget(self.progress)
+
+        self.generation = 0
+        """Incremented on every (re)loading, chunks of previous ones are ignored"""
+        self.loaded = False
+        self.replaced = False
+        """File is not valid UTF-8, saving the text would corrupt it, so the tab stays read-only"""
+        self.disk_state: tuple[int, int] | None = None
+        """Modification time and size of the file when it was loaded or saved"""
+        self.restored_scroll = 0
+        self.chunk_read.connect(self.on_chunk_read)
+        self.loading_finished.connect(self.on_loading_finished)
+
+    def read_disk_state(self) -> tuple[int, int] | None:
+        """
+        Get modification time and size of the file, None if it doesn't exist
+        """
+        try:
+            stat = os.stat(self.identifier)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self) -> None:
+        """
+        Start reading the file in background. Text is read-only until it is loaded
+        """
+        self.generation += 1
+        self.loaded = False
+        self.replaced = False
+        self.disk_state = self.read_disk_state()
+        document = self.text_edit.document()
+        document.setUndoRedoEnabled(False)
+        self.text_edit.clear()
+        self.text_edit.setReadOnly(True)
+        self.progress.setRange(0, max(self.disk_state[1] if self.disk_state else 0, 1))
+        self.progress.setValue(0)
+        self.progress.show()
+        FILE_READER.submit(self.read_in_background, self.generation)
+
+    def stop_loading(self) -> None:
+        """
+        Stop reading the file, e.g. when the tab is closed
+        """
+        self.generation += 1
+
+    def read_in_background(self, generation: int) -> None:
+        """Utility method. Runs in reader thread"""
+        try:
+            error = ""
+            try:
+                for text, read, replaced in read_chunks(self.identifier, self.CHUNK_SIZE):
+                    if generation != self.generation:
+                        return
+                    self.chunk_read.emit(generation, text, read, replaced)
+            except OSError as exception:
+                error = str(exception)
+            self.loading_finished.emit(generation, error)
+        except RuntimeError:
+            pass  # Tab was deleted
+
+    def on_chunk_read(self, generation: int, text: str, read: int, replaced: bool) -> None:
+        """Utility method. Bound to signal"""
+        if generation != self.generation:
+            return
+        self.replaced |= replaced
+        document = self.text_edit.document()
+        first = document.isEmpty()
+        cursor = QTextCursor(document)
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        if first:
+            self.text_edit.moveCursor(QTextCursor.Start)
+        self.progress.setValue(read)
+
+    def on_loading_finished(self, generation: int, error: str) -> None:
+        """Utility method. Bound to signal"""
+        if generation != self.generation:
+            return
+        self.progress.hide()
+        if error:
+            logger.error("Failed to read file %s: %s", self.identifier, error)
+            return
+        document = self.text_edit.document()
+        document.setUndoRedoEnabled(True)
+        document.setModified(False)
+        self.text_edit.setReadOnly(self.replaced)
+        self.text_edit.verticalScrollBar().setValue(self.restored_scroll)
+        self.restored_scroll = 0
+        self.loaded = True
+        if self.replaced:
+            logger.warning("Large file %s is not valid UTF-8, opened read-only", self.identifier)
+        else:
+            logger.info("Loaded large file %s", self.identifier)
+
+    def save(self) -> None:
+        """
+        Save text in file under `self.identifier` path if it was edited.
+        If file was modified by another software then will ask whether to overwrite it
+        """
+        if not self.loaded or self.replaced or not self.text_edit.document().isModified():
+            return
+        if self.read_disk_state() not in (self.disk_state, None):
+            logger.warning("Found save conflicts in large file %s", self.identifier)
+            answer = QMessageBox.question(
+                self, "Save conflict", f"{self.identifier} was modified outside of the editor. Overwrite it?"
+            )
+            if answer != QMessageBox.Yes:
+                return
+        logger.info("Saving file under %s path", self.identifier)
+        with open(self.identifier, "w", encoding='utf-8') as file:
+            file.write(self.text_edit.toPlainText())
+        self.text_edit.document().setModified(False)
+        self.disk_state = self.read_disk_state()
+        if self.editor.search_index is not None:
+            self.editor.search_index.update_in_background(self.identifier)
+            self.editor.symbol_index.update_in_background(self.identifier)
+
+    def handle_external_change(self, event_type: str) -> None:
+        """
+        React to the file being changed on disk, see `CodeEditorTab.handle_external_change`
+        :param str event_type: "created", "deleted" or "modified"
+        """
+        if event_type == "deleted":
+            logger.warning("File %s was deleted outside of the editor", self.identifier)
+            return
+        if self.read_disk_state() == self.disk_state:
+            return  # Saved by this tab
+        if self.loaded and self.text_edit.document().isModified():
+            logger.warning("File %s was modified outside of the editor and has unsaved changes", self.identifier)
+            return
+        logger.info("File %s was modified outside of the editor, reloading", self.identifier)
+        self.restored_scroll = self.text_edit.verticalScrollBar().value()
+        self.load()
 
 
 class ImageEditorTab(AbstractWorkspaceTab):
@@ -1,5 +1,8 @@
+import codecs
+import io
 import os
 import shutil
+from typing import Iterator
 
 
 def remove(path: str):
@@ -29,3 +32,40 @@ def mkdir(path: str):
     """
     if not os.path.exists(path):
         os.makedirs(path)
+
+
+def read_chunks(path: str, chunk_size: int = 1 << 20,
+                encoding: str = "utf-8") -> Iterator[tuple[str, int, bool]]:
+    """
+    Read text file piece by piece. Multibyte characters and line endings split between chunks
+    are decoded properly, line endings are translated to Unix ones as by `open`.
+    Bytes invalid in the encoding are replaced with U+FFFD
+    :param str path: path to the file
+    :param int chunk_size: number of bytes read at once
+    :param str encoding: encoding of the file
+    :return: iterator of (decoded text, number of bytes read so far, whether bytes were replaced in the text)
+    """
+    byte_decoder = codecs.getincrementaldecoder(encoding)()
+    decoder = io.IncrementalNewlineDecoder(byte_decoder, translate=True)
+
+    def decode(data: bytes, final: bool = False) -> tuple[str, bool]:
+        # Decoders keep their state when they fail, so the same data is decoded again replacing errors
+        try:
+            return decoder.decode(data, final), False
+        except UnicodeDecodeError:
+            byte_decoder.errors = "replace"
+            try:
+                return decoder.decode(data, final), True
+            finally:
+                byte_decoder.errors = "strict"
+
+    read = 0
+    with open(path, "rb") as file:
+        while data := file.read(chunk_size):
+            read += len(data)
+            text, replaced = decode(data)
+            if text:
+                yield text, read, replaced
+    text, replaced = decode(b"", final=True)
+    if text:
+        yield text, read, replaced
@@ -5,7 +5,7 @@ import shutil
 from typing import Optional
 
 from PySide6 import QtCore, QtGui
-from PySide6.QtCore import QProcess
+from PySide6.QtCore import QProcess, QTimer
 from PySide6.QtGui import QColor, QSyntaxHighlighter
 from PySide6.QtWidgets import QApplication, QPushButton, QTextEdit
 
@@ -26,6 +26,18 @@ class TerminalHighlighter(QSyntaxHighlighter):
         super().__init__(text_edit.document())
         self.text_edit = text_edit
         self.output_indexes = []
+        """(start, end, color) of output ranges. Positions are counted from the start of the whole output"""
+        self.trimmed = 0
+        """Number of characters removed from the start of the document by scrollback limit"""
+
+    def trim(self, length: int) -> None:
+        """
+        Forget output ranges of text removed from the start of the document
+        :param int length: number of removed characters
+        """
+        self.trimmed += length
+        index = bisect.bisect_right(self.output_indexes, self.trimmed, key=lambda x: x[1])
+        del self.output_indexes[:index]
 
     def highlightBlock(self, text):
         """
@@ -34,10 +46,11 @@ class TerminalHighlighter(QSyntaxHighlighter):
         block = self.currentBlock()
         while block.text() != text:
             block = block.previous()
-        index = bisect.bisect_right(self.output_indexes, block.position(), key=lambda x: x[0]) - 1
+        block_position = block.position() + self.trimmed
+        index = bisect.bisect_right(self.output_indexes, block_position, key=lambda x: x[0]) - 1
         if index == -1:
             return
-        right_position = min(block.position() + len(text), self.output_indexes[index][1]) - block.position()
+        right_position = min(block_position + len(text), self.output_indexes[index][1]) - block_position
         self.setFormat(0, right_position, self.output_indexes[index][2])
         self.setFormat(right_position, len(text) - right_position, self.STDIN_COLOR)
 
@@ -45,7 +58,13 @@ class TerminalHighlighter(QSyntaxHighlighter):
 class TerminalTextEdit(QTextEdit):
     """
     Class making an interactive terminal process inside QTextEdit
+
+    Output of the process is buffered and flushed into the document at most once per `FLUSH_INTERVAL`
+    by a single insertion. Only the last `scrollback` lines are kept.
     """
+    FLUSH_INTERVAL = 33
+    """Milliseconds between output flushes, about 30 per second"""
+    SCROLLBACK_LINES = 10000
     ENCODING = {
         "Windows": "cp866",
         "Linux": "utf-8",
@@ -72,10 +91,17 @@ class TerminalTextEdit(QTextEdit):
 
     def __init__(
         self, parent, *, python_run_command: Optional[str] = None, cwd: Optional[str] = None,
-        run_button: Optional[QPushButton] = None
+        run_button: Optional[QPushButton] = None, scrollback: Optional[int] = None
             ):
         super().__init__(parent)
+        self.setUndoRedoEnabled(False)  # Output would be kept in undo stack forever
         self.highlighter = TerminalHighlighter(self)
+        self.scrollback = scrollback or self.SCROLLBACK_LINES
+        self.pending_output: list[tuple[str, QColor]] = []
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(self.FLUSH_INTERVAL)
+        self.flush_timer.timeout.connect(self.flush_output)
         self.selectionChanged.connect(self.selection_changed)
         self.run_button = run_button
 
@@ -152,25 +178,73 @@ class TerminalTextEdit(QTextEdit):
 
     def add_blocked_text(self, text, color=TerminalHighlighter.STDOUT_COLOR):
         """
-        Add text inside textedit, make it readable only, move cursor in the end
+        Queue text to be added inside textedit as readable only, see `flush_output`
         """
         if text.startswith(self.command):
             text = text[len(self.command):]
             self.command = ""
-        begin = self.textCursor().position()
-        self.insertPlainText(text)
-        end = self.textCursor().position()
-        if self.highlighter.output_indexes and begin == self.highlighter.output_indexes[-1][1]:
-            self.highlighter.output_indexes[-1] = (self.highlighter.output_indexes[-1][0],
-                                                   end, color)
-        else:
-            self.highlighter.output_indexes.append((begin, end, color))
-        self.blocked_to = self.textCursor().positionInBlock()
+        # Line endings are converted like QTextCursor.insertText does, so positions can be counted in advance
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        if text:
+            self.pending_output.append((text, color))
+            if not self.flush_timer.isActive():
+                self.flush_timer.start()
+
+    def flush_output(self):
+        """
+        Insert queued text at the end of document at once, make it readable only, move cursor in the end
+        """
+        if not self.pending_output:
+            return
+        pending, self.pending_output = self.pending_output, []
+        text = "".join(chunk for chunk, _ in pending)
+        cursor = QtGui.QTextCursor(self.document())
+        cursor.movePosition(QtGui.QTextCursor.End)
+        skipped = overflow = self.skip_overflow(text)
+        # Ranges are known before insertion, so text is highlighted right when it's inserted
+        position = cursor.position() + self.highlighter.trimmed
+        output_indexes = self.highlighter.output_indexes
+        for chunk, color in pending:
+            if skipped >= len(chunk):
+                skipped -= len(chunk)
+                continue
+            chunk_length = len(chunk) - skipped
+            skipped = 0
+            if output_indexes and position == output_indexes[-1][1] and color == output_indexes[-1][2]:
+                output_indexes[-1] = (output_indexes[-1][0], position + chunk_length, color)
+            else:
+                output_indexes.append((position, position + chunk_length, color))
+            position += chunk_length
+        cursor.insertText(text[overflow:])
+        self.trim_scrollback()
         self.moveCursor(QtGui.QTextCursor.End)
-        block = self.document().lastBlock()
-        for _ in range(text.count(self.ENDL) + 1):
-            self.highlighter.rehighlightBlock(block)
-            block = block.previous()
+        self.blocked_to = self.textCursor().positionInBlock()
+
+    def skip_overflow(self, text: str) -> int:
+        """
+        Number of characters at the start of the text which would be trimmed by scrollback limit right away
+        :param str text: text to be inserted
+        """
+        if text.count("\n") < self.scrollback:
+            return 0
+        index = len(text)
+        for _ in range(self.scrollback):
+            index = text.rfind("\n", 0, index)
+        return index + 1
+
+    def trim_scrollback(self):
+        """
+        Remove first blocks of the document so that only `scrollback` lines are left
+        """
+        document = self.document()
+        excess = document.blockCount() - self.scrollback
+        if excess <= 0:
+            return
+        first_kept = document.findBlockByNumber(excess)
+        cursor = QtGui.QTextCursor(document)
+        cursor.setPosition(first_kept.position(), QtGui.QTextCursor.KeepAnchor)
+        self.highlighter.trim(cursor.selectionEnd())  # Before removal, as it rehighlights the new first block
+        cursor.removeSelectedText()
 
     def selection_changed(self):
         """
@@ -181,6 +255,7 @@ class TerminalTextEdit(QTextEdit):
         self.setReadOnly(start < self.document().lastBlock().position() + self.blocked_to)
 
     def finished(self):
+        self.flush_output()
         self.add_blocked_text(self.ENDL * 2)
         self.add_blocked_text(f"Program finished with exit code {self.process.exitCode()}",
                               color=QColor("orange"))
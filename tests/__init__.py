@@ -1 +1,13 @@
 from .config import *
+from .lexing import *
+from .search_index import *
+from .project_files import *
+from .project_watcher import *
+from .registry import *
+from .analysis_worker import *
+from .symbol_index import *
+from .files import *
+from .line_numbers import *
+from .brackets import *
+from .search import *
+from .project_tree import *
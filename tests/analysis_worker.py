@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+from ide.expansion.analysis_worker import Worker
+
+
+class AnalysisWorkerTestCase(unittest.TestCase):
+    '''
+    Check language analysis worker.
+    '''
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.path = os.path.join(self.root, "main.py")
+        self.worker = Worker(self.root)
+        self.worker.handle({"method": "open", "params": {"path": self.path, "text": "import os\nvalue = 1\n"}})
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def request(self, request_id: int, method: str, **params):
+        return self.worker.handle({"id": request_id, "method": method, "params": params})
+
+    def test_change(self):
+        '''
+        Line deltas are applied to opened document.
+        '''
+        self.worker.handle({"method": "change", "params": {"path": self.path, "start": 1, "end": 2,
+                                                           "lines": ["number = 1", "", "numb"]}})
+        self.assertEqual(self.worker.documents[self.path], ["import os", "number = 1", "", "numb", ""])
+        response = self.request(1, "complete", path=self.path, line=4, column=4, limit=5)
+        self.assertEqual(response["id"], 1)
+        self.assertEqual([completion["name_with_symbols"] for completion in response["result"]], ["number"])
+        self.assertEqual(self.worker.preload_queue, ["os"])
+
+    def test_goto_and_references(self):
+        '''
+        Positions of names are reported.
+        '''
+        self.worker.handle({"method": "change", "params": {"path": self.path, "start": 2, "end": 2,
+                                                           "lines": ["print(value)"]}})
+        gotos = self.request(1, "goto", path=self.path, line=3, column=7)["result"]
+        self.assertEqual((gotos[0]["line"], gotos[0]["column"], gotos[0]["module_path"]), (2, 0, self.path))
+        references = self.request(2, "references", path=self.path, line=2, column=0, limit=10)["result"]
+        self.assertEqual([reference["line"] for reference in references], [2, 3])
+
+    def test_prefiltered_references(self):
+        '''
+        Only given files are examined for references.
+        '''
+        for name, text in (("lib.py", "def helper():\n    pass\n"), ("user.py", "from lib import helper\nhelper()\n"),
+                           ("other.py", "from lib import helper\nhelper()\n")):
+            with open(os.path.join(self.root, name), "w", encoding="utf-8") as file:
+                file.write(text)
+        lib = os.path.join(self.root, "lib.py")
+        references = self.request(1, "references", path=lib, line=1, column=4, limit=10,
+                                  files=[lib, os.path.join(self.root, "user.py")])["result"]
+        self.assertEqual([(os.path.basename(reference["module_path"]), reference["line"]) for reference in references],
+                         [("lib.py", 1), ("user.py", 1), ("user.py", 2)])
+
+    def test_cancel_and_errors(self):
+        '''
+        Cancelled requests are skipped, failures are reported.
+        '''
+        self.worker.cancelled.add(1)
+        self.assertIsNone(self.request(1, "complete", path=self.path, line=1, column=0, limit=5))
+        self.assertIn("error", self.request(2, "unknown"))
+        self.assertIsNone(self.worker.handle({"method": "close", "params": {"path": self.path}}))
+        self.assertNotIn(self.path, self.worker.documents)
@@ -0,0 +1,9 @@
+# usage:
+# python -m unittest tests.benchmarks     # from project root
+#
+# BENCHMARK_SIZES=1000,10000   limit generated file sizes (default: 1000,10000,50000)
+# BENCHMARK_STRICT=1           fail on regressions against stored baseline, use on the machine it was recorded on
+# BENCHMARK_TOLERANCE=1.5      allowed slowdown relative to baseline
+# BENCHMARK_UPDATE=1           overwrite stored baseline with current results
+from .highlighting import *
+from .keystrokes import *
@@ -0,0 +1,294 @@
+"""
+Highlighting benchmarks.
+
+`Highlighter` is driven on the offscreen Qt platform against generated Python and C++ files.
+Every scenario reports p50/p95 latency in milliseconds and peak Python memory allocated (KiB).
+Results are compared with `baseline.json`, which is rewritten only when `BENCHMARK_UPDATE=1` is set.
+Timings depend on the machine, so regressions fail the run only when `BENCHMARK_STRICT=1` is set,
+otherwise they are just reported.
+"""
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+import unittest
+from types import SimpleNamespace
+
+from pygments.lexers import get_lexer_by_name
+
+from PySide6.QtCore import QCoreApplication, QEventLoop
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QApplication, QTextEdit
+
+from ide.expansion.highlighting import CustomStyle, Highlighter, QFormatter
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+SIZES = [int(size) for size in os.environ.get("BENCHMARK_SIZES", "1000,10000,50000").split(",")]
+TOLERANCE = float(os.environ.get("BENCHMARK_TOLERANCE", "1.5"))
+UPDATE = os.environ.get("BENCHMARK_UPDATE") == "1"
+STRICT = os.environ.get("BENCHMARK_STRICT") == "1"
+TIMEOUT = 120
+"""Seconds to wait for highlighting to settle"""
+NOISE = 1.0
+"""Milliseconds below which regressions are ignored"""
+
+PYTHON_CHUNK = '''
+
+class Node{0}(Base):
+    """
+    Generated class number {0}
+    """
+
+    def __init__(self, value: int = {0}) -> None:
+        self.value = value  # comment with (brackets) and 'quotes'
+        self.items = [value * 2, {{"key": value}}, (value, "{0}")]
+
+    def describe(self) -> str:
+        return f"Node {{self.value!r}} of {0}"
+'''
+
+CPP_CHUNK = '''
+/* Generated class number {0}
+   with multiline comment */
+class Node{0} : public Base {{
+public:
+    explicit Node{0}(int value = {0}) : value_(value) {{}}
+    int compute(const std::vector<int>& items) const {{
+        int result = 0;  // comment with (brackets)
+        for (auto item : items) {{ result += item * value_; }}
+        return result + std::string("{0}").size();
+    }}
+private:
+    int value_;
+}};
+'''
+
+
+def generate(chunk: str, lines: int) -> str:
+    """
+    Repeat numbered chunk until text has given number of lines
+    :param str chunk: template with {0} placeholder
+    :param int lines: number of lines
+    """
+    result = []
+    index = 0
+    while len(result) < lines:
+        result.extend(chunk.format(index).split("\n")[1:])
+        index += 1
+    return "\n".join(result[:lines])
+
+
+LANGUAGES = {
+    "python": ("python3", PYTHON_CHUNK),
+    "cpp": ("cpp", CPP_CHUNK),
+}
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile
+    :param list[float] samples: measured values
+    :param float fraction: percentile from 0 to 1
+    """
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def load_baseline() -> dict:
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as file:
+            return json.load(file)
+    return {}
+
+
+class Fixture:
+    """
+    Text edit with highlighter attached
+    """
+
+    def __init__(self, formatter: "QFormatter", lexer_name: str, text: str, text_edit: "QTextEdit | None" = None):
+        self.text_edit = text_edit if text_edit is not None else QTextEdit()
+        self.text_edit.resize(800, 600)
+        self.highlighter = Highlighter(self.text_edit, formatter, get_lexer_by_name(lexer_name))
+        self.text_edit.setPlainText(text)
+        self.settle()
+
+    def settle(self) -> None:
+        """
+        Run event loop until highlighting of the whole document is finished
+        """
+        deadline = time.perf_counter() + TIMEOUT
+        while not self.highlighter.scheduler.is_idle():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("Highlighting did not settle")
+            QCoreApplication.processEvents(QEventLoop.AllEvents, 10)
+        QCoreApplication.processEvents()
+
+    def insert(self, block_number: int, text: str) -> None:
+        cursor = QTextCursor(self.text_edit.document().findBlockByNumber(block_number))
+        cursor.insertText(text)
+
+    def remove(self, block_number: int, length: int) -> None:
+        cursor = QTextCursor(self.text_edit.document().findBlockByNumber(block_number))
+        cursor.movePosition(QTextCursor.Right, QTextCursor.KeepAnchor, length)
+        cursor.removeSelectedText()
+
+    def close(self) -> None:
+        self.text_edit.deleteLater()
+        QCoreApplication.processEvents()
+
+
+class Benchmark(unittest.TestCase):
+    '''
+    Base of benchmarks: measures scenarios and compares them with stored baseline.
+    '''
+    app = None
+    formatter = None
+    baseline: dict = {}
+    results: dict = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv[:1])
+        config = SimpleNamespace(appearance=SimpleNamespace(scheme="emacs"))
+        cls.formatter = QFormatter(SimpleNamespace(config=config))
+        cls.baseline = load_baseline()
+        cls.results = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        print(file=sys.stderr)
+        print(f"{'scenario':<40}{'p50, ms':>10}{'p95, ms':>10}{'peak, KiB':>12}{'p50/baseline':>14}",
+              file=sys.stderr)
+        for name, result in sorted(cls.results.items()):
+            expected = cls.baseline.get(name)
+            ratio = f"{result['p50'] / expected['p50']:.2f}" if expected and expected["p50"] else "-"
+            print(f"{name:<40}{result['p50']:>10.2f}{result['p95']:>10.2f}{result['peak_kib']:>12.0f}{ratio:>14}",
+                  file=sys.stderr)
+        if UPDATE and cls.results:
+            baseline = {**load_baseline(), **cls.results}
+            with open(BASELINE_PATH, "w", encoding="utf-8") as file:
+                json.dump(dict(sorted(baseline.items())), file, indent=2)
+                file.write("\n")
+
+    def measure(self, name: str, operation, repeat: int) -> dict:
+        """
+        Run the operation several times, then once more with allocation tracing, and check the baseline
+        :param str name: scenario name
+        :param operation: callable returning measured duration in seconds
+        :param int repeat: number of timed runs
+        :return: p50 and p95 latency in milliseconds and peak allocation in KiB
+        """
+        samples = [operation() * 1000 for _ in range(repeat)]
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            operation()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        result = {"p50": percentile(samples, 0.5), "p95": percentile(samples, 0.95), "peak_kib": peak / 1024}
+        self.results[name] = {key: round(value, 3) for key, value in result.items()}
+
+        if UPDATE:
+            return result
+        expected = self.baseline.get(name)
+        self.assertIsNotNone(expected, f"{name}: no baseline, run with BENCHMARK_UPDATE=1 to record it")
+        if not STRICT:
+            return result
+        for key in ("p50", "p95"):
+            limit = max(expected[key] * TOLERANCE, expected[key] + NOISE)
+            self.assertLessEqual(result[key], limit, f"{name}: {key} regressed from {expected[key]:.2f}ms")
+        self.assertLessEqual(result["peak_kib"], expected["peak_kib"] * TOLERANCE + 64,
+                             f"{name}: peak allocation regressed from {expected['peak_kib']:.0f}KiB")
+        return result
+
+
+class HighlightingBenchmark(Benchmark):
+    '''
+    Measure highlighting latency and fail on regressions against stored baseline.
+    '''
+    def scenarios(self):
+        for language, (lexer_name, chunk) in LANGUAGES.items():
+            for size in SIZES:
+                yield f"{language}-{size // 1000}k", lexer_name, generate(chunk, size), size
+
+    def test_full_rehighlight(self):
+        '''
+        Set text into a new document and wait until it's highlighted.
+        '''
+        for name, lexer_name, text, size in self.scenarios():
+            def operation(lexer_name=lexer_name, text=text):
+                start = time.perf_counter()
+                fixture = Fixture(self.formatter, lexer_name, text)
+                duration = time.perf_counter() - start
+                fixture.close()
+                return duration
+
+            with self.subTest(name):
+                self.measure(f"{name}/full_rehighlight", operation, repeat=max(3, 10000 // size))
+
+    def test_single_char_edit(self):
+        '''
+        Type and erase a character at the start, the middle and the end of document.
+        '''
+        for name, lexer_name, text, size in self.scenarios():
+            fixture = Fixture(self.formatter, lexer_name, text)
+            for place, block_number in (("start", 0), ("middle", size // 2), ("end", size - 1)):
+                def operation(fixture=fixture, block_number=block_number):
+                    start = time.perf_counter()
+                    fixture.insert(block_number, "x")
+                    fixture.settle()
+                    fixture.remove(block_number, 1)
+                    fixture.settle()
+                    return (time.perf_counter() - start) / 2
+
+                with self.subTest(name, place=place):
+                    self.measure(f"{name}/edit_{place}", operation, repeat=20)
+            fixture.close()
+
+    def test_triple_quote_toggle(self):
+        '''
+        Open and close a multiline string (comment for C++) in the middle of document,
+        which changes highlighting of everything after it.
+        '''
+        for name, lexer_name, text, size in self.scenarios():
+            opening = '"""' if lexer_name == "python3" else "/*"
+            fixture = Fixture(self.formatter, lexer_name, text)
+
+            def operation(fixture=fixture, size=size, opening=opening):
+                start = time.perf_counter()
+                fixture.insert(size // 2, opening)
+                fixture.settle()
+                fixture.remove(size // 2, len(opening))
+                fixture.settle()
+                return (time.perf_counter() - start) / 2
+
+            with self.subTest(name):
+                self.measure(f"{name}/triple_quote_toggle", operation, repeat=5)
+            fixture.close()
+
+    def test_theme_switch(self):
+        '''
+        Switch color scheme and wait until the document is restyled.
+        '''
+        for name, lexer_name, text, _ in self.scenarios():
+            fixture = Fixture(self.formatter, lexer_name, text)
+            themes = ["monokai", "emacs"]
+
+            def operation(fixture=fixture, themes=themes):
+                start = time.perf_counter()
+                themes.reverse()
+                CustomStyle.get_style_by_name(themes[0])
+                if self.formatter.update_style():
+                    fixture.highlighter.rehighlight()
+                fixture.settle()
+                return time.perf_counter() - start
+
+            with self.subTest(name):
+                self.measure(f"{name}/theme_switch", operation, repeat=6)
+            fixture.close()
@@ -0,0 +1,58 @@
+"""
+Keystroke benchmarks.
+
+`TextEdit` with `Highlighter` attached is driven on the offscreen Qt platform: keys with special handling
+(auto indentation, smart Tab and Backspace, bracket matching) are pressed in the middle of generated
+Python files. Latency of a keystroke must not grow with the size of the document.
+"""
+import time
+from types import SimpleNamespace
+
+from PySide6.QtCore import QEvent, Qt
+from PySide6.QtGui import QKeyEvent, QTextCursor
+
+from ide.expansion.overwritten_qtextedit import TextEdit
+
+from .highlighting import LANGUAGES, NOISE, SIZES, TOLERANCE, Benchmark, Fixture, generate
+
+
+class KeystrokeBenchmark(Benchmark):
+    '''
+    Measure keystroke latency and fail if it depends on document size.
+    '''
+    def test_keystrokes(self):
+        '''
+        At the end of a method definition line press Return (the new line is indented by 8 spaces) and Tab,
+        erase the indentation and the line with smart Backspace, then type and erase a bracket.
+        The document is left as it was.
+        '''
+        keys = [(Qt.Key_Return, ""), (Qt.Key_Tab, "")] + [(Qt.Key_Backspace, "")] * 4 \
+            + [(Qt.Key_ParenLeft, "("), (Qt.Key_Backspace, "")]
+        lexer_name, chunk = LANGUAGES["python"]
+        results = {}
+        for size in SIZES:
+            text_edit = TextEdit(SimpleNamespace(analysis=SimpleNamespace(documents={})))
+            fixture = Fixture(self.formatter, lexer_name, generate(chunk, size), text_edit)
+            block = text_edit.document().findBlockByNumber(size // 2)
+            while not (block.text().startswith("    def ") and block.text().endswith(":")):
+                block = block.next()
+            cursor = QTextCursor(block)
+            cursor.movePosition(QTextCursor.EndOfBlock)
+            text_edit.setTextCursor(cursor)
+            original = block.text()
+
+            def operation(text_edit=text_edit, fixture=fixture):
+                start = time.perf_counter()
+                for key, text in keys:
+                    text_edit.keyPressEvent(QKeyEvent(QEvent.KeyPress, key, Qt.NoModifier, text))
+                    fixture.settle()
+                return (time.perf_counter() - start) / len(keys)
+
+            with self.subTest(size=size):
+                results[size] = self.measure(f"python-{size // 1000}k/keystroke", operation, repeat=20)
+                self.assertEqual(text_edit.textCursor().block().text(), original)
+            fixture.close()
+
+        smallest, largest = results[min(SIZES)], results[max(SIZES)]
+        self.assertLessEqual(largest["p50"], max(smallest["p50"] * TOLERANCE, smallest["p50"] + NOISE),
+                             "keystroke latency grows with document size")
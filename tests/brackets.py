@@ -0,0 +1,132 @@
+import os
+import random
+import sys
+import unittest
+from types import SimpleNamespace
+
+from pygments.lexers import get_lexer_by_name
+from PySide6.QtCore import QCoreApplication
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QApplication, QTextEdit
+
+from ide.expansion.brackets import BRACKETS, KINDS, BracketTree, summarize
+from ide.expansion.highlighting import Highlighter, QFormatter
+from ide.expansion.lexing import find_brackets
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+def match_line(lines: list[str], line: int, index: int) -> int | None:
+    '''
+    Line of the bracket matching the one at given position, found by walking all lines
+    '''
+    char = lines[line][index]
+    step = 1 if char in BRACKETS else -1
+    opening = char if step == 1 else next(key for key, value in BRACKETS.items() if value == char)
+    depth_change = {opening: step, BRACKETS[opening]: -step}
+    depth = 0
+    while 0 <= line < len(lines):
+        positions = list(find_brackets(lines[line]))
+        for position in (positions if step == 1 else reversed(positions)):
+            if index is not None and (position - index) * step < 0:
+                continue
+            depth += depth_change.get(lines[line][position], 0)
+            if depth == 0:
+                return line
+        index = None
+        line += step
+    return None
+
+
+def unmatched(text: str, bracket: str) -> int:
+    '''
+    Depth change of brackets of the kind of given one in text
+    '''
+    summary = summarize(text, find_brackets(text))
+    return summary[2 * KINDS[bracket]]
+
+
+class BracketTreeTestCase(unittest.TestCase):
+    '''
+    Check lookup of matching brackets by line summaries.
+    '''
+    def random_line(self) -> str:
+        return "".join(random.choice("()[]{}ab") for _ in range(random.randint(0, 4)))
+
+    def test_matches_linear_walk(self):
+        '''
+        Lines found in the tree are the ones found by walking lines, also after edits.
+        '''
+        random.seed(7)
+        for _ in range(100):
+            lines = [self.random_line() for _ in range(random.randint(1, 30))]
+            tree = BracketTree([summarize(line, find_brackets(line)) for line in lines])
+            for _ in range(5):
+                start = random.randint(0, len(lines))
+                end = random.randint(start, min(len(lines), start + 3))
+                new_lines = [self.random_line() for _ in range(random.randint(0, 3))]
+                lines[start:end] = new_lines
+                tree.replace(start, end, [summarize(line, find_brackets(line)) for line in new_lines])
+                if lines:
+                    number = random.randrange(len(lines))
+                    lines[number] = self.random_line()
+                    tree.set(number, summarize(lines[number], find_brackets(lines[number])))
+            self.assertEqual(len(tree), len(lines))
+            for number, line in enumerate(lines):
+                for index in find_brackets(line):
+                    expected = match_line(lines, number, index)
+                    if expected == number:
+                        continue
+                    char = line[index]
+                    if char in BRACKETS:
+                        depth = unmatched(line[index:], char)
+                        found = tree.find_closing(number, char, depth)
+                    else:
+                        depth = -unmatched(line[:index + 1], char)
+                        found = tree.find_opening(number, char, depth)
+                    self.assertEqual(found, expected, (lines, number, index))
+
+
+class BracketMatchingTestCase(unittest.TestCase):
+    '''
+    Check bracket matching of the highlighter in big documents.
+    '''
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    def setUp(self) -> None:
+        formatter = QFormatter(SimpleNamespace(config=SimpleNamespace(appearance=SimpleNamespace(scheme="emacs"))))
+        self.text_edit = QTextEdit()
+        self.highlighter = Highlighter(self.text_edit, formatter, get_lexer_by_name("python3"))
+        self.text_edit.setPlainText("\n".join(["x = (1,"] + ["    'a)', 2,"] * 8000 + [")"]))
+        self.settle()
+
+    def settle(self) -> None:
+        while not self.highlighter.scheduler.is_idle():
+            QCoreApplication.processEvents()
+
+    def test_far_brackets(self):
+        '''
+        Brackets thousands of lines apart are matched, brackets in strings are skipped.
+        '''
+        document = self.text_edit.document()
+        closing = document.lastBlock().position()
+        self.assertEqual(self.highlighter.find_bracket(document.firstBlock(), 4, 1), closing)
+        self.assertEqual(self.highlighter.find_bracket(document.lastBlock(), 0, -1), 4)
+
+    def test_edits(self):
+        '''
+        Index follows inserted and removed lines.
+        '''
+        document = self.text_edit.document()
+        cursor = QTextCursor(document.findBlockByNumber(4000))
+        cursor.insertText("(\n")
+        self.settle()
+        self.assertIsNone(self.highlighter.find_bracket(document.firstBlock(), 4, 1))
+        self.assertEqual(self.highlighter.find_bracket(document.findBlockByNumber(4000), 0, 1),
+                         document.lastBlock().position())
+        cursor.deletePreviousChar()
+        cursor.deletePreviousChar()
+        self.settle()
+        self.assertEqual(self.highlighter.find_bracket(document.firstBlock(), 4, 1), document.lastBlock().position())
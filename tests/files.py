@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from ide.utils.files import read_chunks
+
+
+class ReadChunksTestCase(unittest.TestCase):
+    '''
+    Check chunked reading of large files.
+    '''
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "data.txt")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write(self, data: bytes) -> None:
+        with open(self.path, "wb") as file:
+            file.write(data)
+
+    def test_same_as_open(self):
+        '''
+        Joined chunks are equal to text read at once, whatever the chunk size is.
+        '''
+        self.write("π = 3.14\r\nмир\rend\n".encode() * 50)
+        with open(self.path, "r", encoding="utf-8") as file:
+            expected = file.read()
+        for chunk_size in (1, 2, 3, 7, 1 << 20):
+            self.assertEqual("".join(text for text, _, _ in read_chunks(self.path, chunk_size)), expected)
+
+    def test_progress(self):
+        '''
+        Number of bytes read grows up to the file size.
+        '''
+        self.write(b"line\n" * 1000)
+        progress = [read for _, read, _ in read_chunks(self.path, 1024)]
+        self.assertEqual(progress, sorted(progress))
+        self.assertEqual(progress[-1], 5000)
+        self.assertEqual(len(progress), 5)
+
+    def test_empty(self):
+        '''
+        Empty file has no chunks.
+        '''
+        self.write(b"")
+        self.assertEqual(list(read_chunks(self.path)), [])
+
+    def test_invalid_bytes(self):
+        '''
+        Invalid bytes are replaced and reported in chunks containing them only.
+        '''
+        self.write("мир\n".encode() * 100 + b"\xff" + "end\n".encode())
+        chunks = list(read_chunks(self.path, 100))
+        self.assertEqual("".join(text for text, _, _ in chunks), "мир\n" * 100 + "\ufffdend\n")
+        self.assertEqual([replaced for _, _, replaced in chunks], [False] * 7 + [True])
@@ -0,0 +1,139 @@
+import unittest
+
+from pygments.lexers import get_lexer_by_name
+
+from ide.expansion.lexing import ROOT_STATE, TOKEN_TYPES, StateTable, TokenCache, find_brackets, lex_line, lex_lines
+
+SAMPLE = '''import os
+
+
+def main(path: str) -> None:
+    # Multiline strings with 'quotes'
+    text = f"{path!r} exists" if os.path.exists(path) else 'missing'
+    query = """SELECT *
+FROM table"""  # comment
+    return [text, query]
+'''
+
+DOCSTRING_SAMPLE = '''def main():
+    r"""
+    Docstring with 'quotes' and (brackets
+    """
+    return """not a
+docstring"""
+'''
+
+CPP_SAMPLE = '''#include <vector>
+/* Don't lex
+   (brackets) { here } */ int x = f(1);
+int main() {
+    /* inline */ return x; /* open
+    it's still a comment */
+}
+'''
+
+
+class LexLineTestCase(unittest.TestCase):
+    '''
+    Check line by line lexing.
+    '''
+    def assert_same_as_full_text(self, language: str, text: str):
+        '''
+        Lexing line by line gives the same token for every non-whitespace symbol as lexing the whole text.
+        '''
+        lexer = get_lexer_by_name(language)
+        expected = []
+        for _, token, value in lexer.get_tokens_unprocessed(text):
+            expected.extend([token] * len(value))
+
+        actual = []
+        stack = ROOT_STATE
+        for line in text.split("\n")[:-1]:
+            tokens, stack = lex_line(lexer, line, stack)
+            for length, type_id in zip(tokens.lengths, tokens.types):
+                actual.extend([TOKEN_TYPES.get(type_id)] * length)
+        symbols = [index for index, char in enumerate(text) if not char.isspace()]
+        self.assertEqual([expected[i] for i in symbols], [actual[i] for i in symbols])
+        self.assertEqual(stack, ROOT_STATE)
+
+    def test_same_as_full_text(self):
+        '''
+        Python code is lexed as a whole.
+        '''
+        self.assert_same_as_full_text("python3", SAMPLE)
+
+    def test_docstring(self):
+        '''
+        Docstrings spanning lines are continued on the next lines.
+        '''
+        self.assert_same_as_full_text("python3", DOCSTRING_SAMPLE)
+
+    def test_block_comment(self):
+        '''
+        C-family block comments spanning lines are continued on the next lines.
+        '''
+        for language in ("c", "cpp", "java"):
+            with self.subTest(language):
+                self.assert_same_as_full_text(language, CPP_SAMPLE)
+
+    def test_multiline_string_state(self):
+        '''
+        Opened multiline string is carried to the next line.
+        '''
+        lexer = get_lexer_by_name("python3")
+        _, stack = lex_line(lexer, 'x = """abc', ROOT_STATE)
+        self.assertNotEqual(stack, ROOT_STATE)
+        _, stack = lex_line(lexer, 'abc"""', stack)
+        self.assertEqual(stack, ROOT_STATE)
+
+    def test_state_table(self):
+        '''
+        Equal stacks get equal ids, negative id is the root state.
+        '''
+        states = StateTable()
+        self.assertEqual(states.intern(ROOT_STATE), 0)
+        state_id = states.intern(("root", "tdqs"))
+        self.assertEqual(states.intern(("root", "tdqs")), state_id)
+        self.assertEqual(states.get(state_id), ("root", "tdqs"))
+        self.assertEqual(states.get(-1), ROOT_STATE)
+
+    def test_lex_lines(self):
+        '''
+        Lexing consecutive lines carries state between them and can be abandoned.
+        '''
+        lexer = get_lexer_by_name("python3")
+        states = StateTable()
+        results = lex_lines(lexer, ['x = """', 'text', '"""'], states, -1)
+        self.assertEqual([states.get(end_state) == ROOT_STATE for _, end_state in results], [False, False, True])
+        self.assertIsNone(lex_lines(lexer, ['x = 1'], states, -1, lambda: True))
+
+    def test_token_cache(self):
+        '''
+        Least recently used documents are evicted first.
+        '''
+        cache = TokenCache(size=2)
+        cache.put(("a.py", 1), ["a"], [])
+        cache.put(("b.py", 1), ["b"], [])
+        self.assertIsNotNone(cache.get(("a.py", 1)))
+        cache.put(("c.py", 1), ["c"], [])
+        self.assertIsNone(cache.get(("b.py", 1)))
+        self.assertEqual(cache.get(("a.py", 1)), (["a"], []))
+
+    def test_bracket_index(self):
+        '''
+        Brackets inside strings and comments are not indexed.
+        '''
+        line = 'call(x["(", 1], {2})  # )'
+        tokens, _ = lex_line(get_lexer_by_name("python3"), line)
+        self.assertEqual(list(tokens.brackets), [4, 6, 13, 16, 18, 19])
+        self.assertEqual(list(find_brackets(line)), [4, 6, 8, 13, 16, 18, 19, 24])
+
+    def test_continued_comment_brackets(self):
+        '''
+        Brackets of block comment lines are not indexed.
+        '''
+        lexer = get_lexer_by_name("cpp")
+        lines = CPP_SAMPLE.split("\n")
+        _, stack = lex_line(lexer, lines[1])
+        tokens, _ = lex_line(lexer, lines[2], stack)
+        self.assertEqual(list(tokens.brackets), [len(lines[2]) - 4, len(lines[2]) - 2])
@@ -0,0 +1,79 @@
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+from PySide6.QtGui import QFont
+from PySide6.QtWidgets import QApplication, QPlainTextEdit
+
+from ide.ui.line_numbers import GutterAnnotation, NumberGutter
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+class NumberGutterTestCase(unittest.TestCase):
+    '''
+    Check font caching and annotation width bookkeeping of the gutter.
+    '''
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    def setUp(self) -> None:
+        self.config = SimpleNamespace(use_default_font=False, font_name="Monospace", font_size=16)
+        app = SimpleNamespace(config=SimpleNamespace(editor=self.config), default_font=QFont("Monospace"))
+        self.gutter = NumberGutter(SimpleNamespace(app=app))
+
+    def width(self, text: str) -> int:
+        return self.gutter.font_metrics.horizontalAdvance(text)
+
+    def test_font_cache(self):
+        '''
+        Font is built with the gutter and rebuilt only when settings change.
+        '''
+        self.assertIsNotNone(self.gutter.painting_font)
+        font = self.gutter.painting_font
+        self.assertFalse(self.gutter.update_font())
+        self.assertIs(self.gutter.painting_font, font)
+        self.config.font_size = 20
+        self.assertTrue(self.gutter.update_font())
+        self.assertEqual(self.gutter.painting_font.pixelSize(), 20)
+
+    def test_annotation_widths(self):
+        '''
+        Widest annotation follows additions and removals.
+        '''
+        short, long = GutterAnnotation(GutterAnnotation.TEXT, "a"), GutterAnnotation(GutterAnnotation.TEXT, "abcdef")
+        color = GutterAnnotation(GutterAnnotation.COLOR, None)
+        self.gutter.add_annotation(1, short)
+        self.gutter.add_annotation(2, long)
+        self.gutter.add_annotation(2, color)
+        self.assertEqual(self.gutter.widest_annotation, self.width("abcdef"))
+        self.gutter.remove_annotation(2, long)
+        self.assertEqual(self.gutter.widest_annotation, self.width("a"))
+        self.gutter.add_annotation(3, long)
+        self.gutter.remove_annotations(3)
+        self.assertEqual(self.gutter.widest_annotation, self.width("a"))
+        self.gutter.remove_annotations()
+        self.assertEqual(self.gutter.widest_annotation, 0)
+        self.assertEqual(self.gutter.gutter_annotations, {})
+
+    def test_font_change_remeasures_annotations(self):
+        '''
+        Annotation widths are measured again with the new font.
+        '''
+        self.gutter.add_annotation(1, GutterAnnotation(GutterAnnotation.TEXT, "abcdef"))
+        self.config.font_size = 32
+        self.gutter.update_font()
+        self.assertEqual(self.gutter.widest_annotation, self.width("abcdef"))
+
+    def test_font_change_resizes(self):
+        '''
+        Gutter is resized when the font of the text edit changes, not while painting.
+        '''
+        edit = QPlainTextEdit()
+        gutter = NumberGutter(SimpleNamespace(app=self.gutter.app), edit)
+        width = gutter.width()
+        self.config.font_size = 32
+        edit.setStyleSheet("font-size: 32px;")
+        self.assertGreater(gutter.width(), width)
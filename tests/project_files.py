@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+
+from ide.expansion.project_files import IgnoreRule, ProjectFiles, is_ignored, parse_rules
+
+
+class IgnoreRuleTestCase(unittest.TestCase):
+    '''
+    Check .gitignore patterns.
+    '''
+    def test_patterns(self):
+        '''
+        Patterns without slash match at any depth, others are anchored to the .gitignore directory.
+        '''
+        self.assertTrue(IgnoreRule("*.log").matches("a/b/c.log", False))
+        self.assertTrue(IgnoreRule("build").matches("src/build", True))
+        self.assertFalse(IgnoreRule("build/").matches("src/build", False))
+        self.assertTrue(IgnoreRule("/docs/*.md").matches("docs/a.md", False))
+        self.assertFalse(IgnoreRule("/docs/*.md").matches("src/docs/a.md", False))
+        self.assertTrue(IgnoreRule("docs/**/gen").matches("docs/a/b/gen", True))
+        self.assertTrue(IgnoreRule("out", "sub").matches("sub/x/out", True))
+        self.assertFalse(IgnoreRule("out", "sub").matches("other/out", True))
+        self.assertTrue(IgnoreRule("file[0-9].py").matches("file1.py", False))
+
+    def test_negation(self):
+        '''
+        The last matching rule wins.
+        '''
+        rules = parse_rules(["# comment", "*.py", "!keep.py", ""])
+        self.assertTrue(is_ignored(rules, "a.py", False))
+        self.assertFalse(is_ignored(rules, "keep.py", False))
+        self.assertFalse(is_ignored(rules, "a.txt", False))
+
+
+class ProjectFilesTestCase(unittest.TestCase):
+    '''
+    Check project file listing.
+    '''
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        for path in ("main.py", "lib/util.py", "lib/data.txt", "build/gen.py", "venv/lib/site.py",
+                     ".ide/project.yml", "sub/out/x.py", "sub/y.py", "notes.cpp"):
+            self.write(path, "")
+        self.write(".gitignore", "build/\n*.txt\n")
+        self.write("sub/.gitignore", "out/\n")
+        self.files = ProjectFiles(self.root, ["*.cpp"])
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write(self, path: str, text: str) -> None:
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def path(self, relative_path: str) -> str:
+        return os.path.join(self.root, *relative_path.split("/"))
+
+    def test_listing(self):
+        '''
+        Ignored files and directories are skipped.
+        '''
+        self.assertEqual(self.files.files(("py",)), [self.path("lib/util.py"), self.path("main.py"),
+                                                     self.path("sub/y.py")])
+        self.assertEqual(self.files.files(path=self.path("lib")), [self.path("lib/util.py")])
+
+    def test_events(self):
+        '''
+        Listing is updated from filesystem events.
+        '''
+        self.files.files()
+        self.write("new.py", "")
+        self.files.handle_event("created", self.path("new.py"), False)
+        self.write("lib/new.txt", "")
+        self.files.handle_event("created", self.path("lib/new.txt"), False)
+        self.assertIn(self.path("new.py"), self.files.files())
+        self.assertNotIn(self.path("lib/new.txt"), self.files.files())
+
+        os.rename(self.path("main.py"), self.path("renamed.py"))
+        self.files.handle_event("moved", self.path("main.py"), False, self.path("renamed.py"))
+        self.assertNotIn(self.path("main.py"), self.files.files())
+        self.assertIn(self.path("renamed.py"), self.files.files())
+
+        self.write(".gitignore", "")
+        self.files.handle_event("modified", self.path(".gitignore"), False)
+        self.files.handle_event("created", self.path(".gitignore"), False)
+        self.assertIn(self.path("build/gen.py"), self.files.files())
+
+    def test_is_included(self):
+        '''
+        Single files are checked by the same rules, whether the project was listed or not.
+        '''
+        for listed in (False, True):
+            if listed:
+                self.files.files()
+            with self.subTest(listed=listed):
+                for path in ("main.py", "lib/util.py", "sub/y.py", "new/file.py"):
+                    self.assertTrue(self.files.is_included(self.path(path)), path)
+                for path in ("build/gen.py", "lib/data.txt", "venv/lib/site.py", "sub/out/x.py", "notes.cpp"):
+                    self.assertFalse(self.files.is_included(self.path(path)), path)
+                self.assertFalse(self.files.is_included(os.path.join(os.path.dirname(self.root), "outside.py")))
@@ -0,0 +1,44 @@
+import random
+import sys
+import unittest
+
+from PySide6.QtTest import QAbstractItemModelTester
+from PySide6.QtWidgets import QApplication
+
+from ide.ui.project_tree import ProjectTreeModel
+
+
+class ProjectTreeModelTestCase(unittest.TestCase):
+    '''
+    Check applying of directory listings to project tree.
+    '''
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    def setUp(self) -> None:
+        self.model = ProjectTreeModel("/project")
+        self.tester = QAbstractItemModelTester(self.model, QAbstractItemModelTester.FailureReportingMode.Warning)
+        self.names = [f"{prefix}{number}" for prefix in "aAbB" for number in range(5)]
+
+    def random_entries(self) -> list[tuple[str, bool]]:
+        entries = [(name, random.random() < 0.3) for name in random.sample(self.names, random.randint(0, 20))]
+        return sorted(entries, key=lambda entry: (not entry[1], entry[0].lower(), entry[0]))
+
+    def test_apply_entries(self):
+        '''
+        Children follow listed entries, rows and lookups stay consistent after every change.
+        '''
+        random.seed(3)
+        root = self.model.root
+        self.model.apply_entries(root, [])
+        self.assertTrue(root.fetched)
+        for _ in range(50):
+            entries = self.random_entries()
+            self.model.apply_entries(root, entries)
+            self.assertEqual([(child.name, child.is_dir) for child in root.children], entries)
+            self.assertEqual([child.row for child in root.children], list(range(len(entries))))
+            self.assertEqual(set(root.names), {name for name, _ in entries})
+            for child in root.children:
+                if child.is_dir and random.random() < 0.5:
+                    self.model.apply_entries(child, self.random_entries())
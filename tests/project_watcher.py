@@ -0,0 +1,47 @@
+import unittest
+
+from ide.expansion.project_watcher import coalesce
+
+
+class CoalesceTestCase(unittest.TestCase):
+    '''
+    Check merging of filesystem events.
+    '''
+    def test_burst(self):
+        '''
+        Every path is reported once with the net change.
+        '''
+        events = [
+            ("created", "/p/a.py", False, None),
+            ("modified", "/p/a.py", False, None),
+            ("modified", "/p/b.py", False, None),
+            ("modified", "/p/b.py", False, None),
+            ("created", "/p/tmp", False, None),
+            ("deleted", "/p/tmp", False, None),
+            ("modified", "/p", True, None),
+        ]
+        self.assertEqual(coalesce(events), [
+            ("created", "/p/a.py", False, None),
+            ("modified", "/p/b.py", False, None),
+        ])
+
+    def test_save_through_temporary_file(self):
+        '''
+        Replacing a file with a moved temporary one is a modification.
+        '''
+        events = [
+            ("created", "/p/.a.py.swp", False, None),
+            ("modified", "/p/.a.py.swp", False, None),
+            ("deleted", "/p/a.py", False, None),
+            ("moved", "/p/.a.py.swp", False, "/p/a.py"),
+        ]
+        self.assertEqual(coalesce(events), [("modified", "/p/a.py", False, None)])
+
+    def test_rename(self):
+        '''
+        Moves are split into deletion and creation.
+        '''
+        self.assertEqual(coalesce([("moved", "/p/old", True, "/p/new")]), [
+            ("deleted", "/p/old", True, None),
+            ("created", "/p/new", True, None),
+        ])
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+from ide.expansion.file_types import FileType, GenericFile, GenericFolder, GenericLink, PythonFile
+from ide.registry import Registry
+
+
+class FileTypeResolutionTestCase(unittest.TestCase):
+    '''
+    Check resolving file types by extension index.
+    '''
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.file_types = Registry.file_types
+        Registry.file_types = []
+        for file_type in (GenericFile(), GenericFolder(), GenericLink(), PythonFile()):
+            Registry.register(file_type)
+        os.makedirs(os.path.join(self.root, "package.py"))
+        with open(os.path.join(self.root, "main.py"), "w", encoding="utf-8") as file:
+            file.write("pass\n")
+
+    def tearDown(self) -> None:
+        Registry.file_types = self.file_types
+        Registry.file_type_candidates.clear()
+        Registry.file_type_cache.clear()
+        self.directory.cleanup()
+
+    def ids(self, file) -> list[str]:
+        return [file_type.id for file_type in Registry.find_file_types(file)]
+
+    def test_declared_types(self):
+        '''
+        Kind and extensions decide, last registered type comes first.
+        '''
+        self.assertEqual(self.ids(os.path.join(self.root, "main.py")), ["python_file", "generic_file"])
+        self.assertEqual(self.ids(os.path.join(self.root, "package.py")), ["generic_folder"])
+        self.assertEqual(self.ids(os.path.join(self.root, "missing.py")), [])
+        with os.scandir(self.root) as iterator:
+            entries = {entry.name: self.ids(entry) for entry in iterator}
+        self.assertEqual(entries, {"main.py": ["python_file", "generic_file"], "package.py": ["generic_folder"]})
+
+    def test_link(self):
+        '''
+        Links are classified together with their targets.
+        '''
+        link = os.path.join(self.root, "link.py")
+        os.symlink(os.path.join(self.root, "main.py"), link)
+        self.assertEqual(self.ids(link), ["python_file", "generic_link", "generic_file"])
+
+    def test_predicate_type(self):
+        '''
+        File types overriding `applies` are asked directly.
+        '''
+        class Makefile(FileType):
+            id = "makefile"
+            kind = "file"
+
+            def applies(self, file_path: str) -> bool:
+                return os.path.basename(file_path) == "Makefile"
+
+        Registry.register(Makefile())
+        with open(os.path.join(self.root, "Makefile"), "w", encoding="utf-8") as file:
+            file.write("all:\n")
+        self.assertEqual(self.ids(os.path.join(self.root, "Makefile")), ["makefile", "generic_file"])
+        self.assertEqual(self.ids(os.path.join(self.root, "main.py")), ["python_file", "generic_file"])
+
+    def test_memoization(self):
+        '''
+        Results are reused until modification time changes.
+        '''
+        path = os.path.join(self.root, "main.py")
+        self.ids(path)
+        self.assertIn(path, Registry.file_type_cache)
+        os.remove(path)
+        os.makedirs(path)
+        os.utime(path, ns=(1, 1))
+        self.assertEqual(self.ids(path), ["generic_folder"])
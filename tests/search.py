@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+from ide.expansion.search import PREVIEW_MARGIN, bytes_pattern, compile_pattern, find_fragments, \
+    find_fragments_in_file
+
+
+class FileSearchTestCase(unittest.TestCase):
+    '''
+    Check search in files on disk.
+    '''
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "data.py")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("# Привет — мир\nvalue = 'café'\nCAFÉ = ПРИВЕТ\nwordword word\n")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def search(self, text: str, **flags) -> list[tuple[int, int, int]]:
+        pattern = compile_pattern(text, **flags)
+        fragments = find_fragments_in_file(self.path, pattern, bytes_pattern(text, **flags))
+        return [(fragment.line_number, fragment.column, fragment.length) for fragment in fragments]
+
+    def test_ascii_literal(self):
+        '''
+        Plain ASCII fragments are searched as bytes, columns are counted in characters.
+        '''
+        self.assertIsNotNone(bytes_pattern("word"))
+        self.assertEqual(self.search("word"), [(3, 0, 4), (3, 4, 4), (3, 9, 4)])
+        self.assertEqual(self.search("value"), [(1, 0, 5)])
+
+    def test_non_ascii(self):
+        '''
+        Fragments with other characters, ignoring case and whole words match like in opened files.
+        '''
+        self.assertIsNone(bytes_pattern("café"))
+        self.assertEqual(self.search("—"), [(0, 9, 1)])
+        self.assertEqual(self.search(r"\N{EM DASH}", regex=True), [(0, 9, 1)])
+        self.assertEqual(self.search("café", ignore_case=True), [(1, 9, 4), (2, 0, 4)])
+        self.assertEqual(self.search("привет", ignore_case=True), [(0, 2, 6), (2, 7, 6)])
+        self.assertEqual(self.search("[а-я]+", regex=True), [(0, 3, 5), (0, 11, 3)])
+        self.assertEqual(self.search("word", whole_word=True), [(3, 9, 4)])
+
+    def test_long_line(self):
+        '''
+        Only a part of a long line around the fragment is shown, positions are still counted from the line start.
+        '''
+        line = "я" * 5000 + "needle" + "ж" * 5000 + "needle"
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write(f"first\n{line}\nlast\n")
+        for fragments in (find_fragments_in_file(self.path, compile_pattern("needle"), bytes_pattern("needle")),
+                          find_fragments(line, compile_pattern("needle"), self.path)):
+            self.assertEqual([(fragment.column, fragment.length) for fragment in fragments],
+                             [(5000, 6), (10006, 6)])
+            self.assertEqual(fragments[0].line_with_fragment, "я" * PREVIEW_MARGIN + "needle" + "ж" * PREVIEW_MARGIN)
+            self.assertEqual(fragments[1].line_with_fragment, "ж" * PREVIEW_MARGIN + "needle")
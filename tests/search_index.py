@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from ide.expansion.project_files import ProjectFiles
+from ide.expansion.search_index import TrigramIndex, trigrams
+
+
+class TrigramIndexTestCase(unittest.TestCase):
+    '''
+    Check project search index.
+    '''
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.write("main.py", "def main():\n    print('Hello')\n")
+        self.write("lib/util.py", "def helper():\n    return 42\n")
+        self.write("notes.txt", "def main():\n")
+        self.files = ProjectFiles(self.root)
+        self.index = TrigramIndex(self.files, ("py", "cpp"))
+        self.index.refresh()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write(self, path: str, text: str) -> None:
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def test_trigrams(self):
+        '''
+        Trigrams are lowercased.
+        '''
+        self.assertEqual(trigrams("AbcD"), {"abc", "bcd"})
+        self.assertEqual(trigrams("ab"), set())
+
+    def test_candidates(self):
+        '''
+        Only files containing all trigrams of the fragment are candidates.
+        '''
+        self.assertEqual(self.index.candidates("main"), {os.path.join(self.root, "main.py")})
+        self.assertEqual(self.index.candidates("HELPER"), {os.path.join(self.root, "lib", "util.py")})
+        self.assertEqual(self.index.candidates("def"), {os.path.join(self.root, "main.py"),
+                                                        os.path.join(self.root, "lib", "util.py")})
+        self.assertEqual(self.index.candidates("missing"), set())
+        self.assertIsNone(self.index.candidates("de"))
+
+    def test_incremental_update(self):
+        '''
+        Changed and deleted files are reindexed.
+        '''
+        self.write("main.py", "def renamed():\n    pass\n")
+        os.utime(os.path.join(self.root, "main.py"), (1, 1))
+        self.index.update_in_background(os.path.join(self.root, "main.py")).result()
+        self.assertEqual(self.index.candidates("main"), set())
+        self.assertEqual(self.index.candidates("renamed"), {os.path.join(self.root, "main.py")})
+
+        os.remove(os.path.join(self.root, "lib", "util.py"))
+        self.files.handle_event("deleted", os.path.join(self.root, "lib", "util.py"), False)
+        self.index.refresh()
+        self.assertEqual(self.index.candidates("helper"), set())
+        self.assertFalse(self.index.covers(os.path.join(self.root, "lib", "util.py")))
+
+    def test_excluded_update(self):
+        '''
+        Saved files excluded from the project are not indexed.
+        '''
+        self.write(".gitignore", "generated/\n")
+        self.files.handle_event("created", os.path.join(self.root, ".gitignore"), False)
+        self.write("generated/main.py", "def generated_main():\n")
+        self.write("venv/site.py", "def generated_main():\n")
+        for path in ("generated/main.py", "venv/site.py"):
+            self.index.update_in_background(os.path.join(self.root, path)).result()
+        self.assertEqual(self.index.candidates("generated_main"), set())
+
+    def test_persistence(self):
+        '''
+        Index saved to .ide folder is loaded by the next session.
+        '''
+        self.assertTrue(os.path.exists(os.path.join(self.root, ".ide", "search_index.json")))
+        index = TrigramIndex(self.files, ("py", "cpp"))
+        index.load()
+        self.assertEqual(index.files, self.index.files)
+        self.assertEqual(index.postings, self.index.postings)
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from ide.expansion.project_files import ProjectFiles
+from ide.expansion.symbol_index import PARALLEL_THRESHOLD, SymbolIndex
+
+MODULE = '''
+import os as system
+
+LIMIT: int = 10
+first, second = 1, 2
+
+
+class Parser:
+    def parse(self, text):
+        return text
+
+    class Error(Exception):
+        pass
+
+
+try:
+    from fast import helper
+except ImportError:
+    def helper(value=None):
+        return system.path.join(value)
+'''
+
+
+class SymbolIndexTestCase(unittest.TestCase):
+    '''
+    Check project symbol index.
+    '''
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.write("module.py", MODULE)
+        self.write("lib/broken.py", "def broken(:\n    pass\n")
+        self.files = ProjectFiles(self.root)
+        self.index = SymbolIndex(self.files)
+        self.index.refresh()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write(self, path: str, text: str) -> None:
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def test_symbols(self):
+        '''
+        Classes, functions, methods and module-level names are indexed.
+        '''
+        symbols = self.index.files["module.py"][3]
+        self.assertEqual([(name, kind) for name, kind, _, _ in symbols], [
+            ("LIMIT", "variable"), ("first", "variable"), ("second", "variable"), ("Parser", "class"),
+            ("Parser.parse", "method"), ("Parser.Error", "class"), ("helper", "function")
+        ])
+        self.assertEqual(symbols[3][2:], [8, 0])
+
+    def test_search(self):
+        '''
+        Names starting with the query come first.
+        '''
+        self.write("other.py", "def reparse():\n    pass\n")
+        self.files.invalidate()
+        self.index.refresh()
+        found = self.index.search("PARSE")
+        self.assertEqual([symbol.name for symbol in found], ["Parser.parse", "Parser", "reparse"])
+        self.assertEqual(found[0].path, os.path.join(self.root, "module.py"))
+        self.assertEqual(found[0].line, 9)
+
+    def test_identifiers(self):
+        '''
+        Files are found by names they use, unparsable ones are tokenized.
+        '''
+        self.assertEqual(self.index.files_with_identifier("join"), {os.path.join(self.root, "module.py")})
+        self.assertEqual(self.index.files_with_identifier("broken"), {os.path.join(self.root, "lib", "broken.py")})
+        self.assertEqual(self.index.files_with_identifier("missing"), set())
+
+    def test_excluded_update(self):
+        '''
+        Saved files excluded from the project are not indexed.
+        '''
+        self.write(".gitignore", "generated/\n")
+        self.files.handle_event("created", os.path.join(self.root, ".gitignore"), False)
+        self.write("generated/module.py", "def generated_function():\n    pass\n")
+        self.write("venv/site.py", "def generated_function():\n    pass\n")
+        for path in ("generated/module.py", "venv/site.py"):
+            self.index.update_in_background(os.path.join(self.root, path)).result()
+        self.assertEqual(self.index.search("generated_function"), [])
+
+    def test_persistence_and_hash(self):
+        '''
+        Saved index is loaded, touched files with the same contents aren't parsed.
+        '''
+        self.assertTrue(os.path.exists(os.path.join(self.root, ".ide", "symbol_index.json")))
+        index = SymbolIndex(self.files)
+        os.utime(os.path.join(self.root, "module.py"), (1, 1))
+        with mock.patch("ide.expansion.symbol_index.collect_symbols") as collect_symbols:
+            index.refresh()
+        collect_symbols.assert_not_called()
+        self.assertEqual(index.files["module.py"][3], self.index.files["module.py"][3])
+        self.assertEqual(index.files["module.py"][0], 1)
+
+    def test_parallel_refresh(self):
+        '''
+        Many changed files are parsed by process pool.
+        '''
+        for i in range(PARALLEL_THRESHOLD):
+            self.write(f"generated/module_{i}.py", f"def function_{i}():\n    pass\n")
+        self.files.invalidate()
+        self.index.refresh()
+        self.assertEqual([symbol.name for symbol in self.index.search("function_31")], ["function_31"])